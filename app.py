@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import os
 import utils
-from data_init import initialize_data_files
+from data_init import initialize_data_files_once
 
 # Set page configuration
 st.set_page_config(
@@ -14,33 +14,34 @@ st.set_page_config(
 
 # Initialize session state variables
 utils.initialize_session_state()
-
-# Set additional application-specific session state variables
-if 'default_time_filter' not in st.session_state:
-    st.session_state.default_time_filter = "Today"
-if 'username' not in st.session_state:
-    st.session_state.username = "Admin"
-if 'alert_threshold' not in st.session_state:
-    st.session_state.alert_threshold = 5.0  # Default low inventory alert threshold
-
-# Initialize data files if they don't exist
-initialize_data_files()
-
-# Main page
-st.title("Theta Coffee Lab Management System")
-
-# Introduction message
-st.write("""
+# Record this rerun for the Performance panel in Settings
+with utils.page_run("app"):
+    # Set additional application-specific session state variables
+    if 'default_time_filter' not in st.session_state:
+        st.session_state.default_time_filter = "Today"
+    if 'username' not in st.session_state:
+        st.session_state.username = "Admin"
+    if 'alert_threshold' not in st.session_state:
+        st.session_state.alert_threshold = 5.0  # Default low inventory alert threshold
+
+    # Initialize data files if they don't exist (once per process)
+    initialize_data_files_once()
+
+    # Main page
+    st.title("Theta Coffee Lab Management System")
+
+    # Introduction message
+    st.write("""
 Welcome to the Theta Coffee Lab Management System! This application helps you manage your cafe operations including sales tracking, inventory management, 
 product recipes, and financial reporting.
 """)
 
-# Add a more detailed description in a table format
-st.subheader("System Features")
-st.write("Theta Coffee Lab Management System offers a comprehensive suite of tools to manage your café business efficiently:")
+    # Add a more detailed description in a table format
+    st.subheader("System Features")
+    st.write("Theta Coffee Lab Management System offers a comprehensive suite of tools to manage your café business efficiently:")
 
-# Create feature table that adapts to light/dark theme
-features_html = """
+    # Create feature table that adapts to light/dark theme
+    features_html = """
 <style>
     .features-table {
         width: 100%;
@@ -89,14 +90,14 @@ features_html = """
 </table>
 """
 
-st.markdown(features_html, unsafe_allow_html=True)
+    st.markdown(features_html, unsafe_allow_html=True)
 
-# Navigation guidance with interactive buttons
-st.subheader("Navigation")
-st.write("Use the sidebar or these buttons to navigate to different sections of the application:")
+    # Navigation guidance with interactive buttons
+    st.subheader("Navigation")
+    st.write("Use the sidebar or these buttons to navigate to different sections of the application:")
 
-# CSS for nav buttons that respect light/dark theme
-st.markdown("""
+    # CSS for nav buttons that respect light/dark theme
+    st.markdown("""
 <style>
     .nav-button {
         background-color: #424242; 
@@ -115,30 +116,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Create three columns for the navigation buttons
-col1, col2, col3 = st.columns(3)
+    # Create three columns for the navigation buttons
+    col1, col2, col3 = st.columns(3)
 
-# First row of buttons
-with col1:
-    st.markdown("""
+    # First row of buttons
+    with col1:
+        st.markdown("""
     <a href="dashboard" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             📊 Dashboard<br><small>View KPIs and metrics</small>
         </div>
     </a>
     """, unsafe_allow_html=True)
-    
-with col2:
-    st.markdown("""
+        
+    with col2:
+        st.markdown("""
     <a href="order" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             🛒 Order<br><small>Manage sales transactions</small>
         </div>
     </a>
     """, unsafe_allow_html=True)
-    
-with col3:
-    st.markdown("""
+        
+    with col3:
+        st.markdown("""
     <a href="inventory" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             📦 Inventory<br><small>Track stock levels</small>
@@ -146,27 +147,27 @@ with col3:
     </a>
     """, unsafe_allow_html=True)
 
-# Second row of buttons
-with col1:
-    st.markdown("""
+    # Second row of buttons
+    with col1:
+        st.markdown("""
     <a href="product" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             🍵 Product<br><small>Create recipes</small>
         </div>
     </a>
     """, unsafe_allow_html=True)
-    
-with col2:
-    st.markdown("""
+        
+    with col2:
+        st.markdown("""
     <a href="financial" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             💰 Financial<br><small>Analyze finances</small>
         </div>
     </a>
     """, unsafe_allow_html=True)
-    
-with col3:
-    st.markdown("""
+        
+    with col3:
+        st.markdown("""
     <a href="map" target="_self" style="text-decoration: none;">
         <div class="nav-button">
             🗺️ Map<br><small>View customer locations</small>
@@ -174,8 +175,8 @@ with col3:
     </a>
     """, unsafe_allow_html=True)
 
-# Removed settings button as requested
+    # Removed settings button as requested
 
-# Footer
-st.markdown("---")
-st.caption("© 2025 Theta Coffee Lab Management System")
+    # Footer
+    st.markdown("---")
+    st.caption("© 2025 Theta Coffee Lab Management System")
@@ -0,0 +1,13 @@
+"""Benchmarks for the Theta Coffee Lab hot paths
+
+Run from the repository root:
+    python -m benchmarks.generate --lines 100k --out benchmarks/.data/100k
+    python -m benchmarks.bench --sizes 10k,100k --baseline benchmarks/baseline.json
+    python -m benchmarks.render --sizes 10k,100k --pages 1_dashboard,2_order
+    python -m benchmarks.load_test --writers 3 --orders 25 --mode both
+    python -m benchmarks.order_edits
+    python -m benchmarks.console_check
+    python -m benchmarks.parity --size 100k
+    python -m benchmarks.live --size 100k --period Today
+    python -m benchmarks.refresh
+"""
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import theta_core
+from theta_core import orders
+from benchmarks.generate import ensure_dataset, parse_size, format_size
+
+# Each benchmark takes a data directory and returns either the callable to time
+# or a (before_each, callable) pair when every run needs fresh setup.
+BENCHMARKS = {}
+
+# Coordinates for the Plus Code areas in generated data (map aggregation is
+# measured without network geocoding)
+AREA_COORDINATES = {
+    "QMPX": (10.7758, 106.7029), "QMMW": (10.7757, 106.6795), "QMWH": (10.7990, 106.6790),
+    "QPW4": (10.8150, 106.7060), "QPR7": (10.8106, 106.7176), "QQX2": (10.8490, 106.7530)
+}
+
+BENCH_ITEMS = [
+    {'Product': 'Iced Latte', 'Quantity': 2, 'Unit_Price': 45000.0, 'Total': 90000.0},
+    {'Product': 'Iced Vietnamese Milk Coffee', 'Quantity': 1, 'Unit_Price': 30000.0, 'Total': 30000.0}
+]
+BENCH_TIME = datetime(2025, 12, 31, 12, 0)
+
+def benchmark(name):
+    """Register a benchmark under ``name``"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def offline_geocode(address):
+    """Resolve generated addresses from their Plus Code area or raw coordinates"""
+    if '+' in address:
+        return AREA_COORDINATES.get(address.split('+')[0].strip(), (None, None))
+    try:
+        lat, lon = (float(part) for part in address.split(','))
+        return lat, lon
+    except ValueError:
+        return None, None
+
+@benchmark("load_parse")
+def bench_load_parse(data_dir):
+    return lambda: theta_core.load_sales(data_dir)
+
+@benchmark("dashboard_kpis")
+def bench_dashboard_kpis(data_dir):
+    sales = theta_core.load_sales(data_dir)
+    products = theta_core.load_products(data_dir)
+    recipes = theta_core.load_recipes(data_dir)
+
+    def run():
+        theta_core.sales_kpis(sales, products)
+        theta_core.ingredient_usage(sales, recipes)
+        theta_core.daily_revenue(sales)
+        theta_core.product_sales(sales)
+    return run
+
+@benchmark("profit_by_product")
+def bench_profit_by_product(data_dir):
+    sales = theta_core.load_sales(data_dir)
+    products = theta_core.load_products(data_dir)
+    return lambda: theta_core.profit_by_product(theta_core.merge_cogs(sales, products))
+
+@benchmark("map_aggregation")
+def bench_map_aggregation(data_dir):
+    sales = theta_core.load_sales(data_dir)
+    return lambda: theta_core.locate_orders(theta_core.order_locations(sales), offline_geocode)
+
+@benchmark("inventory_deduction")
+def bench_inventory_deduction(data_dir):
+    inventory = theta_core.load_inventory(data_dir)
+    recipes = theta_core.load_recipes(data_dir)
+
+    def run():
+        needs = orders.ingredient_requirements(BENCH_ITEMS, recipes)
+        orders.adjust_inventory(inventory.copy(), needs, 'Sale', BENCH_TIME, 'BENCH')
+    return run
+
+@benchmark("save_order")
+def bench_save_order(data_dir):
+    counter = iter(range(sys.maxsize))
+    return lambda: orders.save_order(BENCH_ITEMS, f"BENCH{next(counter)}", BENCH_TIME, 10000.0, '', data_dir)
+
+@benchmark("order_edit")
+def bench_order_edit(data_dir):
+    order_id = pd.read_csv(os.path.join(data_dir, "sales.csv"), usecols=['Order_ID'], nrows=1)['Order_ID'].iloc[0]
+    amounts = iter(range(sys.maxsize))
+    return lambda: orders.update_order_promo(order_id, float(next(amounts) % 5 * 1000), data_dir)
+
+@benchmark("order_delete")
+def bench_order_delete(data_dir):
+    counter = iter(range(sys.maxsize))
+    current = {}
+
+    def before_each():
+        current['id'] = f"BENCHDEL{next(counter)}"
+        orders.save_order(BENCH_ITEMS, current['id'], BENCH_TIME, 0.0, '', data_dir)
+
+    return before_each, lambda: orders.delete_order(current['id'], data_dir)
+
+def scratch_copy(data_dir, scratch_root):
+    """Copy a dataset so write benchmarks never touch the cached original"""
+    target = os.path.join(scratch_root, os.path.basename(data_dir))
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(data_dir, target)
+    return target
+
+def time_benchmark(setup, data_dir, repeat):
+    """Run one benchmark ``repeat`` times and return the wall times in seconds"""
+    prepared = setup(data_dir)
+    before_each, run = prepared if isinstance(prepared, tuple) else (None, prepared)
+
+    timings = []
+    for _ in range(repeat):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def run_suite(sizes, names, repeat, seed, scratch_root):
+    """Run the selected benchmarks on every dataset size
+
+    Returns:
+        Dict of results keyed by "<benchmark>@<size>"
+    """
+    results = {}
+    for lines in sizes:
+        data_dir = ensure_dataset(lines, seed)
+        work_dir = scratch_copy(data_dir, scratch_root)
+        for name in names:
+            timings = time_benchmark(BENCHMARKS[name], work_dir, repeat)
+            key = f"{name}@{format_size(lines)}"
+            results[key] = {
+                'benchmark': name,
+                'size': format_size(lines),
+                'lines': lines,
+                'runs': timings,
+                'min_s': min(timings),
+                'median_s': statistics.median(timings),
+                'mean_s': statistics.fmean(timings)
+            }
+            print(f"{key:<32} median {results[key]['median_s'] * 1000:10.2f} ms   min {results[key]['min_s'] * 1000:10.2f} ms")
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def environment():
+    """Describe the machine and library versions the results were taken on"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+def compare(results, baseline, tolerance):
+    """Compare medians with a baseline
+
+    Returns:
+        List of (key, baseline median, current median, ratio, status) rows
+    """
+    rows = []
+    for key, result in results.items():
+        previous = baseline.get('results', {}).get(key)
+        if previous is None:
+            rows.append((key, None, result['median_s'], None, 'new'))
+            continue
+        ratio = result['median_s'] / previous['median_s'] if previous['median_s'] > 0 else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 - tolerance:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append((key, previous['median_s'], result['median_s'], ratio, status))
+    return rows
+
+def print_comparison(rows):
+    """Print a baseline comparison table"""
+    print(f"\n{'benchmark':<32} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}  status")
+    for key, previous, current, ratio, status in rows:
+        previous_text = f"{previous * 1000:12.2f}" if previous is not None else f"{'-':>12}"
+        ratio_text = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{key:<32} {previous_text} {current * 1000:12.2f} {ratio_text}  {status}")
+
+def main(argv=None):
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark the Theta Coffee Lab hot paths on synthetic data")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Comma separated dataset sizes, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--only", help="Comma separated benchmark names (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark and size")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic datasets")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "latest.json"), help="Where to write results")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+
+    scratch_root = os.path.join("benchmarks", ".data", "scratch")
+    os.makedirs(scratch_root, exist_ok=True)
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': args.repeat, 'seed': args.seed},
+        'results': run_suite(sizes, names, args.repeat, args.seed, scratch_root)
+    }
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            rows = compare(report['results'], json.load(file), args.tolerance)
+        print_comparison(rows)
+        if args.fail_on_regression and any(row[4] == 'regression' for row in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
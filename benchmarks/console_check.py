@@ -0,0 +1,102 @@
+import argparse
+import hashlib
+import os
+import sys
+from theta_core import console, storage
+from benchmarks.bench import scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size
+
+# Statements the admin SQL console (theta_core.console) must refuse, run on a
+# copy of a generated dataset. Besides the refusal itself, the data files must
+# come out byte for byte the same: EXPLAIN ANALYZE runs the statement it
+# explains, so an EXPLAIN of a COPY once overwrote sales.csv.
+BLOCKED = [
+    "COPY (SELECT 1 AS a) TO '{sales}'",
+    "EXPLAIN ANALYZE COPY (SELECT 1 AS a) TO '{sales}'",
+    "EXPLAIN (ANALYZE) COPY (SELECT 1 AS a) TO '{sales}'",
+    "EXPLAIN ANALYZE CREATE TABLE t AS SELECT 1",
+    "EXPLAIN ANALYZE INSERT INTO sales SELECT * FROM sales",
+    "CREATE TABLE t AS SELECT 1",
+    "DROP VIEW sales",
+    "INSERT INTO sales SELECT * FROM sales",
+    "SET enable_external_access = true",
+    "ATTACH '{data_dir}/copy.db'",
+    "INSTALL httpfs",
+    "SELECT 1; COPY (SELECT 1 AS a) TO '{sales}'",
+]
+# Statements that only read, but reach past the views to the file system
+DENIED = [
+    "SELECT * FROM read_csv('{sales}')",
+    "SELECT * FROM glob('{data_dir}/*')",
+]
+ALLOWED = [
+    "SELECT count(*) FROM sales",
+    "SELECT * FROM orders LIMIT 5",
+    "WITH recent AS (SELECT * FROM sales) SELECT count(*) FROM recent",
+    "EXPLAIN SELECT count(*) FROM sales",
+    "EXPLAIN ANALYZE SELECT count(*) FROM orders",
+]
+
+def digests(data_dir):
+    """Content hash of each data file"""
+    found = {}
+    for name in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, name)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                found[name] = hashlib.sha256(f.read()).hexdigest()
+    return found
+
+def run(text, data_dir):
+    """Run one console query to the end"""
+    query = console.Query(text, data_dir, timeout=60)
+    query.wait()
+    return query
+
+def run_checks(data_dir):
+    """Run the blocked, denied and allowed statements, returning the problems found"""
+    problems = []
+    names = {'sales': os.path.join(data_dir, "sales.csv"), 'data_dir': data_dir}
+    before = digests(data_dir)
+    for text in BLOCKED + DENIED:
+        query = run(text.format(**names), data_dir)
+        if query.status != "Failed":
+            problems.append(f"not refused ({query.status}): {text}")
+    for text in ALLOWED:
+        query = run(text, data_dir)
+        if query.status != "Done" or not query.rows:
+            problems.append(f"refused ({query.status}: {query.error}): {text}")
+    # The locked-down connection itself, should a statement get past parse()
+    connection = console.readonly_connection(data_dir)
+    try:
+        connection.execute(f"COPY (SELECT 1 AS a) TO '{names['sales']}'")
+        problems.append("locked-down connection wrote sales.csv")
+    except Exception:
+        pass
+    finally:
+        connection.close()
+    changed = [name for name, digest in digests(data_dir).items() if before.get(name) != digest]
+    if changed or set(before) != set(digests(data_dir)):
+        problems.append(f"data files changed: {changed or 'files added or removed'}")
+    return problems
+
+def main(argv=None):
+    """Check that the SQL console refuses every statement that could write"""
+    parser = argparse.ArgumentParser(description="Check the SQL console refuses writes and file access")
+    parser.add_argument("--size", default="10k", help="Size of the dataset the queries run on")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "console_check")
+    os.makedirs(scratch_root, exist_ok=True)
+    data_dir = scratch_copy(ensure_dataset(parse_size(args.size), args.seed), scratch_root)
+    storage.adopt(data_dir, ("*.csv",))
+
+    problems = run_checks(data_dir)
+    for problem in problems:
+        print(f"  {problem}")
+    print(f"  {'console refused every write' if not problems else f'{len(problems)} problems'}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import argparse
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from theta_core import inventory_ledger
+from theta_core.orders import SALES_COLUMNS
+
+# Synthetic data that looks like ours: same menu and recipes, a menu mix taken
+# from the real sales, busy mornings and afternoons, promotions on some orders,
+# Plus Code locations around Ho Chi Minh City and weekly ingredient purchases
+# in the ledger. The same seed always produces the same files.
+END_DATE = datetime(2025, 12, 31)
+# Bumped when the generated files change, so cached datasets are regenerated
+DATASET_VERSION = 2
+ORDERS_PER_DAY = 150
+MAX_HISTORY_DAYS = 3 * 365
+CHUNK_ORDERS = 200_000
+
+# Share of orders per hour of the day (closed overnight)
+HOURLY_WEIGHTS = np.array([
+    0, 0, 0, 0, 0, 0, 1, 6, 10, 9, 6, 5,
+    7, 6, 8, 9, 7, 5, 4, 3, 2, 1, 0, 0
+], dtype=float)
+
+LINES_PER_ORDER = ([1, 2, 3, 4], [0.6, 0.25, 0.1, 0.05])
+QUANTITY_PER_LINE = ([1, 2, 3], [0.8, 0.15, 0.05])
+PROMO_SHARE = 0.3
+PROMO_RATES = [0.1, 0.15, 0.2, 0.25]
+LOCATION_SHARE = 0.6
+
+# Plus Code areas seen in our orders and the district they belong to
+PLUS_CODE_AREAS = [
+    ("QMPX", "District 1"), ("QMMW", "District 3"), ("QMWH", "Phú Nhuận"),
+    ("QPW4", "Bình Thạnh"), ("QPR7", "Bình Thạnh"), ("QQX2", "Thủ Đức City")
+]
+PLUS_CODE_CHARS = list("23456789CFGHJMPQRVWX")
+
+# Purchases: a restock of every ingredient each week, sized for the expected
+# usage with some headroom, at prices around today's average cost that were a
+# little lower in the past and vary from delivery to delivery
+PURCHASE_EVERY_DAYS = 7
+PURCHASE_HEADROOM = 1.25
+OPENING_WEEKS = 2
+PRICE_RISE_PER_YEAR = 0.05
+PRICE_NOISE = 0.08
+
+def parse_size(text):
+    """Parse sizes like 10k, 2.5M or 1000 into a number of line items"""
+    text = str(text).strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+def format_size(lines):
+    """Inverse of parse_size for labels (10000 -> 10k)"""
+    for suffix, factor in (('M', 1_000_000), ('k', 1_000)):
+        if lines >= factor and lines % factor == 0:
+            return f"{lines // factor}{suffix}"
+    return str(lines)
+
+def menu_mix(products, sales):
+    """Probability of each product, following the real sales with a floor for unsold items"""
+    sold = sales.groupby('Product')['Quantity'].sum() if not sales.empty else pd.Series(dtype=float)
+    weights = sold.reindex(products['Name']).fillna(0).to_numpy(dtype=float)
+    weights = np.maximum(weights, max(weights.sum(), 1) * 0.002)
+    return weights / weights.sum()
+
+def random_locations(rng, count):
+    """Plus Code addresses, with a few raw latitude/longitude pairs like the real data"""
+    areas = rng.integers(0, len(PLUS_CODE_AREAS), count)
+    suffix = rng.choice(PLUS_CODE_CHARS, (count, 2))
+    codes = np.array([code for code, _ in PLUS_CODE_AREAS], dtype=object)[areas]
+    districts = np.array([district for _, district in PLUS_CODE_AREAS], dtype=object)[areas]
+    locations = pd.Series(codes + '+' + suffix[:, 0] + suffix[:, 1] + ' ' + districts + ', Ho Chi Minh City, Vietnam')
+
+    raw = rng.random(count) < 0.02
+    lat = 10.75 + rng.random(raw.sum()) * 0.1
+    lon = 106.65 + rng.random(raw.sum()) * 0.1
+    locations[raw] = [f"{a}, {b}" for a, b in zip(lat, lon)]
+    return locations.to_numpy()
+
+def generate_orders(rng, n_orders, first_order, first_time, orders_per_day, products, weights):
+    """Generate one chunk of orders as sales.csv rows
+
+    Orders are numbered from ``first_order`` and fill days in sequence from ``first_time``.
+    """
+    lines_per_order = rng.choice(LINES_PER_ORDER[0], n_orders, p=LINES_PER_ORDER[1])
+    order_index = np.repeat(np.arange(n_orders), lines_per_order)
+    n_lines = len(order_index)
+
+    # Order times: a day in sequence and an hour from the daily curve
+    day = np.arange(n_orders) // orders_per_day
+    hour = rng.choice(24, n_orders, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    minute = rng.integers(0, 60, n_orders)
+    order_time = first_time + pd.to_timedelta(day, 'D') + pd.to_timedelta(hour, 'h') + \
+        pd.to_timedelta(minute, 'min')
+
+    product = rng.choice(len(products), n_lines, p=weights)
+    quantity = rng.choice(QUANTITY_PER_LINE[0], n_lines, p=QUANTITY_PER_LINE[1])
+    price = products['Price'].to_numpy(dtype=float)[product]
+    total = quantity * price
+
+    promo_rate = np.where(rng.random(n_orders) < PROMO_SHARE, rng.choice(PROMO_RATES, n_orders), 0.0)
+    promo = total * promo_rate[order_index]
+
+    # Location only on the first line of an order, like the order page does
+    first_line = np.r_[True, order_index[1:] != order_index[:-1]]
+    has_location = rng.random(n_orders) < LOCATION_SHARE
+    location = np.full(n_lines, '', dtype=object)
+    located = first_line & has_location[order_index]
+    location[located] = random_locations(rng, int(located.sum()))
+
+    sales = pd.DataFrame({
+        'Date': order_time[order_index].strftime('%Y-%m-%d %H:%M'),
+        'Order_ID': first_order + order_index,
+        'Product': products['Name'].to_numpy()[product],
+        'Quantity': quantity,
+        'Unit_Price': price,
+        'Total': total,
+        'Promo': promo,
+        'Net_Total': total - promo,
+        'Location': location
+    })
+    # Orders within a day are written in time order
+    return sales.sort_values(['Date', 'Order_ID'], kind='stable')[SALES_COLUMNS]
+
+def generate_purchases(rng, inventory, recipes, products, weights, lines_per_day, first_day, end_date):
+    """Addition rows for the ledger: opening stock the day before the history, then weekly restocks"""
+    # Expected use of each ingredient per sale line, from the menu mix and recipes
+    per_product = pd.Series(weights, index=products['Name'].to_numpy()) * np.dot(*QUANTITY_PER_LINE)
+    per_line = recipes['Quantity'].astype(float) * recipes['Product'].map(per_product).fillna(0)
+    usage = per_line.groupby(recipes['Ingredient']).sum()
+    materials = inventory.set_index('Name').reindex(usage.index)
+    materials = materials[(usage > 0) & (materials['Avg_Cost'] > 0)]
+    weekly = usage.reindex(materials.index) * lines_per_day * PURCHASE_EVERY_DAYS * PURCHASE_HEADROOM
+
+    end = pd.Timestamp(end_date).normalize()
+    days = pd.date_range(first_day - pd.Timedelta(days=1), end, freq=f'{PURCHASE_EVERY_DAYS}D')
+    rows = []
+    for number, day in enumerate(days):
+        years_back = (end - day).days / 365
+        noise = rng.lognormal(0.0, PRICE_NOISE, len(materials))
+        quantity = np.ceil(weekly.to_numpy() * (OPENING_WEEKS if number == 0 else 1))
+        price = materials['Avg_Cost'].to_numpy(dtype=float) / (1 + PRICE_RISE_PER_YEAR) ** years_back
+        unit_cost = np.round(price * noise, 2)
+        rows.append(pd.DataFrame({
+            'Date': day.strftime('%Y-%m-%d'), 'Material': materials.index, 'Quantity': quantity,
+            'Unit': materials['Unit'].to_numpy(), 'Unit_Cost': unit_cost, 'Total_Cost': quantity * unit_cost,
+            'Type': 'Addition', 'Reference': ''
+        }))
+    return pd.concat(rows, ignore_index=True)[inventory_ledger.LEDGER_COLUMNS]
+
+def generate_dataset(lines, out_dir, seed=42, source_dir="data", end_date=END_DATE):
+    """Write a full synthetic data directory with ``lines`` sale lines
+
+    The history ends on ``end_date``. Small datasets get about ORDERS_PER_DAY
+    orders a day; large ones are squeezed into at most MAX_HISTORY_DAYS days.
+
+    Returns:
+        Number of sale lines written
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    products = pd.read_csv(os.path.join(source_dir, "products.csv"))
+    recipes = pd.read_csv(os.path.join(source_dir, "product_recipe.csv"))
+    recipes = recipes[recipes['Product'].isin(products['Name'])]
+    try:
+        source_sales = pd.read_csv(os.path.join(source_dir, "sales.csv"))
+    except FileNotFoundError:
+        source_sales = pd.DataFrame(columns=['Product', 'Quantity'])
+    weights = menu_mix(products, source_sales)
+
+    mean_lines = np.dot(*LINES_PER_ORDER)
+    expected_orders = int(lines / mean_lines) + 1
+    days = min(MAX_HISTORY_DAYS, max(30, -(-expected_orders // ORDERS_PER_DAY)))
+    # Slightly more orders a day than needed so random line counts don't spill past end_date
+    orders_per_day = -(-int(expected_orders * 1.03) // days)
+    first_day = pd.Timestamp(end_date).normalize() - pd.Timedelta(days=days - 1)
+
+    # Orders come in chunks (whole days) so 10M lines never sit in memory at once
+    chunk_orders = max(orders_per_day, CHUNK_ORDERS // orders_per_day * orders_per_day)
+    written, order_id, chunk_start = 0, 10_000_000, first_day
+    with open(os.path.join(out_dir, "sales.csv"), 'w', newline='') as file:
+        while written < lines:
+            # A little headroom so the last chunk rarely falls short of the line count
+            n_orders = min(chunk_orders, int((lines - written) / mean_lines * 1.1) + 1)
+            chunk = generate_orders(rng, n_orders, order_id, chunk_start, orders_per_day, products, weights)
+            chunk = chunk.iloc[:lines - written]
+            chunk.to_csv(file, header=written == 0, index=False)
+            written += len(chunk)
+            order_id += n_orders
+            chunk_start += pd.Timedelta(days=-(-n_orders // orders_per_day))
+
+    shutil.copy(os.path.join(source_dir, "products.csv"), out_dir)
+    recipes.to_csv(os.path.join(out_dir, "product_recipe.csv"), index=False)
+
+    # Stock large enough that the generated history never runs it dry
+    inventory = pd.read_csv(os.path.join(source_dir, "inventory.csv"))
+    inventory['Quantity'] = inventory['Quantity'].astype(float) * max(1.0, lines / 100)
+    inventory.to_csv(os.path.join(out_dir, "inventory.csv"), index=False)
+
+    # Monthly running costs over the generated period
+    months = pd.date_range(first_day, end_date, freq='MS')
+    costs = pd.DataFrame([
+        {'Date': month.strftime('%Y-%m-%d'), 'Type': cost_type, 'Amount': amount}
+        for month in months
+        for cost_type, amount in (('Rent', 5_000_000.0), ('Salary', 8_000_000.0), ('Utilities', 1_200_000.0))
+    ], columns=['Date', 'Type', 'Amount'])
+    costs.to_csv(os.path.join(out_dir, "operational_costs.csv"), index=False)
+
+    purchases = generate_purchases(rng, inventory, recipes, products, weights, orders_per_day * mean_lines,
+                                   first_day, end_date)
+    purchases.to_csv(inventory_ledger.ledger_path(out_dir), index=False)
+    return written
+
+def dataset_dir(lines, seed, end_date, root=os.path.join("benchmarks", ".data")):
+    """Cache directory of a generated dataset"""
+    return os.path.join(root, f"{format_size(lines)}-seed{seed}-{end_date:%Y%m%d}-v{DATASET_VERSION}")
+
+def ensure_dataset(lines, seed=42, root=os.path.join("benchmarks", ".data"), source_dir="data", end_date=END_DATE):
+    """Return the directory of a cached dataset, generating it on first use"""
+    out_dir = dataset_dir(lines, seed, end_date, root)
+    if not os.path.exists(os.path.join(out_dir, "sales.csv")):
+        generate_dataset(lines, out_dir, seed, source_dir, end_date)
+    return out_dir
+
+def main(argv=None):
+    """Generate a synthetic data directory"""
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic Theta Coffee Lab dataset")
+    parser.add_argument("--lines", default="10k", help="Number of sale lines, e.g. 10k, 1M, 10M")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Output directory (default benchmarks/.data/<size>-seed<seed>)")
+    parser.add_argument("--source", default="data", help="Directory with the products, recipes and inventory to copy")
+    parser.add_argument("--end-date", default=END_DATE.strftime('%Y-%m-%d'), help="Last day of generated history")
+    args = parser.parse_args(argv)
+
+    lines = parse_size(args.lines)
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+    out_dir = args.out or dataset_dir(lines, args.seed, end_date)
+    written = generate_dataset(lines, out_dir, args.seed, args.source, end_date)
+    print(f"Wrote {written:,} sale lines to {out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from theta_core import analytics, data, live, orders, storage
+from benchmarks.bench import environment, scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size, format_size, END_DATE
+from benchmarks.parity import dict_differences, frame_differences, FRAME_KEYS
+
+# The live dashboard during service: orders are saved one after another (and
+# now and then one is edited), and after each change a LiveRollup catches up
+# from the lines appended since its watermark, as the dashboard's live mode
+# does. Its figures are checked against a full recompute of the period, and
+# both are timed. An edit must force a rebuild; a save must not.
+
+def figures_differences(expected, actual):
+    """Differences between two analytics.dashboard results"""
+    differences = dict_differences('kpis', expected['kpis'], actual['kpis'])
+    for name in FRAME_KEYS:
+        if name in expected:
+            differences += frame_differences(name, expected[name], actual[name])
+    return differences
+
+def catch_up(rollup, data_dir, start_date, end_date):
+    """Bring a rollup up to date as datasets.live_rollup does
+
+    Returns:
+        (rollup, True if it had to be rebuilt from the whole period)
+    """
+    watermark = storage.version(os.path.join(data_dir, "sales.csv"))
+    appended = None if rollup is None else data.load_appended_sales(data_dir, rollup.watermark)
+    rebuilt = appended is None
+    if rebuilt:
+        rollup = live.LiveRollup(start_date, end_date, ())
+        appended = data.load_sales(data_dir, start_date, end_date)
+    rollup.add(appended, watermark)
+    return rollup, rebuilt
+
+def run_live(data_dir, period, orders_count, edit_every, seed):
+    """Save orders, catch up after each change and compare with a full recompute"""
+    rng = random.Random(seed)
+    products = data.load_products(data_dir).to_dict('records')
+    start_date, end_date = data.date_range(period, END_DATE.date())
+    when = END_DATE.replace(hour=8)
+    rollup, _ = catch_up(None, data_dir, start_date, end_date)
+
+    rows, saved = [], []
+    for number in range(orders_count):
+        when += timedelta(minutes=rng.randint(1, 5))
+        if edit_every and saved and number % edit_every == edit_every - 1:
+            operation = 'edit'
+            orders.update_order_promo(rng.choice(saved), float(rng.randrange(0, 20_000, 1000)), data_dir)
+        else:
+            operation = 'save'
+            order_id = f"LV{number:05d}"
+            items = [{'Product': product['Name'], 'Quantity': quantity, 'Unit_Price': product['Price'],
+                      'Total': product['Price'] * quantity}
+                     for product, quantity in ((rng.choice(products), rng.randint(1, 3))
+                                               for _ in range(rng.randint(1, 3)))]
+            orders.save_order(items, order_id, when, 0.0, '', data_dir)
+            saved.append(order_id)
+
+        started = time.perf_counter()
+        rollup, rebuilt = catch_up(rollup, data_dir, start_date, end_date)
+        actual = rollup.figures(data.load_products(data_dir), data.load_recipes(data_dir))
+        live_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        expected = analytics.dashboard(data_dir, start_date, end_date, "pandas")
+        full_ms = (time.perf_counter() - started) * 1000
+
+        differences = figures_differences(expected, actual)
+        if rebuilt != (operation == 'edit'):
+            differences.append(f"{operation} {'rebuilt' if rebuilt else 'did not rebuild'} the rollup")
+        rows.append({'operation': operation, 'rebuilt': rebuilt, 'live_ms': live_ms, 'full_ms': full_ms,
+                     'differences': differences})
+    return rows
+
+def summarise(rows):
+    """Median catch-up and full recompute times per operation"""
+    summary = {}
+    for operation in ('save', 'edit'):
+        picked = [row for row in rows if row['operation'] == operation]
+        if picked:
+            summary[operation] = {
+                'count': len(picked),
+                'live_p50_ms': statistics.median(row['live_ms'] for row in picked),
+                'full_p50_ms': statistics.median(row['full_ms'] for row in picked)
+            }
+    return summary
+
+def main(argv=None):
+    """Check live dashboard updates against full recomputes"""
+    parser = argparse.ArgumentParser(description="Time and check incremental live dashboard updates")
+    parser.add_argument("--size", default="100k", help="Size of the dataset the orders are added to")
+    parser.add_argument("--period", default="Today", choices=list(data.PERIOD_DAYS) + ["All Time"],
+                        help="Dashboard period, relative to the last day of the dataset")
+    parser.add_argument("--orders", type=int, default=50, help="Changes to make")
+    parser.add_argument("--edit-every", type=int, default=10, help="Make every Nth change a promotion edit (0: never)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "live.json"), help="Where to write results")
+    args = parser.parse_args(argv)
+
+    lines = parse_size(args.size)
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "live")
+    os.makedirs(scratch_root, exist_ok=True)
+    data_dir = scratch_copy(ensure_dataset(lines, args.seed), scratch_root)
+    # Published like data_init does at startup, so appends can be tailed
+    storage.adopt(data_dir, ("*.csv",))
+
+    rows = run_live(data_dir, args.period, args.orders, args.edit_every, args.seed)
+    summary = summarise(rows)
+    for operation, figures in summary.items():
+        print(f"  {operation:<5} n={figures['count']:<4} live p50 {figures['live_p50_ms']:8.1f} ms   "
+              f"full p50 {figures['full_p50_ms']:8.1f} ms")
+    failures = [(number, difference) for number, row in enumerate(rows) for difference in row['differences']]
+    for number, difference in failures[:10]:
+        print(f"  change {number}: {difference}")
+    print(f"  {'consistent' if not failures else f'{len(failures)} differences'}")
+
+    report = {
+        'environment': environment(),
+        'settings': {'size': format_size(lines), 'period': args.period, 'orders': args.orders,
+                     'edit_every': args.edit_every, 'seed': args.seed},
+        'summary': summary,
+        'results': rows
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
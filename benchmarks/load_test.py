@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from theta_core import orders
+from benchmarks.bench import environment, scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size, format_size
+
+# Several tills writing at once: each writer saves orders and edits or deletes
+# some of its own, all against the same data directory. Afterwards the files
+# are checked against what the writers were told succeeded, so sales lines,
+# promotions or stock movements lost to overlapping read-modify-write cycles show up.
+OPERATIONS = ('save', 'edit', 'delete')
+
+# Inventory is topped up to this level before a run so deductions never clamp
+# at zero and the expected stock is a plain sum
+STOCK_LEVEL = 1e9
+
+def writer_plan(writer, orders_per_writer, products, seed, edit_share, delete_share):
+    """Deterministic list of operations for one writer
+
+    Every writer saves ``orders_per_writer`` orders and, after each save, may
+    edit the promotion of or delete one of its own live orders.
+    """
+    rng = random.Random(seed * 1000 + writer)
+    plan, live = [], []
+    for number in range(orders_per_writer):
+        order_id = f"LT{writer:02d}{number:05d}"
+        items = []
+        for product in rng.sample(products, rng.randint(1, min(3, len(products)))):
+            quantity = rng.randint(1, 3)
+            items.append({'Product': product['Name'], 'Quantity': quantity,
+                          'Unit_Price': product['Price'], 'Total': product['Price'] * quantity})
+        plan.append(('save', order_id, items))
+        live.append(order_id)
+
+        roll = rng.random()
+        if roll < edit_share:
+            plan.append(('edit', rng.choice(live), float(rng.randrange(0, 20_000, 1000))))
+        elif roll < edit_share + delete_share:
+            victim = live.pop(rng.randrange(len(live)))
+            plan.append(('delete', victim, None))
+    return plan
+
+def run_writer(plan, data_dir, start_at):
+    """Execute a plan and time every operation
+
+    Returns:
+        List of (operation, order ID, argument, seconds, error message or None)
+    """
+    # Writers wait for a common start time so their first operations overlap
+    time.sleep(max(0.0, start_at - time.time()))
+    when = datetime(2025, 12, 31, 12, 0)
+    log = []
+    for operation, order_id, argument in plan:
+        start = time.perf_counter()
+        error = None
+        try:
+            if operation == 'save':
+                orders.save_order(argument, order_id, when, 0.0, '', data_dir)
+            elif operation == 'edit':
+                orders.update_order_promo(order_id, argument, data_dir)
+            else:
+                orders.delete_order(order_id, data_dir)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        log.append((operation, order_id, argument, time.perf_counter() - start, error))
+    return log
+
+def expected_state(logs):
+    """What the files should contain if every successful operation stuck
+
+    Returns:
+        Tuple of (live orders {ID: items}, latest promo per live order,
+        IDs touched by failed operations, whose outcome is unknown)
+    """
+    live, promos, unknown = {}, {}, set()
+    for log in logs:
+        for operation, order_id, argument, _, error in log:
+            if error:
+                unknown.add(order_id)
+            elif operation == 'save':
+                live[order_id] = argument
+            elif operation == 'edit':
+                promos[order_id] = argument
+            else:
+                live.pop(order_id, None)
+                promos.pop(order_id, None)
+    return live, promos, unknown
+
+def check_consistency(data_dir, logs, initial_inventory, initial_lines):
+    """Compare the final files with the expected state
+
+    Returns:
+        Dict of counts; any non-zero value other than unknown_orders means updates were lost
+    """
+    live, promos, unknown = expected_state(logs)
+    sales = pd.read_csv(os.path.join(data_dir, "sales.csv"), dtype=orders.SALES_DTYPES)
+    recipe_df = pd.read_csv(os.path.join(data_dir, "product_recipe.csv"))
+    inventory = pd.read_csv(os.path.join(data_dir, "inventory.csv"))
+
+    written = sales[sales['Order_ID'].str.startswith('LT', na=False)]
+    found_lines = written.groupby('Order_ID').size()
+    expected_lines = pd.Series({order_id: len(items) for order_id, items in live.items()}, dtype=int)
+    checked = expected_lines.index.difference(pd.Index(sorted(unknown)))
+
+    found_for_checked = found_lines.reindex(checked, fill_value=0)
+    missing = found_for_checked < expected_lines.reindex(checked)
+    resurrected = found_lines.index.difference(expected_lines.index).difference(pd.Index(sorted(unknown)))
+
+    promo_found = written.groupby('Order_ID')['Promo'].sum()
+    lost_edits = sum(
+        1 for order_id, amount in promos.items()
+        if order_id in checked and order_id in promo_found.index and abs(promo_found[order_id] - amount) > 0.01
+    )
+
+    # Stock should be down by exactly the ingredients of the live orders
+    all_items = [item for items in live.values() for item in items]
+    if all_items:
+        needs = orders.ingredient_requirements(all_items, recipe_df).groupby('Ingredient')['Needed'].sum()
+    else:
+        needs = pd.Series(dtype=float)
+    expected_stock = initial_inventory.sub(needs, fill_value=0.0)
+    final_stock = inventory.drop_duplicates('Name').set_index('Name')['Quantity']
+    drift = (final_stock.reindex(expected_stock.index) - expected_stock).abs()
+    stock_mismatches = int((drift > 1e-3).sum())
+
+    return {
+        'expected_orders': len(live),
+        'missing_orders': int(missing.sum()),
+        'resurrected_orders': len(resurrected),
+        'lost_promo_edits': lost_edits,
+        'lost_history_lines': int(initial_lines - (len(sales) - len(written))),
+        'inventory_mismatches': stock_mismatches,
+        'inventory_max_drift': float(drift.max()) if len(drift) else 0.0,
+        'unknown_orders': len(unknown)
+    }
+
+def latency_summary(logs, wall):
+    """p50/p99 latency per operation and overall throughput"""
+    summary = {}
+    entries = [entry for log in logs for entry in log]
+    for operation in OPERATIONS + ('all',):
+        timings = [entry[3] for entry in entries if operation in ('all', entry[0])]
+        if not timings:
+            continue
+        summary[operation] = {
+            'count': len(timings),
+            'errors': sum(1 for entry in entries if operation in ('all', entry[0]) and entry[4]),
+            'p50_ms': float(np.percentile(timings, 50)) * 1000,
+            'p99_ms': float(np.percentile(timings, 99)) * 1000,
+            'max_ms': max(timings) * 1000
+        }
+    summary['throughput_ops_s'] = len(entries) / wall if wall > 0 else 0.0
+    summary['wall_s'] = wall
+    return summary
+
+def run_load(mode, writers, orders_per_writer, data_dir, scratch_root, seed, edit_share, delete_share):
+    """Run one concurrent load test on a scratch copy of ``data_dir``"""
+    work_dir = scratch_copy(data_dir, scratch_root)
+    inventory = pd.read_csv(os.path.join(work_dir, "inventory.csv"))
+    inventory['Quantity'] = STOCK_LEVEL
+    inventory.to_csv(os.path.join(work_dir, "inventory.csv"), index=False)
+    initial_inventory = inventory.drop_duplicates('Name').set_index('Name')['Quantity'].astype(float)
+    initial_lines = len(pd.read_csv(os.path.join(work_dir, "sales.csv"), usecols=['Order_ID']))
+
+    recipe_products = set(pd.read_csv(os.path.join(work_dir, "product_recipe.csv"))['Product'])
+    products = [product for product in pd.read_csv(os.path.join(work_dir, "products.csv"))[['Name', 'Price']]
+                .to_dict('records') if product['Name'] in recipe_products]
+    plans = [writer_plan(writer, orders_per_writer, products, seed, edit_share, delete_share)
+             for writer in range(writers)]
+
+    executor_class = ThreadPoolExecutor if mode == 'threads' else ProcessPoolExecutor
+    with executor_class(max_workers=writers) as executor:
+        start_at = time.time() + 1.0
+        futures = [executor.submit(run_writer, plan, work_dir, start_at) for plan in plans]
+        logs = [future.result() for future in futures]
+    wall = time.time() - start_at
+
+    result = {
+        'mode': mode,
+        'writers': writers,
+        'latency': latency_summary(logs, wall),
+        'consistency': check_consistency(work_dir, logs, initial_inventory, initial_lines),
+        'errors': sorted({entry[4] for log in logs for entry in log if entry[4]})[:10]
+    }
+    return result
+
+def lost_updates(consistency):
+    """True if any check other than unknown outcomes failed"""
+    return any(value for key, value in consistency.items()
+               if key not in ('expected_orders', 'unknown_orders', 'inventory_max_drift'))
+
+def print_result(result):
+    """Print latency and consistency for one run"""
+    latency, consistency = result['latency'], result['consistency']
+    print(f"\n{result['mode']} x {result['writers']} writers: "
+          f"{latency['throughput_ops_s']:.1f} ops/s over {latency['wall_s']:.2f} s")
+    for operation in OPERATIONS + ('all',):
+        if operation in latency:
+            stats = latency[operation]
+            print(f"  {operation:<7} n={stats['count']:<5} p50 {stats['p50_ms']:9.1f} ms   "
+                  f"p99 {stats['p99_ms']:9.1f} ms   errors {stats['errors']}")
+    status = "LOST UPDATES" if lost_updates(consistency) else "consistent"
+    print(f"  {status}: " + ", ".join(f"{key}={value:g}" if isinstance(value, float) else f"{key}={value}"
+                                      for key, value in consistency.items()))
+    for error in result['errors']:
+        print(f"  error: {error}")
+
+def main(argv=None):
+    """Run the concurrent writer load test"""
+    parser = argparse.ArgumentParser(description="Drive concurrent order writers and check for lost updates")
+    parser.add_argument("--writers", type=int, default=3, help="Concurrent writers (tills)")
+    parser.add_argument("--orders", type=int, default=25, help="Orders saved by each writer")
+    parser.add_argument("--mode", choices=['threads', 'processes', 'both'], default='both')
+    parser.add_argument("--size", default="10k", help="Size of the dataset the writers start from")
+    parser.add_argument("--edit-share", type=float, default=0.3, help="Chance of a promotion edit after each save")
+    parser.add_argument("--delete-share", type=float, default=0.2, help="Chance of a delete after each save")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "load.json"), help="Where to write results")
+    args = parser.parse_args(argv)
+
+    lines = parse_size(args.size)
+    data_dir = ensure_dataset(lines, args.seed)
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "load")
+    os.makedirs(scratch_root, exist_ok=True)
+
+    modes = ['threads', 'processes'] if args.mode == 'both' else [args.mode]
+    results = []
+    for mode in modes:
+        result = run_load(mode, args.writers, args.orders, data_dir, scratch_root,
+                          args.seed, args.edit_share, args.delete_share)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        'environment': environment(),
+        'settings': {'writers': args.writers, 'orders': args.orders, 'size': format_size(lines),
+                     'edit_share': args.edit_share, 'delete_share': args.delete_share, 'seed': args.seed},
+        'results': results
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+    return 1 if any(lost_updates(result['consistency']) for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
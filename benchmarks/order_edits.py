@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+from theta_core import inventory_ledger, orders, storage
+from benchmarks.bench import scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size
+
+# The order edits the order page offers, run through theta_core.orders on a
+# copy of a generated dataset and checked against what ends up in the files.
+# The order IDs have leading zeros, which survive only when sales.csv is read
+# with SALES_DTYPES.
+ITEMS = [{'Product': 'Iced Latte', 'Quantity': 2, 'Unit_Price': 45000.0, 'Total': 90000.0},
+         {'Product': 'Iced Americano', 'Quantity': 1, 'Unit_Price': 35000.0, 'Total': 35000.0}]
+WHEN = datetime(2025, 12, 31, 9, 15)
+
+def sales(data_dir):
+    """sales.csv as stored"""
+    return pd.read_csv(os.path.join(data_dir, "sales.csv"), dtype=orders.SALES_DTYPES)
+
+def order_rows(data_dir, order_id):
+    """Stored lines of one order"""
+    df = sales(data_dir)
+    return df[df['Order_ID'] == order_id]
+
+def check(problems, condition, message):
+    """Record ``message`` unless ``condition`` holds"""
+    if not condition:
+        problems.append(message)
+
+def run_checks(data_dir):
+    """Save, edit and delete orders, returning the problems found"""
+    problems = []
+    lines_before = len(sales(data_dir))
+    orders.save_order(ITEMS, "000123", WHEN, 25000.0, "QMMW+9Q District 3, Ho Chi Minh City", data_dir)
+    orders.save_order(ITEMS[:1], "000124", WHEN, 0.0, "", data_dir)
+    check(problems, len(order_rows(data_dir, "000123")) == 2, "saved order 000123 not found under its ID")
+
+    found = orders.find_order("000123", data_dir)
+    check(problems, len(found) == 2 and found['Date'].iloc[0] == pd.Timestamp(WHEN), "find_order missed 000123")
+    check(problems, orders.find_order("123", data_dir).empty, "find_order matched 123 to 000123")
+
+    check(problems, orders.update_order_time("000123", 14, 5, data_dir), "time edit did not find the order")
+    dates = set(order_rows(data_dir, "000123")['Date'])
+    check(problems, dates == {"2025-12-31 14:05"}, f"time edit stored {sorted(dates)}")
+
+    check(problems, orders.update_order_location("000123", "10.7915, 106.6917", data_dir),
+          "location edit did not find the order")
+    locations = order_rows(data_dir, "000123")['Location'].fillna('').tolist()
+    check(problems, locations == ["10.7915, 106.6917", ""], f"location edit stored {locations}")
+
+    try:
+        orders.update_order_id("000123", "000124", data_dir)
+        problems.append("ID edit onto an existing order was not rejected")
+    except storage.Rejected:
+        pass
+    check(problems, orders.update_order_id("000123", "000125", data_dir), "ID edit did not find the order")
+    check(problems, order_rows(data_dir, "000123").empty and len(order_rows(data_dir, "000125")) == 2,
+          "ID edit did not move both lines to 000125")
+    check(problems, not orders.update_order_time("000123", 8, 0, data_dir), "time edit found a renamed order")
+
+    check(problems, orders.update_order_promo("000125", 12500.0, data_dir), "promotion edit did not find the order")
+    promo = order_rows(data_dir, "000125")['Promo'].sum()
+    check(problems, abs(promo - 12500.0) < 1e-6, f"promotion edit stored {promo}")
+
+    messages = orders.delete_order("000125", data_dir)
+    check(problems, messages is not None and order_rows(data_dir, "000125").empty, "delete left order 000125")
+    check(problems, orders.delete_order("000125", data_dir) is None, "second delete found order 000125")
+    check(problems, len(sales(data_dir)) == lines_before + 1, "delete removed other sale lines")
+
+    ledger = pd.read_csv(inventory_ledger.ledger_path(data_dir), dtype={'Reference': str})
+    restored = ledger[(ledger['Type'] == 'Restore') & (ledger['Reference'] == "000125")]
+    check(problems, not restored.empty, "delete did not record the restored ingredients")
+    return problems
+
+def main(argv=None):
+    """Check the order edits against the stored files"""
+    parser = argparse.ArgumentParser(description="Check saving, editing and deleting orders")
+    parser.add_argument("--size", default="10k", help="Size of the dataset the orders are added to")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "order_edits")
+    os.makedirs(scratch_root, exist_ok=True)
+    data_dir = scratch_copy(ensure_dataset(parse_size(args.size), args.seed), scratch_root)
+    storage.adopt(data_dir, ("*.csv",))
+
+    problems = run_checks(data_dir)
+    for problem in problems:
+        print(f"  {problem}")
+    print(f"  {'order edits consistent' if not problems else f'{len(problems)} problems'}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import pandas as pd
+from theta_core import analytics, archive, data, financial, inventory_ledger, sql
+from benchmarks.bench import environment, scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size, format_size, END_DATE
+
+# Result parity between the analytics engines: every figure the dashboard, the
+# financial KPIs and the per-product profit report is computed by pandas and by
+# DuckDB for several periods and costing methods, on the plain dataset and on a
+# copy whose older months were moved to the Parquet archive. Both engines are
+# timed; any difference beyond float rounding is a failure. So is a total COGS
+# of 0 for a period with sales: engines that agree on zero costs check nothing.
+PERIODS = ("Today", "Last 30 Days", "Last Year", "All Time")
+TOLERANCE = 1e-9
+
+# Result frames are compared by key, since engines may order ties differently
+FRAME_KEYS = {'ingredients': 'Ingredient', 'daily_revenue': 'Date', 'products': 'Product', 'profit': 'Product'}
+
+def same_value(left, right):
+    """Equal strings, or numbers equal up to float rounding"""
+    if isinstance(left, str) or isinstance(right, str):
+        return left == right
+    return math.isclose(float(left), float(right), rel_tol=TOLERANCE, abs_tol=1e-6)
+
+def frame_differences(name, left, right):
+    """Differences between two result frames, matched on their key column"""
+    key = FRAME_KEYS[name]
+    left = left.sort_values(key).reset_index(drop=True)
+    right = right.sort_values(key).reset_index(drop=True)
+    if list(left.columns) != list(right.columns) or list(left[key]) != list(right[key]):
+        return [f"{name}: rows or columns differ"]
+    differences = []
+    for column in left.columns.drop(key):
+        for row, (a, b) in enumerate(zip(left[column], right[column])):
+            if not (pd.isna(a) and pd.isna(b)) and not same_value(a, b):
+                differences.append(f"{name}: {column} of {left[key][row]} is {a} vs {b}")
+    return differences
+
+def dict_differences(name, left, right):
+    """Differences between two KPI dicts"""
+    return [f"{name}: {key} is {left[key]} vs {right.get(key)}"
+            for key in left if key not in right or not same_value(left[key], right[key])]
+
+def run_engine(engine, data_dir, start_date, end_date, costing_method, repeat):
+    """Results of one engine for a period, with the best time over ``repeat`` runs"""
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = analytics.dashboard(data_dir, start_date, end_date, engine)
+        results['financial'] = analytics.financial_kpis(data_dir, start_date, end_date, costing_method, engine)
+        results['profit'] = analytics.product_profit(data_dir, start_date, end_date, costing_method, engine)
+        best = min(best, time.perf_counter() - started)
+    return results, best * 1000
+
+def compare_engines(data_dir, layout, costing_methods, repeat):
+    """Run both engines over every period and costing method"""
+    rows = []
+    for period in PERIODS:
+        start_date, end_date = data.date_range(period, END_DATE.date())
+        for costing_method in costing_methods:
+            expected, pandas_ms = run_engine("pandas", data_dir, start_date, end_date, costing_method, repeat)
+            actual, duckdb_ms = run_engine("duckdb", data_dir, start_date, end_date, costing_method, repeat)
+            differences = dict_differences('kpis', expected['kpis'], actual['kpis'])
+            differences += dict_differences('financial', expected['financial'], actual['financial'])
+            for name in FRAME_KEYS:
+                differences += frame_differences(name, expected[name], actual[name])
+            if expected['kpis']['total_orders'] > 0:
+                differences += [f"financial: total_cogs is 0 ({engine})"
+                                for engine, results in (("pandas", expected), ("duckdb", actual))
+                                if not results['financial']['total_cogs'] > 0]
+            rows.append({'layout': layout, 'period': period, 'costing': costing_method,
+                         'pandas_ms': pandas_ms, 'duckdb_ms': duckdb_ms, 'differences': differences})
+    return rows
+
+def print_rows(rows):
+    """Print timings and the outcome of each comparison"""
+    print(f"{'Layout':<9} {'Period':<13} {'Costing':<20} {'pandas ms':>10} {'duckdb ms':>10}  Result")
+    for row in rows:
+        result = "match" if not row['differences'] else f"{len(row['differences'])} differences"
+        print(f"{row['layout']:<9} {row['period']:<13} {row['costing']:<20} "
+              f"{row['pandas_ms']:>10.1f} {row['duckdb_ms']:>10.1f}  {result}")
+        for difference in row['differences'][:5]:
+            print(f"    {difference}")
+
+def main(argv=None):
+    """Check that the pandas and DuckDB analytics engines agree"""
+    parser = argparse.ArgumentParser(description="Compare pandas and DuckDB analytics results and timings")
+    parser.add_argument("--size", default="10k", help="Size of the generated dataset")
+    parser.add_argument("--archive-days", type=int, default=30,
+                        help="Horizon for the archived copy (months older than this go to Parquet)")
+    parser.add_argument("--costing", default=",".join(financial.COSTING_METHODS),
+                        help="Comma separated costing methods to compare")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per engine; the best time is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "parity.json"), help="Where to write results")
+    args = parser.parse_args(argv)
+    if not sql.available():
+        print("The parity check needs duckdb (pip install duckdb)", file=sys.stderr)
+        return 1
+    import duckdb
+
+    lines = parse_size(args.size)
+    costing_methods = [method.strip() for method in args.costing.split(",")]
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "parity")
+    os.makedirs(scratch_root, exist_ok=True)
+    # Cost stamps are written next to the sales, so both layouts work on copies
+    data_dir = scratch_copy(ensure_dataset(lines, args.seed), scratch_root)
+    purchases = (inventory_ledger.load_ledger(data_dir)['Type'] == 'Addition').sum()
+    if not purchases:
+        print(f"{data_dir} has no purchases in its ledger, so every COGS would be 0", file=sys.stderr)
+        return 1
+    print(f"Costing against {purchases:,} purchases")
+    rows = compare_engines(data_dir, "live", costing_methods, args.repeat)
+
+    layouts = {'live': data_dir}
+    if archive.available():
+        archived_dir = scratch_copy(data_dir, os.path.join(scratch_root, "archived"))
+        moved = archive.archive_sales(archived_dir, args.archive_days, END_DATE.date())
+        print(f"Archived {moved['rows']:,} sale lines into {len(moved['partitions'])} partitions")
+        layouts['archived'] = archived_dir
+        rows += compare_engines(archived_dir, "archived", costing_methods, args.repeat)
+    print_rows(rows)
+
+    report = {
+        'environment': {**environment(), 'duckdb': duckdb.__version__},
+        'settings': {'size': format_size(lines), 'layouts': list(layouts), 'archive_days': args.archive_days,
+                     'costing': costing_methods, 'repeat': args.repeat, 'seed': args.seed},
+        'results': rows
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+    return 1 if any(row['differences'] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
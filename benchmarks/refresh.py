@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from theta_core import notify, orders, storage
+from benchmarks.bench import environment, scratch_copy
+from benchmarks.generate import ensure_dataset, parse_size, format_size
+
+# Change notifications for open pages: subscribers register with
+# theta_core.notify for the files a page fragment draws from, as
+# utils.fragment_run does for a browser session, while orders are saved and
+# costs edited. storage wakes them when it publishes each commit. Every change
+# must wake exactly the subscribers whose files it touched; the time from the
+# start of a save to the wake-up is the freshness an open dashboard gets. The
+# cost of the stamp check a woken fragment makes for a part whose files did
+# not change is timed too.
+SUBSCRIBERS = {
+    'dashboard': ("sales.csv", "products.csv", "product_recipe.csv"),
+    'alerts': ("inventory.csv", "alert_thresholds.csv"),
+    'orders': ("sales.csv",),
+    'costs': ("operational_costs.csv",)
+}
+ALL_FILES = tuple(sorted({name for files in SUBSCRIBERS.values() for name in files}))
+# Wake-ups run on the writer thread as the commit is published; this only
+# leaves room for a late or duplicate one
+SETTLE_SECONDS = 0.05
+ITEMS = [{'Product': 'Latte', 'Quantity': 2, 'Unit_Price': 45000.0, 'Total': 90000.0}]
+
+def save(data_dir, number):
+    """Save one order, as a till does"""
+    when = datetime(2025, 12, 31, 8, 0) + timedelta(minutes=number)
+    orders.save_order(ITEMS, f"RF{number:05d}", when, 0.0, '', data_dir)
+
+def edit_costs(data_dir, number):
+    """Rewrite operational_costs.csv, as a cost edit does"""
+    path = os.path.join(data_dir, "operational_costs.csv")
+    storage.submit(lambda: storage.to_csv(storage.read_csv(path), path, index=False), data_dir)
+
+def check_cost(data_dir, checks):
+    """Microseconds per stamp check of the dashboard's files"""
+    started = time.perf_counter()
+    for _ in range(checks):
+        notify.stamp(data_dir, SUBSCRIBERS['dashboard'])
+    return (time.perf_counter() - started) / checks * 1e6
+
+def run_changes(data_dir, changes, settle):
+    """Make ``changes`` commits and match the wake-ups against the files each touched"""
+    wakes = {name: [] for name in SUBSCRIBERS}
+    for name, files in SUBSCRIBERS.items():
+        notify.subscribe(("refresh", name), data_dir, files, lambda times=wakes[name]: times.append(time.perf_counter()))
+
+    rows = []
+    try:
+        for number in range(changes):
+            change = edit_costs if number % 5 == 4 else save
+            before = notify.stamp(data_dir, ALL_FILES)
+            counts = {name: len(times) for name, times in wakes.items()}
+            started = time.perf_counter()
+            change(data_dir, number)
+            committed = time.perf_counter()
+            time.sleep(settle)
+            after = notify.stamp(data_dir, ALL_FILES)
+            touched = {name for name, old, new in zip(ALL_FILES, before, after) if old != new}
+
+            woken, problems = {}, []
+            for name, files in SUBSCRIBERS.items():
+                new_wakes = wakes[name][counts[name]:]
+                expected = bool(touched & set(files))
+                if new_wakes:
+                    woken[name] = (new_wakes[0] - started) * 1000
+                if expected != bool(new_wakes):
+                    problems.append(f"{name} {'not woken' if expected else 'woken'} by {change.__name__}")
+                elif len(new_wakes) > 1:
+                    problems.append(f"{name} woken {len(new_wakes)} times by {change.__name__}")
+            rows.append({'change': change.__name__, 'touched': sorted(touched),
+                         'commit_ms': (committed - started) * 1000, 'woken_ms': woken, 'problems': problems})
+    finally:
+        for name in SUBSCRIBERS:
+            notify.unsubscribe(("refresh", name))
+    return rows
+
+def summarise(rows):
+    """Median and worst save-to-wake times, and the problems found"""
+    latencies = [ms for row in rows for ms in row['woken_ms'].values()]
+    commits = [row['commit_ms'] for row in rows]
+    return {
+        'changes': len(rows),
+        'commit_p50_ms': statistics.median(commits) if commits else 0.0,
+        'wake_p50_ms': statistics.median(latencies) if latencies else 0.0,
+        'wake_max_ms': max(latencies) if latencies else 0.0,
+        'problems': [problem for row in rows for problem in row['problems']]
+    }
+
+def main(argv=None):
+    """Check and time change notifications"""
+    parser = argparse.ArgumentParser(description="Time change notifications to open pages and check who is woken")
+    parser.add_argument("--size", default="10k", help="Size of the dataset the changes are made to")
+    parser.add_argument("--changes", type=int, default=20, help="Commits to make (every fifth is a cost edit)")
+    parser.add_argument("--checks", type=int, default=10_000, help="Stamp checks to time")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "refresh.json"), help="Where to write results")
+    args = parser.parse_args(argv)
+
+    lines = parse_size(args.size)
+    scratch_root = os.path.join("benchmarks", ".data", "scratch", "refresh")
+    os.makedirs(scratch_root, exist_ok=True)
+    data_dir = scratch_copy(ensure_dataset(lines, args.seed), scratch_root)
+    # Published like data_init does at startup, so every file has a version
+    storage.adopt(data_dir, ("*.csv",))
+
+    check_us = check_cost(data_dir, args.checks)
+    print(f"  unchanged check: {check_us:.1f} us")
+    rows = run_changes(data_dir, args.changes, SETTLE_SECONDS)
+    summary = summarise(rows)
+    print(f"  n={summary['changes']:<4} commit p50 {summary['commit_p50_ms']:7.1f} ms   "
+          f"save to wake p50 {summary['wake_p50_ms']:7.1f} ms   max {summary['wake_max_ms']:7.1f} ms")
+    for problem in summary['problems'][:10]:
+        print(f"    {problem}")
+    failed = bool(summary['problems'])
+    print(f"  {'wake-ups match the files changed' if not failed else 'wrong wake-ups'}")
+
+    report = {
+        'environment': environment(),
+        'settings': {'size': format_size(lines), 'changes': args.changes, 'checks': args.checks, 'seed': args.seed},
+        'check_us': check_us,
+        'summary': summary,
+        'changes': rows
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import streamlit as st
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+from benchmarks.bench import environment, compare, print_comparison
+from benchmarks.generate import ensure_dataset, parse_size, format_size
+
+# End-to-end timings: every page runs through streamlit's AppTest against a
+# generated dataset, the way a browser session would, and each rerun is timed
+# together with the bytes it read and wrote and its peak Python memory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def select(label, value):
+    """Interaction that picks ``value`` in the selectbox labelled ``label``"""
+    def interact(at):
+        next(box for box in at.selectbox if box.label == label).set_value(value)
+    return interact
+
+def click(key):
+    """Interaction that clicks the button with ``key``"""
+    return lambda at: at.button(key=key).click()
+
+def add_item(at):
+    """Pick the first product on the order page and add it to the order"""
+    product = next(box for box in at.selectbox if box.label == "Select Product")
+    product.set_value(product.options[0])
+    at.button(key="add_to_order_btn").click()
+
+# Steps run after the first render of each page, in order. "rerun" reruns
+# without changing anything, which is what every widget interaction costs at least.
+SCENARIOS = {
+    "app.py": [("rerun", None)],
+    "pages/1_dashboard.py": [("rerun", None), ("time_filter", select("Time Period", "All Time"))],
+    "pages/2_order.py": [("add_item", add_item), ("save_order", click("save_order_btn")),
+                         ("time_filter", select("Time Period", "All Time"))],
+    "pages/3_inventory.py": [("rerun", None)],
+    "pages/4_product.py": [("rerun", None)],
+    "pages/5_financial.py": [("rerun", None), ("time_filter", select("Time Period", "All Time"))],
+    "pages/6_map.py": [("rerun", None), ("time_filter", select("Time Period", "Last 30 Days"))],
+    "pages/7_settings.py": [("rerun", None)],
+    "pages/8_sql_console.py": [("rerun", None)]
+}
+
+def page_name(script):
+    """Short label for a script ("pages/2_order.py" -> "2_order")"""
+    return os.path.splitext(os.path.basename(script))[0]
+
+def process_io():
+    """Bytes read and written by this process so far, or None off Linux"""
+    try:
+        with open('/proc/self/io') as file:
+            counters = dict(line.split(': ') for line in file.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def measure(action):
+    """Run one rerun and return its wall time, I/O and peak memory"""
+    io_before = process_io()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    action()
+    wall = time.perf_counter() - start
+
+    io_after = process_io()
+    step = {'wall_s': wall, 'read_bytes': None, 'written_bytes': None, 'peak_memory_bytes': None}
+    if io_before and io_after:
+        step['read_bytes'] = io_after[0] - io_before[0]
+        step['written_bytes'] = io_after[1] - io_before[1]
+    if tracemalloc.is_tracing():
+        step['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+    return step
+
+def run_scenario(script, timeout):
+    """Render a page, then apply its interactions one rerun at a time
+
+    Returns:
+        List of (step name, measurements, exception messages); stops at the first exception
+    """
+    # Caches are cleared so the first render is a cold start, as after a deploy
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=timeout)
+    steps = []
+    for name, interact in [("load", None)] + SCENARIOS[script]:
+        if interact:
+            interact(at)
+        step = measure(at.run)
+        errors = [str(exception.value) for exception in at.exception]
+        steps.append((name, step, errors))
+        if errors:
+            break
+    return steps
+
+def prepare_workspace(data_dir, workspace):
+    """Working directory with a fresh copy of the dataset and the app config"""
+    shutil.rmtree(workspace, ignore_errors=True)
+    shutil.copytree(data_dir, os.path.join(workspace, "data"))
+    config_dir = os.path.join(REPO_ROOT, ".streamlit")
+    if os.path.isdir(config_dir):
+        shutil.copytree(config_dir, os.path.join(workspace, ".streamlit"))
+
+def summarize(script, step_name, lines, samples):
+    """Aggregate repeated measurements of one page step"""
+    timings = [sample['wall_s'] for sample in samples]
+
+    def median_of(field):
+        values = [sample[field] for sample in samples if sample[field] is not None]
+        return int(statistics.median(values)) if values else None
+
+    peaks = [sample['peak_memory_bytes'] for sample in samples if sample['peak_memory_bytes'] is not None]
+    return {
+        'page': page_name(script),
+        'interaction': step_name,
+        'size': format_size(lines),
+        'lines': lines,
+        'runs': timings,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'read_bytes': median_of('read_bytes'),
+        'written_bytes': median_of('written_bytes'),
+        'peak_memory_bytes': max(peaks) if peaks else None
+    }
+
+def format_bytes(value):
+    """Human readable byte count for the progress table"""
+    if value is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+
+def run_suite(sizes, scripts, repeat, seed, timeout, scratch_root, end_date):
+    """Run every page scenario on every dataset size
+
+    Returns:
+        Tuple of (results keyed by "<page>:<interaction>@<size>", failures)
+    """
+    results, failures = {}, []
+    original_dir = os.getcwd()
+    for lines in sizes:
+        data_dir = os.path.abspath(ensure_dataset(lines, seed, end_date=end_date))
+        for script in scripts:
+            samples = {}
+            for _ in range(repeat):
+                # Every repetition starts from the same files, saved orders included
+                workspace = os.path.join(scratch_root, f"render-{format_size(lines)}")
+                prepare_workspace(data_dir, workspace)
+                os.chdir(workspace)
+                try:
+                    steps = run_scenario(script, timeout)
+                finally:
+                    os.chdir(original_dir)
+                for name, step, errors in steps:
+                    samples.setdefault(name, []).append(step)
+                    if errors:
+                        failures.append((f"{page_name(script)}:{name}@{format_size(lines)}", errors[0]))
+
+            for name, page_samples in samples.items():
+                key = f"{page_name(script)}:{name}@{format_size(lines)}"
+                results[key] = summarize(script, name, lines, page_samples)
+                result = results[key]
+                print(f"{key:<36} median {result['median_s'] * 1000:10.1f} ms   "
+                      f"read {format_bytes(result['read_bytes']):>10}   written {format_bytes(result['written_bytes']):>10}   "
+                      f"peak {format_bytes(result['peak_memory_bytes']):>10}")
+    return results, failures
+
+def main(argv=None):
+    """Run the end-to-end page benchmarks"""
+    parser = argparse.ArgumentParser(description="Time full page reruns of the Theta Coffee Lab app on synthetic data")
+    parser.add_argument("--sizes", default="10k,100k", help="Comma separated dataset sizes, e.g. 10k,100k,1M")
+    parser.add_argument("--pages", help="Comma separated page names, e.g. 1_dashboard,2_order (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each page scenario per size")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic datasets")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per rerun")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip peak memory tracking (tracemalloc slows reruns down)")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "render.json"), help="Where to write results")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on any regression")
+    args = parser.parse_args(argv)
+
+    scripts = list(SCENARIOS)
+    if args.pages:
+        wanted = args.pages.split(',')
+        unknown = [name for name in wanted if name not in map(page_name, scripts)]
+        if unknown:
+            parser.error(f"unknown pages: {', '.join(unknown)}")
+        scripts = [script for script in scripts if page_name(script) in wanted]
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+
+    # History ends today so the Today / Last 30 Days views have data to show
+    end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    scratch_root = os.path.abspath(os.path.join("benchmarks", ".data", "scratch"))
+    os.makedirs(scratch_root, exist_ok=True)
+
+    # Every first render is meant to be cold, so no background warm-up
+    os.environ["THETA_WARMUP"] = "0"
+    # Deprecation and bare-mode warnings would drown out the progress table
+    streamlit.logger.set_log_level("error")
+    if not args.no_memory:
+        tracemalloc.start()
+    results, failures = run_suite(sizes, scripts, args.repeat, args.seed, args.timeout, scratch_root, end_date)
+    tracemalloc.stop()
+
+    report = {
+        'environment': environment(),
+        'settings': {'repeat': args.repeat, 'seed': args.seed, 'memory_tracking': not args.no_memory},
+        'results': results,
+        'failures': [{'step': step, 'error': error} for step, error in failures]
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    for step, error in failures:
+        print(f"FAILED {step}: {error}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            rows = compare(report['results'], json.load(file), args.tolerance)
+        print_comparison(rows)
+        if args.fail_on_regression and any(row[4] == 'regression' for row in rows):
+            return 1
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
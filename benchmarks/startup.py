@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Cold start of every script: each one runs once in a fresh interpreter under
+# ``python -X importtime``, as after a container restart, and fails the check
+# when interpreter start, imports and the first render go over the budget.
+# The other benchmark modules are imported in main() only, so that the child
+# process has nothing but streamlit loaded when the script starts.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_SECONDS = float(os.environ.get("THETA_COLD_START_BUDGET", "5") or 5)
+MARKER = "theta-startup: running script"
+
+def run_child(script, timeout):
+    """Child process: import streamlit, then run ``script`` once and print its timings"""
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+    streamlit.logger.set_log_level("error")
+
+    # Imports reported after the marker are the ones the script itself pulls in
+    sys.stderr.write(MARKER + "\n")
+    sys.stderr.flush()
+    at = AppTest.from_file(os.path.join(REPO_ROOT, script), default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    run_s = time.perf_counter() - start
+    print(json.dumps({'run_s': run_s, 'errors': [str(exception.value) for exception in at.exception]}))
+    return 0
+
+def parse_importtime(stderr):
+    """Top-level imports done by the script, as (module, self us, cumulative us)"""
+    imports, started = [], False
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            # Header line
+            continue
+        # Nested imports are indented; only the ones the script asked for are kept
+        if not name[1:].startswith(" "):
+            imports.append((name.strip(), self_us, cumulative_us))
+    return imports
+
+def measure_script(script, workspace, timeout):
+    """Run one script cold and collect its wall time and import report"""
+    from benchmarks.render import page_name
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.startup", "--child", script, "--timeout", str(timeout)],
+        cwd=workspace, env=env, capture_output=True, text=True, timeout=timeout + 60
+    )
+    wall_s = time.perf_counter() - start
+
+    try:
+        child = json.loads(process.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        tail = process.stderr.strip().splitlines()[-1:] or ["no output"]
+        child = {'run_s': None, 'errors': [f"exit status {process.returncode}: {tail[0]}"]}
+
+    imports = parse_importtime(process.stderr)
+    return {
+        'page': page_name(script),
+        'cold_start_s': wall_s,
+        'run_s': child['run_s'],
+        'script_import_s': sum(cumulative for _, _, cumulative in imports) / 1e6,
+        'top_imports': [{'module': name, 'self_s': own / 1e6, 'cumulative_s': cumulative / 1e6}
+                        for name, own, cumulative in sorted(imports, key=lambda row: row[2], reverse=True)[:10]],
+        'errors': child['errors']
+    }
+
+def print_report(results, budget):
+    """Cold start per script, then the heaviest imports each one pulled in"""
+    print(f"{'Page':<14} {'Cold start':>11} {'Imports':>9} {'First run':>10}  Budget {budget:.1f} s")
+    for result in results:
+        run = f"{result['run_s']:.2f} s" if result['run_s'] is not None else "-"
+        status = "OVER" if result['cold_start_s'] > budget else "ok"
+        print(f"{result['page']:<14} {result['cold_start_s']:>9.2f} s {result['script_import_s']:>7.2f} s {run:>10}  {status}")
+
+    print("\nHeaviest imports done by each script (cumulative, -X importtime)")
+    for result in results:
+        heaviest = ", ".join(f"{row['module']} {row['cumulative_s'] * 1000:.0f} ms" for row in result['top_imports'][:5])
+        print(f"  {result['page']:<14} {heaviest or '-'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the cold start time of app.py and every page against a budget")
+    parser.add_argument("--pages", help="Comma separated page names, e.g. app,1_dashboard (default: all)")
+    parser.add_argument("--size", help="Run on a generated dataset of this size, e.g. 10k (default: the repo's data/)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the synthetic dataset")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Seconds allowed from interpreter start to the first rendered page "
+                             "(default: THETA_COLD_START_BUDGET or 5)")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per script")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results", "startup.json"), help="Where to write results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args.child, args.timeout)
+
+    from benchmarks.bench import environment
+    from benchmarks.generate import ensure_dataset, parse_size, format_size
+    from benchmarks.render import SCENARIOS, page_name, prepare_workspace
+
+    scripts = list(SCENARIOS)
+    if args.pages:
+        wanted = args.pages.split(',')
+        unknown = [name for name in wanted if name not in map(page_name, scripts)]
+        if unknown:
+            parser.error(f"unknown pages: {', '.join(unknown)}")
+        scripts = [script for script in scripts if page_name(script) in wanted]
+
+    if args.size:
+        data_dir = os.path.abspath(ensure_dataset(parse_size(args.size), args.seed))
+    else:
+        data_dir = os.path.join(REPO_ROOT, "data")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="theta-startup-") as scratch:
+        for script in scripts:
+            # Every script starts from the same files and with no warm caches
+            workspace = os.path.join(scratch, page_name(script))
+            prepare_workspace(data_dir, workspace)
+            results.append(measure_script(script, workspace, args.timeout))
+
+    print_report(results, args.budget)
+    report = {
+        'environment': environment(),
+        'settings': {'budget_s': args.budget, 'size': format_size(parse_size(args.size)) if args.size else "data/"},
+        'results': results
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    failed = False
+    for result in results:
+        for error in result['errors']:
+            print(f"FAILED {result['page']}: {error}")
+            failed = True
+        if result['cold_start_s'] > args.budget:
+            print(f"OVER BUDGET {result['page']}: {result['cold_start_s']:.2f} s > {args.budget:.1f} s")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
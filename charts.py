@@ -0,0 +1,127 @@
+import streamlit as st
+import threading
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import utils
+import memory_monitor
+from theta_core import tracing, metrics
+
+# Plotly figures shared across reruns and sessions. A figure is built once per
+# (chart kind, versions of the data files it is drawn from, time window, theme)
+# and kept as serialised JSON, so unchanged charts skip plotly.express entirely.
+TEMPLATE = 'custom_ggplot2'
+MAX_FIGURES = 200
+
+# Time series longer than this are downsampled before plotting; a tablet-width
+# chart cannot show more distinct points than it has pixels
+MAX_POINTS = 400
+
+_lock = threading.Lock()
+_state = {'registered': False}
+
+def register_template():
+    """Register the gray ggplot2 template and make it the default (once per process)"""
+    if _state['registered']:
+        return
+    with _lock:
+        if _state['registered']:
+            return
+        # Copy so the stock ggplot2 template stays untouched
+        template = go.layout.Template(pio.templates['ggplot2'])
+        template.layout.update(
+            paper_bgcolor='#F0F0F0',  # Paper background color
+            plot_bgcolor='#F0F0F0',   # Plot background color
+            xaxis=dict(
+                showgrid=True,
+                gridcolor='white',
+                gridwidth=1.5
+            ),
+            yaxis=dict(
+                showgrid=True,
+                gridcolor='white',
+                gridwidth=1.5
+            )
+        )
+        pio.templates[TEMPLATE] = template
+        pio.templates.default = TEMPLATE
+        _state['registered'] = True
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    The first and last points are always kept. Every bucket in between keeps the
+    point forming the largest triangle with the point kept before it and the
+    average of the next bucket, which preserves peaks and dips.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[kept] - avg_x) * (y[start:end] - y[kept])
+                       - (x[kept] - x[start:end]) * (avg_y - y[kept]))
+        kept = start + int(np.argmax(areas))
+        indices[bucket + 1] = kept
+    return indices
+
+def prepare_series(df, x, columns, by=None, max_points=MAX_POINTS, decimals=0, label_format=None):
+    """Trim a time series to what a chart draws
+
+    Keeps only ``x`` and ``columns``, downsamples to ``max_points`` with LTTB on
+    the ``by`` column (default the first of ``columns``), rounds the values to
+    display precision and optionally replaces the dates in ``x`` with labels.
+    """
+    series = df[[x] + list(columns)].sort_values(x).reset_index(drop=True)
+    if len(series) > max_points:
+        positions = pd.to_datetime(series[x]).to_numpy().astype('datetime64[s]').astype(np.int64)
+        series = series.iloc[lttb(positions, series[by or columns[0]].fillna(0), max_points)].reset_index(drop=True)
+
+    for column in columns:
+        values = pd.to_numeric(series[column], errors='coerce').round(decimals)
+        if decimals == 0 and values.notna().all():
+            # Whole numbers serialise as compact integer arrays
+            values = pd.to_numeric(values, downcast='integer')
+        series[column] = values
+
+    if label_format is not None:
+        series[x] = series[x].apply(lambda value: value.strftime(label_format))
+    return series
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False, max_entries=MAX_FIGURES)
+def _figure_json(kind, versions, window, theme, params, _build):
+    """Build a figure once per key and keep it as JSON (``_build`` is not hashed)"""
+    metrics.cache_miss("figures")
+    with tracing.span(f"build {kind}", 'compute'):
+        return _build().to_json()
+
+def figure(kind, datasets, build, window=None, params=()):
+    """Cached Plotly figure
+
+    Args:
+        kind: Name of the chart, unique across pages (e.g. "dashboard.daily_revenue")
+        datasets: Paths of the data files the chart is drawn from
+        build: Function returning the go.Figure, only called on a cache miss
+        window: (start_date, end_date) the chart covers, None if it is not filtered by time
+        params: Other hashable inputs that change the chart (e.g. the costing method)
+    """
+    register_template()
+    metrics.cache_request("figures")
+    versions = tuple(utils.file_version(path) for path in datasets)
+    theme = st.session_state.get('theme', 'light')
+    payload = _figure_json(kind, versions, window, theme, tuple(params), build)
+    with tracing.span(f"load {kind}", 'render'):
+        return pio.from_json(payload, skip_invalid=True)
@@ -1,6 +1,26 @@
 import pandas as pd
 import os
 from datetime import datetime
+import threading
+from theta_core import storage, archive, inventory_ledger
+
+# Files written through theta_core.storage
+DATA_FILES = ("sales.csv", "inventory.csv", "products.csv", "product_recipe.csv", "operational_costs.csv",
+              "inventory_transactions.csv", "inventory_snapshots.csv", "alert_thresholds.csv")
+
+# Files are created and upgraded once per process; app.py runs on every visit
+_lock = threading.Lock()
+_state = {'initialized': False, 'ledger_version': None}
+
+def add_ledger_references():
+    """Storage command adding the Reference column to a ledger written before it existed"""
+    path = "data/inventory_transactions.csv"
+    transactions_df = storage.read_csv(path)
+    # Another process may have upgraded it since the header was checked
+    if 'Reference' in transactions_df.columns:
+        return
+    transactions_df['Reference'] = ''
+    storage.to_csv(transactions_df, path, index=False)
 
 def initialize_data_files():
     """Initialize empty data files if they don't exist"""
@@ -8,6 +28,9 @@ def initialize_data_files():
     if not os.path.exists("data"):
         os.makedirs("data")
     
+    # Finish (or drop) a write that was cut off by a crash or restart
+    storage.recover("data")
+    
     # Initialize inventory.csv with empty dataframe
     if not os.path.exists("data/inventory.csv"):
         inventory_df = pd.DataFrame(columns=['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
@@ -35,5 +58,40 @@ def initialize_data_files():
     
     # Initialize inventory_transactions.csv with empty dataframe
     if not os.path.exists("data/inventory_transactions.csv"):
-        transactions_df = pd.DataFrame(columns=['Date', 'Material', 'Quantity', 'Unit', 'Unit_Cost', 'Total_Cost', 'Type'])
+        transactions_df = pd.DataFrame(columns=inventory_ledger.LEDGER_COLUMNS)
         transactions_df.to_csv("data/inventory_transactions.csv", index=False)
+    else:
+        # Upgrade older ledgers and record an opening balance for stock that
+        # changed before sales were written to the ledger
+        header = pd.read_csv("data/inventory_transactions.csv", nrows=0)
+        if 'Reference' not in header.columns:
+            storage.submit(add_ledger_references, "data")
+            inventory_ledger.reconcile_ledger()
+    
+    # Publish files created or restored outside the writer, so that pinned
+    # reruns keep a version of them when a commit replaces them
+    storage.adopt("data", DATA_FILES + (archive.PARTITION_PATTERN,))
+    
+    # Snapshot the ledger periodically so point-in-time queries only replay the tail
+    inventory_ledger.take_snapshot()
+
+def ledger_version():
+    """Modification time and size of the inventory ledger, None if missing"""
+    try:
+        stat = os.stat("data/inventory_transactions.csv")
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+def initialize_data_files_once():
+    """Run initialize_data_files the first time in this process
+
+    Later calls only check for a due ledger snapshot, and only after the ledger changed.
+    """
+    with _lock:
+        if not _state['initialized']:
+            initialize_data_files()
+            _state['initialized'] = True
+        elif ledger_version() != _state['ledger_version']:
+            inventory_ledger.take_snapshot()
+        _state['ledger_version'] = ledger_version()
@@ -0,0 +1,116 @@
+import streamlit as st
+import os
+import pandas as pd
+import utils
+import memory_monitor
+import theta_core
+from theta_core import metrics, archive, analytics, live, storage
+
+# Parsed data files and period rollups shared by every session, one copy per
+# version (mtime and size) of the files they come from. Callers get their own
+# copy of each frame, so they may modify it freely. 'sales' is the live file
+# only; sales() adds the archived months a period reaches into.
+LOADERS = {
+    'sales': ("sales.csv", theta_core.load_live_sales),
+    'products': ("products.csv", theta_core.load_products),
+    'recipes': ("product_recipe.csv", theta_core.load_recipes),
+    'inventory': ("inventory.csv", theta_core.load_inventory),
+    'operational_costs': ("operational_costs.csv", theta_core.load_operational_costs)
+}
+
+# Files a sales rollup is computed from
+ROLLUP_DATASETS = ('sales', 'products', 'recipes')
+
+def version(name, data_dir="data"):
+    """Version of the file behind dataset ``name``"""
+    return utils.file_version(os.path.join(data_dir, LOADERS[name][0]))
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_table(name, file_version, data_dir):
+    """Parse a data file once per version"""
+    metrics.cache_miss("datasets")
+    return LOADERS[name][1](data_dir)
+
+def load(name, data_dir="data"):
+    """Dataset ``name`` (a key of LOADERS) parsed by its theta_core loader, cached per file version"""
+    metrics.cache_request("datasets")
+    return _cached_table(name, version(name, data_dir), data_dir)
+
+def archive_versions(start_date=None, end_date=None, data_dir="data"):
+    """Archive partitions a period reaches into, with their versions"""
+    return tuple((name, utils.file_version(os.path.join(data_dir, name)))
+                 for name in archive.partitions(data_dir, start_date, end_date))
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_archive(versions, data_dir):
+    """Parse whole archive partitions once per version"""
+    metrics.cache_miss("datasets")
+    return theta_core.load_archived_sales(data_dir, [name for name, _ in versions])
+
+def sales(start_date=None, end_date=None, data_dir="data"):
+    """Live sales, plus the archived months that [start_date, end_date] reaches into
+
+    Rows are not filtered by date; use theta_core.filter_period for that.
+    """
+    live = load('sales', data_dir)
+    versions = archive_versions(start_date, end_date, data_dir)
+    if not versions:
+        return live
+    metrics.cache_request("datasets")
+    archived = _cached_archive(versions, data_dir)
+    if archived.empty:
+        return live
+    return pd.concat([archived, live], ignore_index=True)
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_rollup(versions, start_date, end_date, data_dir, engine):
+    """Dashboard KPIs and chart data for one period, once per version of the source files"""
+    metrics.cache_miss("rollups")
+    if engine != "pandas":
+        # The query engine reads the files itself, so the parsed datasets are left alone
+        return analytics.dashboard(data_dir, start_date, end_date, engine)
+    sales_df = theta_core.filter_period(sales(start_date, end_date, data_dir), start_date, end_date)
+    return analytics.dashboard_figures(sales_df, load('products', data_dir), load('recipes', data_dir))
+
+def sales_rollup(start_date, end_date, data_dir="data"):
+    """Sales KPIs, ingredient usage, daily revenue and units per product for a period
+
+    Computed by the analytics engine chosen with THETA_ENGINE (see theta_core.analytics).
+
+    Returns:
+        Dict with 'kpis', 'ingredients', 'daily_revenue' and 'products' (see analytics.dashboard)
+    """
+    metrics.cache_request("rollups")
+    versions = tuple(version(name, data_dir) for name in ROLLUP_DATASETS)
+    versions += archive_versions(start_date, end_date, data_dir)
+    return _cached_rollup(versions, start_date, end_date, data_dir, analytics.default_engine())
+
+def live_rollup(start_date, end_date, data_dir="data"):
+    """sales_rollup() for this session's live dashboard, kept up to date incrementally
+
+    The session's LiveRollup reads only the sale lines appended since its
+    watermark. It is rebuilt from the full period when sales.csv was
+    rewritten (an edit, delete or archive run), when products, recipes or
+    the archive changed, or for another period.
+
+    Returns:
+        Same dict as sales_rollup
+    """
+    metrics.cache_request("live")
+    watermark = storage.version(os.path.join(data_dir, "sales.csv"))
+    versions = tuple(version(name, data_dir) for name in ROLLUP_DATASETS if name != 'sales')
+    versions += archive_versions(start_date, end_date, data_dir)
+    rollup = st.session_state.get('live_rollup')
+    appended = None
+    if rollup is not None and rollup.matches(start_date, end_date, versions):
+        appended = theta_core.load_appended_sales(data_dir, rollup.watermark)
+    if appended is None:
+        metrics.cache_miss("live")
+        rollup = live.LiveRollup(start_date, end_date, versions)
+        appended = sales(start_date, end_date, data_dir)
+        st.session_state.live_rollup = rollup
+    rollup.add(appended, watermark)
+    return rollup.figures(load('products', data_dir), load('recipes', data_dir))
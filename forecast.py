@@ -0,0 +1,284 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import json
+import os
+import utils
+import theta_core
+import memory_monitor
+from theta_core import metrics, storage
+from inventory_alerts import to_base_units
+
+# Daily ingredient usage (sales x recipe) is rolled up into daily_usage.csv so the
+# forecast only has to process sales added since the last run. usage_state.json
+# records the version of sales.csv (storage.version) the rollup covers and the
+# last day it reaches. While sales.csv is only appended to, the new lines are
+# read on their own and their usage appended; usage adds up, so a day may have
+# several rows per ingredient and readers sum them. A rewrite of sales.csv (an
+# order edited or deleted, sales archived) or a recipe change rebuilds it.
+USAGE_COLUMNS = ['Day', 'Ingredient', 'Quantity']
+FORECAST_COLUMNS = ['Ingredient', 'Stock', 'Unit', 'Daily_Usage', 'Days_Of_Cover',
+                    'Reorder_Point', 'Suggested_Order', 'Status']
+
+FORECAST_METHODS = ["Weighted Recent Average", "Day-of-Week Average"]
+
+# Days projected forward when searching for the stock-out day
+HORIZON_DAYS = 90
+
+def usage_path(data_dir="data"):
+    """Path of the daily ingredient usage rollup"""
+    return os.path.join(data_dir, "daily_usage.csv")
+
+def usage_state_path(data_dir="data"):
+    """Path of the rollup bookkeeping"""
+    return os.path.join(data_dir, "usage_state.json")
+
+def frame_digest(df):
+    """Order-independent fingerprint of a dataframe"""
+    if df.empty:
+        return "0"
+    return str(int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+def bom_matrix(recipe_df):
+    """Product x Ingredient matrix of recipe quantities in base units"""
+    recipe = recipe_df[['Product', 'Ingredient', 'Quantity', 'Unit']].copy()
+    recipe['Quantity'], recipe['Unit'] = to_base_units(recipe['Quantity'], recipe['Unit'])
+    return recipe.pivot_table(index='Product', columns='Ingredient', values='Quantity',
+                              aggfunc='sum', fill_value=0.0)
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_bom(recipe_version, data_dir):
+    """Compile the BOM matrix once per version of the recipes"""
+    metrics.cache_miss("bom")
+    return bom_matrix(storage.read_csv(os.path.join(data_dir, "product_recipe.csv")))
+
+def get_bom_matrix(data_dir="data"):
+    """BOM matrix of product_recipe.csv, cached per file version"""
+    metrics.cache_request("bom")
+    return _cached_bom(utils.file_version(os.path.join(data_dir, "product_recipe.csv")), data_dir)
+
+def rollup_usage(sales, bom):
+    """Turn sale lines into daily usage per ingredient with one matrix product
+
+    Args:
+        sales: Sales with Day, Product and Quantity columns
+        bom: Product x Ingredient matrix from bom_matrix
+
+    Returns:
+        Long dataframe using USAGE_COLUMNS (non-zero usage only)
+    """
+    if sales.empty or bom.empty:
+        return pd.DataFrame(columns=USAGE_COLUMNS)
+
+    daily_sales = sales.pivot_table(index='Day', columns='Product', values='Quantity',
+                                    aggfunc='sum', fill_value=0.0)
+    daily_sales = daily_sales.reindex(columns=bom.index, fill_value=0.0)
+    usage = daily_sales.astype(float) @ bom
+
+    usage = usage.rename_axis(index='Day', columns='Ingredient').stack().rename('Quantity').reset_index()
+    return usage[usage['Quantity'] != 0][USAGE_COLUMNS]
+
+def load_usage_state(data_dir="data"):
+    """Bookkeeping of the rollup, or None if there is none yet"""
+    try:
+        return json.loads(storage.read_bytes(usage_state_path(data_dir)))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def usage_state(sales_version, last_day, recipe_digest):
+    """usage_state.json content for a rollup of sales.csv at ``sales_version``"""
+    return json.dumps({
+        'sales_version': list(sales_version) if sales_version is not None else None,
+        'last_day': str(last_day) if last_day is not None else None,
+        'recipe_digest': recipe_digest
+    }).encode('utf-8')
+
+def covered_version(path):
+    """storage.version of ``path`` for the rollup state; None while this batch has
+    changes to it staged, whose version is not known until they are published"""
+    batch = storage.current_batch()
+    if batch is not None and (path in batch.writes or path in batch.appends):
+        return None
+    return storage.version(path)
+
+def sale_quantities(sales):
+    """Day, Product and numeric Quantity of sale lines"""
+    sales = sales[['Date', 'Product', 'Quantity']].copy()
+    sales['Day'] = sales['Date'].dt.normalize()
+    sales['Quantity'] = pd.to_numeric(sales['Quantity'], errors='coerce').fillna(0)
+    return sales
+
+def _rebuild_command(data_dir, bom, bom_digest):
+    """Storage command that rolls up the whole sales history and writes the rollup and its state"""
+    def rebuild_usage():
+        sales = sale_quantities(theta_core.load_sales(data_dir))
+        recipe_df = storage.read_csv(os.path.join(data_dir, "product_recipe.csv"))
+        recipe_digest = frame_digest(recipe_df)
+        # The recipes may have changed since the caller compiled its BOM
+        usage = rollup_usage(sales, bom if recipe_digest == bom_digest else bom_matrix(recipe_df))
+
+        usage['Day'] = pd.to_datetime(usage['Day'])
+        storage.to_csv(usage, usage_path(data_dir), index=False, date_format='%Y-%m-%d')
+        last_day = sales['Day'].max() if not sales.empty else None
+        sales_version = covered_version(os.path.join(data_dir, "sales.csv"))
+        storage.write_bytes(usage_state(sales_version, last_day, recipe_digest), usage_state_path(data_dir))
+        return usage, sales['Day'].nunique()
+    return rebuild_usage
+
+def _append_command(data_dir, since, sales_version, added, last_day, recipe_digest):
+    """Storage command that appends the usage of the sale lines added after ``since``"""
+    def append_usage():
+        state = load_usage_state(data_dir)
+        covered = tuple(state['sales_version']) if state and state.get('sales_version') else None
+        if covered != since:
+            # Another update got there first; rebuild unless it covers these lines
+            if covered == sales_version:
+                return storage.read_csv(usage_path(data_dir), parse_dates=['Day']), 0
+            return _rebuild_command(data_dir, None, None)()
+        if not added.empty:
+            storage.append_csv(added, usage_path(data_dir), index=False, date_format='%Y-%m-%d')
+        storage.write_bytes(usage_state(sales_version, last_day, recipe_digest), usage_state_path(data_dir))
+        usage = storage.read_csv(usage_path(data_dir), parse_dates=['Day'])
+        return usage, added['Day'].nunique()
+    return append_usage
+
+def update_daily_usage(data_dir="data", force=False):
+    """Bring daily_usage.csv up to date
+
+    Nothing is written while sales.csv and the recipes are unchanged. Lines
+    appended to sales.csv are rolled up on their own and appended; a rewrite
+    of sales.csv, a recipe change or ``force`` rebuilds the rollup from the
+    whole history. The rollup and usage_state.json are written together by one
+    storage command.
+
+    Returns:
+        Tuple of (daily usage dataframe, number of days recomputed)
+    """
+    # Compiled (or taken from the cache) before the command, outside the write lock
+    bom_digest = frame_digest(storage.read_csv(os.path.join(data_dir, "product_recipe.csv")))
+    bom = get_bom_matrix(data_dir)
+    sales_version = storage.version(os.path.join(data_dir, "sales.csv"))
+    state = load_usage_state(data_dir)
+    if not force and state is not None and sales_version is not None \
+            and state.get('recipe_digest') == bom_digest and state.get('sales_version'):
+        since = tuple(state['sales_version'])
+        if since == sales_version:
+            return storage.read_csv(usage_path(data_dir), parse_dates=['Day']), 0
+        appended = theta_core.load_appended_sales(data_dir, since)
+        if appended is not None:
+            added = sale_quantities(appended)
+            usage = rollup_usage(added, bom)
+            usage['Day'] = pd.to_datetime(usage['Day'])
+            days = [pd.Timestamp(day) for day in (state.get('last_day'), added['Day'].max()) if pd.notna(day)]
+            last_day = max(days, default=None)
+            return storage.submit(_append_command(data_dir, since, sales_version, usage, last_day, bom_digest),
+                                  data_dir)
+    return storage.submit(_rebuild_command(data_dir, bom, bom_digest), data_dir)
+
+def project_usage(usage, method, history_days=56, halflife_days=7):
+    """Project daily usage per ingredient over the next HORIZON_DAYS
+
+    Args:
+        usage: Daily usage in long form (USAGE_COLUMNS)
+        method: One of FORECAST_METHODS
+        history_days: Days of history used by the day-of-week average
+        halflife_days: Half-life of the weighted recent average
+
+    Returns:
+        Tuple of (HORIZON_DAYS x Ingredient projection, per-ingredient daily std, as-of day)
+    """
+    # Full calendar up to the latest sales day, with zero usage on quiet days
+    daily = usage.pivot_table(index='Day', columns='Ingredient', values='Quantity', aggfunc='sum')
+    as_of = daily.index.max()
+    daily = daily.reindex(pd.date_range(daily.index.min(), as_of, freq='D'), fill_value=0.0).fillna(0.0)
+
+    future_days = pd.date_range(as_of + pd.Timedelta(days=1), periods=HORIZON_DAYS, freq='D')
+
+    if method == "Day-of-Week Average":
+        recent = daily.iloc[-history_days:]
+        profile = recent.groupby(recent.index.dayofweek).mean()
+        # Weekdays with no history fall back to the overall mean
+        profile = profile.reindex(range(7)).fillna(recent.mean())
+        projection = profile.loc[future_days.dayofweek].set_axis(future_days)
+        spread = recent.std(ddof=0)
+    else:
+        rate = daily.ewm(halflife=halflife_days).mean().iloc[-1]
+        projection = pd.DataFrame(np.tile(rate.to_numpy(), (HORIZON_DAYS, 1)),
+                                  index=future_days, columns=daily.columns)
+        spread = daily.ewm(halflife=halflife_days).std().iloc[-1].fillna(0.0)
+
+    return projection, spread, as_of
+
+def forecast_inventory(inventory_df, usage, method=FORECAST_METHODS[0], lead_time_days=2,
+                       review_days=7, service_z=1.65):
+    """Days of cover, reorder point and suggested order for every ingredient
+
+    Args:
+        inventory_df: Current inventory (Name, Quantity, Unit)
+        usage: Daily usage rollup from update_daily_usage
+        method: One of FORECAST_METHODS
+        lead_time_days: Days between ordering and receiving stock
+        review_days: Days of usage each order should cover after it arrives
+        service_z: Safety stock multiplier on usage variability (1.65 ~ 95% service)
+
+    Returns:
+        Tuple of (forecast dataframe using FORECAST_COLUMNS, as-of day or None)
+    """
+    if inventory_df.empty or usage.empty:
+        return pd.DataFrame(columns=FORECAST_COLUMNS), None
+
+    projection, spread, as_of = project_usage(usage, method)
+
+    stock = inventory_df[['Name', 'Quantity', 'Unit']].drop_duplicates('Name').set_index('Name')
+    stock_base, base_unit = to_base_units(stock['Quantity'], stock['Unit'])
+    names = stock.index
+    projection = projection.reindex(columns=names, fill_value=0.0)
+    spread = spread.reindex(names).fillna(0.0).to_numpy()
+
+    # Stock-out day: first projected day where cumulative usage exceeds stock
+    cumulative = projection.cumsum().to_numpy()
+    on_hand = stock_base.to_numpy(dtype=float)
+    runs_out = cumulative > on_hand
+    days_of_cover = np.where(runs_out.any(axis=0), runs_out.argmax(axis=0), np.inf).astype(float)
+
+    daily_rate = projection.iloc[:lead_time_days + review_days].mean().to_numpy()
+    lead_usage = cumulative[lead_time_days - 1] if lead_time_days > 0 else np.zeros(len(names))
+    cover_usage = cumulative[lead_time_days + review_days - 1]
+    safety_stock = service_z * spread * np.sqrt(max(lead_time_days, 1))
+
+    reorder_point = lead_usage + safety_stock
+    suggested = np.maximum(0.0, cover_usage + safety_stock - on_hand)
+
+    forecast = pd.DataFrame({
+        'Ingredient': names,
+        'Stock': on_hand,
+        'Unit': base_unit.to_numpy(),
+        'Daily_Usage': daily_rate,
+        'Days_Of_Cover': days_of_cover,
+        'Reorder_Point': reorder_point,
+        'Suggested_Order': suggested
+    })
+    forecast['Status'] = np.select(
+        [forecast['Daily_Usage'] <= 0, forecast['Stock'] <= forecast['Reorder_Point']],
+        ['Not used', 'Reorder now'], default='OK'
+    )
+    return forecast.sort_values(['Days_Of_Cover', 'Ingredient']).reset_index(drop=True), as_of
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_forecast(versions, method, lead_time_days, review_days, data_dir):
+    """Update the rollup and forecast once per version of the source files"""
+    metrics.cache_miss("forecast")
+    usage, _ = update_daily_usage(data_dir)
+    inventory_df = storage.read_csv(os.path.join(data_dir, "inventory.csv"))
+    return forecast_inventory(inventory_df, usage, method, lead_time_days, review_days)
+
+def get_forecast(method=FORECAST_METHODS[0], lead_time_days=2, review_days=7, data_dir="data"):
+    """Inventory forecast, cached per version of sales, recipes and inventory"""
+    metrics.cache_request("forecast")
+    versions = tuple(
+        utils.file_version(os.path.join(data_dir, name))
+        for name in ("sales.csv", "product_recipe.csv", "inventory.csv")
+    )
+    return _cached_forecast(versions, method, int(lead_time_days), int(review_days), data_dir)
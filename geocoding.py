@@ -0,0 +1,164 @@
+import streamlit as st
+import memory_monitor
+from theta_core import metrics
+
+# Address to coordinates for the map page: Plus Codes, raw "lat, lon" pairs and
+# known districts are resolved locally, anything else with an online geocoder.
+# Results are shared by every session for an hour.
+
+# Geocoder, created on the first address that is not a Plus Code or coordinates
+@st.cache_resource
+def get_geocoder():
+    """Get a geocoder instance"""
+    from geopy.geocoders import Nominatim, Photon
+    try:
+        # Try Photon first (better with international addresses)
+        return Photon(user_agent="theta_coffee_lab_app")
+    except:
+        # Fall back to Nominatim
+        return Nominatim(user_agent="theta_coffee_lab_app")
+
+# Function to parse Google Plus Codes
+def parse_plus_code(plus_code):
+    """
+    Parse a Google Plus Code and return approximate coordinates
+    
+    The function handles Plus Codes in format like: "QMMW+9Q District 3, Ho Chi Minh City, Vietnam"
+    """
+    # Dictionary of known Plus Codes for Ho Chi Minh City
+    # Format: {plus_code_prefix: (latitude, longitude)}
+    plus_code_map = {
+        # District 1
+        "QMPX": (10.7758, 106.7029),  # District 1 central area
+        
+        # District 3
+        "QMMW": (10.7757, 106.6795),  # District 3 area
+        
+        # Binh Thanh
+        "QPR7": (10.8106, 106.7176),  # Binh Thanh district
+        
+        # Default for Ho Chi Minh City if no specific code matches
+        "HCM_DEFAULT": (10.7756, 106.6842)
+    }
+    
+    # Extract the first 4 characters from the Plus Code (area code)
+    if plus_code and isinstance(plus_code, str):
+        # Extract the area code (first 4 characters)
+        parts = plus_code.split('+')
+        if len(parts) > 0:
+            area_code = parts[0].strip()
+            
+            # Check if we have this area code in our dictionary
+            if area_code in plus_code_map:
+                return plus_code_map[area_code]
+            # For codes starting with Q (Ho Chi Minh City)
+            elif area_code.startswith('Q'):
+                return plus_code_map["HCM_DEFAULT"]
+    
+    return None, None
+
+# Function to geocode addresses - cached to reduce API calls
+@memory_monitor.evictable
+@st.cache_data(ttl=3600)  # Cache for 1 hour
+def geocode_address(address):
+    """Convert address to coordinates using Google Plus Codes or geocoder"""
+    metrics.cache_miss("geocode")
+    if not address:
+        return None, None
+    
+    try:
+        # Ensure address is a string (handle case where it might be a float or other type)
+        if not isinstance(address, str):
+            # Try to convert to string
+            try:
+                address = str(address)
+                # If it's a number (like NaN), return None
+                if address.lower() == 'nan':
+                    return None, None
+            except:
+                return None, None
+        
+        # Skip empty addresses
+        if not address.strip():
+            return None, None
+        
+        # Check if this is a raw latitude,longitude format (e.g., "10.79151055938174, 106.69176363190014")
+        if ',' in address and '.' in address:
+            try:
+                # Split by comma and attempt to parse as lat,lon
+                parts = [p.strip() for p in address.split(',')]
+                if len(parts) == 2:
+                    # Try to convert both parts to float
+                    lat, lon = float(parts[0]), float(parts[1])
+                    
+                    # Validate reasonable lat/lon ranges
+                    if -90 <= lat <= 90 and -180 <= lon <= 180:
+                        # Found valid coordinates
+                        return lat, lon
+            except (ValueError, TypeError):
+                # If parsing fails, continue with other methods
+                pass
+                
+        # Next, check if this is a Google Plus Code (format: XXXX+XX)
+        if '+' in address:
+            # Try to parse as a Plus Code
+            lat, lon = parse_plus_code(address)
+            if lat is not None and lon is not None:
+                return lat, lon
+        
+        # Dictionary of known locations for common Vietnamese addresses
+        # Format: {partial_address: (latitude, longitude)}
+        known_locations = {
+            # Ho Chi Minh City locations
+            "district 3": (10.7756, 106.6842),           # Quận 3
+            "district 1": (10.7758, 106.7029),           # Quận 1
+            "binh thanh": (10.8106, 106.7176),           # Bình Thạnh
+            "ho chi minh city": (10.7756, 106.6842),     # Ho Chi Minh City
+            "vietnam": (16.0544, 108.2022),              # Default for Vietnam
+        }
+        
+        # Check for known locations first (case insensitive)
+        address_lower = address.lower()
+        for key, coords in known_locations.items():
+            if key in address_lower:
+                return coords
+        
+        geocoder = get_geocoder()
+        
+        # Use specific parameters to improve accuracy
+        try:
+            location = geocoder.geocode(
+                address,
+                exactly_one=True,
+                addressdetails=True,
+                language="vi"  # Vietnamese language
+            )
+            if location:
+                return location.latitude, location.longitude
+        except Exception as e:
+            # Silent error handling
+            pass
+        
+        # Fallback: try with English language setting
+        try:
+            location = geocoder.geocode(
+                address,
+                exactly_one=True,
+                addressdetails=True,
+                language="en"
+            )
+            if location:
+                return location.latitude, location.longitude
+        except Exception as e:
+            # Silent error handling
+            pass
+        
+        # If all geocoding attempts fail, return Ho Chi Minh City coordinates
+        # for Vietnamese addresses as a last resort
+        if 'vietnam' in address_lower or 'ho chi minh' in address_lower or 'hcm' in address_lower:
+            return 10.7756, 106.6842  # Default coordinates for HCMC
+            
+        return None, None
+    except Exception:
+        # Silent error handling
+        return None, None
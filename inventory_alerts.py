@@ -0,0 +1,135 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import os
+import utils
+import memory_monitor
+from theta_core import tracing, metrics, storage
+from utils import UNIT_CONVERSIONS
+
+# Thresholds are stored per base unit or per item in alert_thresholds.csv:
+#   Scope = 'Unit' -> Key is a unit (e.g. 'ml'), applies to every item in that unit family
+#   Scope = 'Item' -> Key is an inventory item name and overrides its unit threshold
+THRESHOLD_COLUMNS = ['Scope', 'Key', 'Threshold', 'Unit']
+
+DEFAULT_UNIT_THRESHOLDS = pd.DataFrame([
+    {'Scope': 'Unit', 'Key': 'ml', 'Threshold': 300.0, 'Unit': 'ml'},  # More than 3 coffee drinks
+    {'Scope': 'Unit', 'Key': 'g', 'Threshold': 100.0, 'Unit': 'g'}     # Dry ingredients
+], columns=THRESHOLD_COLUMNS)
+
+ALERT_COLUMNS = ['Name', 'Quantity', 'Unit', 'Quantity_Base', 'Base_Unit', 'Threshold',
+                 'Threshold_Source', 'Coverage', 'Severity']
+
+def thresholds_path(data_dir="data"):
+    """Path of the alert threshold settings"""
+    return os.path.join(data_dir, "alert_thresholds.csv")
+
+def load_thresholds(data_dir="data"):
+    """Load alert thresholds, falling back to the built-in unit defaults"""
+    try:
+        thresholds = storage.read_csv(thresholds_path(data_dir))
+    except FileNotFoundError:
+        thresholds = DEFAULT_UNIT_THRESHOLDS.copy()
+    return thresholds.reindex(columns=THRESHOLD_COLUMNS)
+
+def save_thresholds(thresholds, data_dir="data"):
+    """Save alert thresholds"""
+    thresholds = thresholds.reindex(columns=THRESHOLD_COLUMNS).dropna(subset=['Key', 'Threshold'])
+    def save():
+        storage.to_csv(thresholds, thresholds_path(data_dir), index=False)
+    storage.submit(save, data_dir)
+
+def to_base_units(quantity, unit):
+    """Convert quantities to their base unit (kg -> g, l -> ml) with the conversion table
+
+    Returns:
+        Tuple of (base quantity Series, base unit Series)
+    """
+    unit = unit.astype(str).str.strip().str.lower()
+    base_units = {name: base for name, (base, _) in UNIT_CONVERSIONS.items()}
+    factors = {name: factor for name, (_, factor) in UNIT_CONVERSIONS.items()}
+    base_unit = unit.map(base_units).fillna(unit)
+    base_quantity = pd.to_numeric(quantity, errors='coerce').fillna(0) * unit.map(factors).fillna(1.0)
+    return base_quantity, base_unit
+
+def evaluate_alerts(inventory_df, thresholds_df, default_threshold):
+    """Evaluate every inventory item against its threshold in one pass
+
+    Args:
+        inventory_df: Inventory with Name, Quantity and Unit columns
+        thresholds_df: Per-unit and per-item thresholds (THRESHOLD_COLUMNS)
+        default_threshold: Threshold for units without their own setting (e.g. pcs)
+
+    Returns:
+        Alert dataframe of items at or below threshold, most urgent first
+    """
+    if inventory_df.empty:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    items = inventory_df[['Name', 'Quantity', 'Unit']].copy()
+    items['Quantity_Base'], items['Base_Unit'] = to_base_units(items['Quantity'], items['Unit'])
+
+    # Normalise every threshold to its base unit as well
+    thresholds = thresholds_df.dropna(subset=['Key', 'Threshold']).copy()
+    # (item thresholds without a unit are in the item's own unit)
+    item_units = thresholds['Key'].map(items.drop_duplicates('Name').set_index('Name')['Unit'])
+    default_unit = thresholds['Key'].where(thresholds['Scope'] == 'Unit', item_units)
+    threshold_unit = thresholds['Unit'].fillna(default_unit)
+    thresholds['Threshold_Base'], _ = to_base_units(thresholds['Threshold'], threshold_unit)
+    _, thresholds['Key_Base'] = to_base_units(thresholds['Threshold'], thresholds['Key'])
+    unit_thresholds = thresholds[thresholds['Scope'] == 'Unit'].drop_duplicates('Key_Base', keep='last')
+    item_thresholds = thresholds[thresholds['Scope'] == 'Item'].drop_duplicates('Key', keep='last')
+
+    by_item = items['Name'].map(item_thresholds.set_index('Key')['Threshold_Base'])
+    by_unit = items['Base_Unit'].map(unit_thresholds.set_index('Key_Base')['Threshold_Base'])
+
+    items['Threshold'] = by_item.fillna(by_unit).fillna(float(default_threshold))
+    items['Threshold_Source'] = np.select(
+        [by_item.notna(), by_unit.notna()], ['Item', 'Unit'], default='Default'
+    )
+
+    # Coverage below 1 means the item is under its threshold
+    items['Coverage'] = np.divide(
+        items['Quantity_Base'].to_numpy(dtype=float),
+        items['Threshold'].to_numpy(dtype=float),
+        out=np.full(len(items), np.inf),
+        where=items['Threshold'].to_numpy(dtype=float) > 0
+    )
+    alerts = items[items['Quantity_Base'] <= items['Threshold']].copy()
+    alerts['Severity'] = np.select(
+        [alerts['Quantity_Base'] <= 0, alerts['Coverage'] <= 0.5], ['Out of stock', 'Critical'], default='Low'
+    )
+
+    return alerts.sort_values(['Coverage', 'Name'])[ALERT_COLUMNS].reset_index(drop=True)
+
+@memory_monitor.evictable
+@st.cache_data(show_spinner=False)
+def _cached_alerts(inventory_version, thresholds_version, default_threshold, data_dir):
+    """Evaluate alerts once per inventory/threshold version"""
+    metrics.cache_miss("alerts")
+    try:
+        inventory_df = storage.read_csv(os.path.join(data_dir, "inventory.csv"))
+    except FileNotFoundError:
+        inventory_df = pd.DataFrame(columns=['Name', 'Quantity', 'Unit'])
+    return evaluate_alerts(inventory_df, load_thresholds(data_dir), default_threshold)
+
+def get_inventory_alerts(default_threshold, data_dir="data"):
+    """Ranked low-stock alerts, cached per version of inventory.csv and the thresholds"""
+    metrics.cache_request("alerts")
+    return _cached_alerts(
+        utils.file_version(os.path.join(data_dir, "inventory.csv")),
+        utils.file_version(thresholds_path(data_dir)),
+        float(default_threshold),
+        data_dir
+    )
+
+def render_alerts(alerts):
+    """Show the alert frame the same way on every page"""
+    if alerts.empty:
+        st.success("All inventory items are at healthy levels.")
+        return
+
+    st.warning(f"{len(alerts)} items below recommended threshold!")
+    display = alerts[['Severity', 'Name', 'Quantity', 'Unit', 'Threshold', 'Base_Unit']].copy()
+    display['Threshold'] = display['Threshold'].round(2).astype(str) + ' ' + display['Base_Unit']
+    st.dataframe(display.drop(columns=['Base_Unit']), hide_index=True)
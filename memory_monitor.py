@@ -0,0 +1,187 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import gc
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime
+from theta_core import metrics
+from streamlit.runtime.caching import get_data_cache_stats_provider, get_resource_cache_stats_provider
+
+# Memory accounting for the Settings page and a budget that evicts cached results
+# when the process grows past it, before the container's OOM killer steps in.
+MB = 1024 * 1024
+
+# Budget 0 means no budget; THETA_MEMORY_BUDGET_MB sets the default for new installs
+DEFAULT_BUDGET_MB = int(os.environ.get("THETA_MEMORY_BUDGET_MB", "0") or 0)
+
+# Cached functions that may be cleared to stay within budget, by cache name
+_evictable = {}
+_evictions = deque(maxlen=50)
+_lock = threading.Lock()
+
+EVICTIONS = metrics.counter("theta_cache_evictions_total", "Caches cleared to stay within the memory budget")
+
+def settings_path(data_dir="data"):
+    """Path of the memory settings"""
+    return os.path.join(data_dir, "memory_settings.json")
+
+def load_budget(data_dir="data"):
+    """Memory budget in MB (0 when disabled)"""
+    try:
+        with open(settings_path(data_dir)) as file:
+            return int(json.load(file).get('budget_mb', DEFAULT_BUDGET_MB))
+    except (FileNotFoundError, json.JSONDecodeError, ValueError, TypeError):
+        return DEFAULT_BUDGET_MB
+
+def save_budget(budget_mb, data_dir="data"):
+    """Save the memory budget in MB (0 disables it)"""
+    with open(settings_path(data_dir), 'w') as file:
+        json.dump({'budget_mb': int(budget_mb)}, file)
+
+def evictable(cached_func):
+    """Register an st.cache_data / st.cache_resource function the budget may clear"""
+    wrapped = getattr(cached_func, '__wrapped__', cached_func)
+    _evictable[f"{wrapped.__module__}.{wrapped.__qualname__}"] = cached_func
+    return cached_func
+
+def resident_bytes():
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # Peak rather than current size, but the best available off Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+def cache_sizes():
+    """Bytes held by every st.cache_data and st.cache_resource function, largest first"""
+    rows = []
+    for kind, provider in (("Data", get_data_cache_stats_provider()), ("Resource", get_resource_cache_stats_provider())):
+        for stats in provider.get_stats().values():
+            for stat in stats:
+                rows.append({'Cache': stat.cache_name, 'Kind': kind, 'Bytes': stat.byte_length,
+                             'Evictable': stat.cache_name in _evictable})
+    caches = pd.DataFrame(rows, columns=['Cache', 'Kind', 'Bytes', 'Evictable'])
+    return caches.sort_values('Bytes', ascending=False).reset_index(drop=True)
+
+def deep_size(obj, seen=None):
+    """Approximate deep size of an object in bytes (dataframes use pandas deep memory usage)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+def session_state_sizes():
+    """Deep size of every value in this session's st.session_state, largest first"""
+    rows = [{'Key': key, 'Type': type(value).__name__, 'Bytes': deep_size(value)}
+            for key, value in st.session_state.items()]
+    sizes = pd.DataFrame(rows, columns=['Key', 'Type', 'Bytes'])
+    return sizes.sort_values('Bytes', ascending=False).reset_index(drop=True)
+
+def dataset_sizes(data_dir="data"):
+    """File size and in-memory size of every CSV in the data directory once loaded"""
+    rows = []
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith('.csv'):
+            continue
+        path = os.path.join(data_dir, name)
+        try:
+            frame = pd.read_csv(path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError):
+            continue
+        rows.append({'Dataset': name, 'Rows': len(frame), 'File_Bytes': os.path.getsize(path),
+                     'Memory_Bytes': int(frame.memory_usage(deep=True, index=True).sum())})
+    sizes = pd.DataFrame(rows, columns=['Dataset', 'Rows', 'File_Bytes', 'Memory_Bytes'])
+    return sizes.sort_values('Memory_Bytes', ascending=False).reset_index(drop=True)
+
+def object_counts(limit=20):
+    """Most common live object types tracked by the garbage collector"""
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return pd.DataFrame(counts.most_common(limit), columns=['Type', 'Count'])
+
+def top_allocations(limit=15):
+    """Source lines holding the most memory since tracemalloc started"""
+    if not tracemalloc.is_tracing():
+        return pd.DataFrame(columns=['Location', 'Bytes', 'Blocks'])
+    statistics = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+    ]).statistics('lineno')
+    return pd.DataFrame(
+        [{'Location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+          'Bytes': stat.size, 'Blocks': stat.count} for stat in statistics[:limit]],
+        columns=['Location', 'Bytes', 'Blocks']
+    )
+
+def enforce_budget(data_dir="data"):
+    """Clear cached results, largest first, while the process is over its budget
+
+    Returns:
+        Names of the caches that were cleared (empty when within budget)
+    """
+    budget_mb = load_budget(data_dir)
+    before = resident_bytes()
+    if not budget_mb or before is None or before <= budget_mb * MB:
+        return []
+
+    with _lock:
+        evicted = []
+        for cache in cache_sizes().itertuples():
+            cached_func = _evictable.get(cache.Cache)
+            if cached_func is None or cache.Bytes == 0:
+                continue
+            cached_func.clear()
+            evicted.append(cache.Cache)
+            gc.collect()
+            if resident_bytes() <= budget_mb * MB:
+                break
+        else:
+            # Still over budget: drop every cached data result
+            st.cache_data.clear()
+            gc.collect()
+            evicted.append("all st.cache_data caches")
+
+        EVICTIONS.inc(len(evicted))
+        _evictions.append({
+            'Time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'Resident_Before': before,
+            'Resident_After': resident_bytes(),
+            'Budget': budget_mb * MB,
+            'Evicted': ", ".join(evicted)
+        })
+    return evicted
+
+metrics.gauge("theta_process_resident_bytes", "Resident memory of the app process", resident_bytes)
+metrics.gauge("theta_memory_budget_bytes", "Configured memory budget (0 when off)", lambda: load_budget() * MB)
+
+def eviction_log():
+    """Recent budget evictions, newest first"""
+    return pd.DataFrame(list(reversed(_evictions)),
+                        columns=['Time', 'Resident_Before', 'Resident_After', 'Budget', 'Evicted'])
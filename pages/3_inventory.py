@@ -1,558 +1,665 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.io as pio
 import datetime
 import utils
+import charts
+from theta_core import storage, inventory_ledger
+import inventory_alerts
+import forecast
 
 # Initialize session_state
 utils.initialize_session_state()
+with utils.page_run("3_inventory"):
+    # Gray ggplot2 chart template, registered once per process
+    charts.register_template()
 
-# Set default template to ggplot2
-pio.templates.default = 'ggplot2'
+    st.set_page_config(page_title="Inventory Management", page_icon="📦", layout="wide")
 
-# Create custom ggplot2 template with gray background and grid
-custom_ggplot2_template = pio.templates['ggplot2']
-custom_ggplot2_template.layout.update(
-    paper_bgcolor='#F0F0F0',  # Paper background color
-    plot_bgcolor='#F0F0F0',   # Plot background color
-    xaxis=dict(
-        showgrid=True,
-        gridcolor='white',
-        gridwidth=1.5
-    ),
-    yaxis=dict(
-        showgrid=True,
-        gridcolor='white',
-        gridwidth=1.5
-    )
-)
-pio.templates['custom_ggplot2'] = custom_ggplot2_template
-pio.templates.default = 'custom_ggplot2'
+    st.title("Inventory Management")
+    st.subheader("Track and manage inventory items")
 
-st.set_page_config(page_title="Inventory Management", page_icon="📦", layout="wide")
+    def add_inventory():
+        """Add new inventory items"""
+        try:
+            # Validate input
+            if not material_name or material_name.isspace():
+                st.error("Please enter a valid material name")
+                return
+                
+            if add_quantity <= 0:
+                st.error("Quantity must be greater than zero")
+                return
+            
+            def add():
+                # Load current inventory
+                try:
+                    inventory_df = storage.read_csv("data/inventory.csv")
+                except FileNotFoundError:
+                    inventory_df = pd.DataFrame(columns=['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
+                
+                # Find the item if it exists
+                if material_name in inventory_df['Name'].values:
+                    # Update existing material
+                    idx = inventory_df[inventory_df['Name'] == material_name].index[0]
+                    current_qty = inventory_df.loc[idx, 'Quantity']
+                    current_avg_cost = inventory_df.loc[idx, 'Avg_Cost']
+                    
+                    # Calculate new average cost
+                    new_total_value = (current_qty * current_avg_cost) + (add_quantity * unit_cost)
+                    new_total_qty = current_qty + add_quantity
+                    new_avg_cost = new_total_value / new_total_qty if new_total_qty > 0 else unit_cost
+                    
+                    # Update the inventory
+                    inventory_df.loc[idx, 'Quantity'] = new_total_qty
+                    inventory_df.loc[idx, 'Avg_Cost'] = new_avg_cost
+                    inventory_df.loc[idx, 'Date'] = inventory_date.strftime('%Y-%m-%d')
+                    
+                    message = f"Updated {material_name} inventory: added {add_quantity} {unit}"
+                else:
+                    # Add new material - using loc to avoid concat warnings
+                    new_id = len(inventory_df) + 1
+                    
+                    # Create a new row index
+                    new_idx = len(inventory_df)
+                    
+                    # Use DataFrame.loc to add the new row
+                    inventory_df.loc[new_idx] = [
+                        new_id,
+                        material_name,
+                        add_quantity,
+                        unit,
+                        unit_cost,
+                        inventory_date.strftime('%Y-%m-%d')
+                    ]
+                    
+                    message = f"Added new material: {material_name}"
+                
+                # Save updated inventory
+                storage.to_csv(inventory_df, "data/inventory.csv", index=False)
+                
+                # Record the purchase in the inventory ledger
+                inventory_ledger.append_movements([{
+                    'Date': inventory_date.strftime('%Y-%m-%d'),
+                    'Material': material_name,
+                    'Quantity': add_quantity,
+                    'Unit': unit,
+                    'Unit_Cost': unit_cost,
+                    'Total_Cost': add_quantity * unit_cost,
+                    'Type': 'Addition'
+                }])
+                return message
+            
+            st.success(storage.submit(add))
+            
+            # After successful add, refresh the form/page
+            st.rerun()
+            
+        except Exception as e:
+            st.error(f"Error adding inventory: {str(e)}")
+            
+    def delete_inventory_item(item_id):
+        """Delete an inventory item"""
+        try:
+            def delete():
+                # Load current inventory
+                try:
+                    inventory_df = storage.read_csv("data/inventory.csv")
+                except FileNotFoundError:
+                    raise storage.Rejected("No inventory data found")
+                    
+                if inventory_df.empty:
+                    raise storage.Rejected("Inventory is empty")
+                    
+                # Find the item
+                if item_id not in inventory_df['ID'].values:
+                    raise storage.Rejected(f"Item ID {item_id} not found in inventory")
+                    
+                # Get item details for confirmation message
+                item_row = inventory_df[inventory_df['ID'] == item_id].iloc[0]
+                item_name = item_row['Name']
+                
+                # Delete the item
+                inventory_df = inventory_df[inventory_df['ID'] != item_id].reset_index(drop=True)
+                
+                # Reindex IDs to maintain sequence
+                inventory_df['ID'] = range(1, len(inventory_df) + 1)
+                
+                # Save updated inventory
+                storage.to_csv(inventory_df, "data/inventory.csv", index=False)
+                
+                # Record the deletion in the inventory ledger
+                inventory_ledger.append_movements([{
+                    'Date': inventory_ledger.timestamp(),
+                    'Material': item_name,
+                    'Quantity': 0,  # Quantity is 0 for deletion
+                    'Unit': "",     # Empty unit for deletion
+                    'Unit_Cost': 0,
+                    'Total_Cost': 0,
+                    'Type': 'Deletion'
+                }])
+                return item_name
+            
+            st.success(f"Deleted inventory item: {storage.submit(delete)}")
+            
+            # After successful delete, refresh the form/page
+            st.rerun()
+            
+        except storage.Rejected as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Error deleting inventory item: {str(e)}")
+            
+    def edit_inventory_item(item_id, new_name, new_unit, new_quantity, new_cost, new_date):
+        """Edit an inventory item"""
+        try:
+            def edit():
+                # Load current inventory
+                try:
+                    inventory_df = storage.read_csv("data/inventory.csv")
+                except FileNotFoundError:
+                    raise storage.Rejected("No inventory data found")
+                    
+                if inventory_df.empty:
+                    raise storage.Rejected("Inventory is empty")
+                    
+                # Find the item
+                if item_id not in inventory_df['ID'].values:
+                    raise storage.Rejected(f"Item ID {item_id} not found in inventory")
+                
+                # Get original item details for recording changes
+                item_idx = inventory_df[inventory_df['ID'] == item_id].index[0]
+                old_item = inventory_df.loc[item_idx].copy()
+                
+                # Update the item
+                inventory_df.loc[item_idx, 'Name'] = new_name
+                inventory_df.loc[item_idx, 'Unit'] = new_unit
+                inventory_df.loc[item_idx, 'Quantity'] = new_quantity
+                inventory_df.loc[item_idx, 'Avg_Cost'] = new_cost
+                inventory_df.loc[item_idx, 'Date'] = new_date.strftime('%Y-%m-%d')
+                
+                # Save updated inventory
+                storage.to_csv(inventory_df, "data/inventory.csv", index=False)
+                
+                # Record the edit in the inventory ledger (Reference keeps the old name on rename)
+                inventory_ledger.append_movements([{
+                    'Date': inventory_ledger.timestamp(),
+                    'Material': new_name,
+                    'Quantity': new_quantity,
+                    'Unit': new_unit,
+                    'Unit_Cost': new_cost,
+                    'Total_Cost': new_quantity * new_cost,
+                    'Type': 'Edit',
+                    'Reference': old_item['Name'] if old_item['Name'] != new_name else ''
+                }])
+            
+            storage.submit(edit)
+            st.success(f"Updated inventory item: {new_name}")
+            
+            # After successful edit, refresh the form/page
+            st.rerun()
+            
+        except storage.Rejected as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Error editing inventory item: {str(e)}")
+
+    def import_invoice(invoice_df, invoice_date):
+        """Import a multi-line supplier invoice as one inventory update"""
+        try:
+            # Drop empty lines from the editor/upload
+            invoice_df = invoice_df.dropna(subset=['Material'])
+            invoice_df = invoice_df[invoice_df['Material'].astype(str).str.strip() != ""]
+
+            if invoice_df.empty:
+                st.error("Invoice has no lines to import")
+                return
 
-st.title("Inventory Management")
-st.subheader("Track and manage inventory items")
+            quantities = pd.to_numeric(invoice_df['Quantity'], errors='coerce')
+            if quantities.isna().any() or (quantities <= 0).any():
+                st.error("Every invoice line needs a quantity greater than zero")
+                return
+
+            def import_lines():
+                # Load current data once for the whole invoice
+                try:
+                    inventory_df = storage.read_csv("data/inventory.csv")
+                except FileNotFoundError:
+                    inventory_df = pd.DataFrame(columns=['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
+
+                inventory_df, transactions, materials = utils.apply_purchases(inventory_df, invoice_df, invoice_date)
+
+                # Write one inventory update and append one transaction batch
+                storage.to_csv(inventory_df, "data/inventory.csv", index=False)
+                inventory_ledger.append_movements(transactions)
+
+                # Refresh COGS only for products that use the purchased materials
+                try:
+                    products_df = storage.read_csv("data/products.csv")
+                    recipe_df = storage.read_csv("data/product_recipe.csv")
+                    products_df, refreshed = utils.refresh_product_cogs(products_df, recipe_df, inventory_df, materials)
+                    if refreshed:
+                        storage.to_csv(products_df, "data/products.csv", index=False)
+                except FileNotFoundError:
+                    refreshed = []
+                return transactions, materials, refreshed
+
+            transactions, materials, refreshed = storage.submit(import_lines)
+            st.success(f"Imported {len(transactions)} invoice lines for {len(materials)} materials. "
+                       f"Updated COGS for {len(refreshed)} products.")
+
+            # Clear the editor and refresh the page after a successful import
+            st.session_state.pop('invoice_editor', None)
+            st.rerun()
+
+        except storage.Rejected as e:
+            st.error(str(e))
+        except Exception as e:
+            st.error(f"Error importing invoice: {str(e)}")
 
-def add_inventory():
-    """Add new inventory items"""
     try:
-        # Validate input
-        if not material_name or material_name.isspace():
-            st.error("Please enter a valid material name")
-            return
-            
-        if add_quantity <= 0:
-            st.error("Quantity must be greater than zero")
-            return
+        # Ensure data directory exists
+        utils.ensure_data_dir()
         
-        # Load current inventory
+        # Initialize session state variables
+        utils.initialize_session_state()
+            
+        # Load inventory data
         try:
-            inventory_df = pd.read_csv("data/inventory.csv")
+            inventory_df = storage.read_csv("data/inventory.csv")
         except FileNotFoundError:
             inventory_df = pd.DataFrame(columns=['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
+            storage.to_csv(inventory_df, "data/inventory.csv", index=False)
         
-        # Find the item if it exists
-        if material_name in inventory_df['Name'].values:
-            # Update existing material
-            idx = inventory_df[inventory_df['Name'] == material_name].index[0]
-            current_qty = inventory_df.loc[idx, 'Quantity']
-            current_avg_cost = inventory_df.loc[idx, 'Avg_Cost']
-            
-            # Calculate new average cost
-            new_total_value = (current_qty * current_avg_cost) + (add_quantity * unit_cost)
-            new_total_qty = current_qty + add_quantity
-            new_avg_cost = new_total_value / new_total_qty if new_total_qty > 0 else unit_cost
-            
-            # Update the inventory
-            inventory_df.loc[idx, 'Quantity'] = new_total_qty
-            inventory_df.loc[idx, 'Avg_Cost'] = new_avg_cost
-            inventory_df.loc[idx, 'Date'] = inventory_date.strftime('%Y-%m-%d')
-            
-            message = f"Updated {material_name} inventory: added {add_quantity} {unit}"
-        else:
-            # Add new material - using loc to avoid concat warnings
-            new_id = len(inventory_df) + 1
-            
-            # Create a new row index
-            new_idx = len(inventory_df)
-            
-            # Use DataFrame.loc to add the new row
-            inventory_df.loc[new_idx] = [
-                new_id,
-                material_name,
-                add_quantity,
-                unit,
-                unit_cost,
-                inventory_date.strftime('%Y-%m-%d')
-            ]
-            
-            message = f"Added new material: {material_name}"
+        # Form for adding inventory
+        st.header("Add Inventory Items")
         
-        # Save updated inventory
-        inventory_df.to_csv("data/inventory.csv", index=False)
-        st.success(message)
+        col1, col2 = st.columns(2)
         
-        # Record transaction in inventory_transactions.csv
-        try:
-            trans_df = pd.read_csv("data/inventory_transactions.csv")
-        except FileNotFoundError:
-            trans_df = pd.DataFrame(columns=['Date', 'Material', 'Quantity', 'Unit', 'Unit_Cost', 'Total_Cost', 'Type'])
-        
-        # Add transaction - using loc instead of concat
-        new_idx = len(trans_df)
-        trans_df.loc[new_idx] = [
-            inventory_date.strftime('%Y-%m-%d'),
-            material_name,
-            add_quantity,
-            unit,
-            unit_cost,
-            add_quantity * unit_cost,
-            'Addition'
-        ]
-        
-        trans_df.to_csv("data/inventory_transactions.csv", index=False)
-        
-        # After successful add, refresh the form/page
-        st.rerun()
-        
-    except Exception as e:
-        st.error(f"Error adding inventory: {str(e)}")
-        
-def delete_inventory_item(item_id):
-    """Delete an inventory item"""
-    try:
-        # Load current inventory
-        try:
-            inventory_df = pd.read_csv("data/inventory.csv")
-        except FileNotFoundError:
-            st.error("No inventory data found")
-            return
+        with col1:
+            # Option to switch between select and manual input
+            input_method = st.radio(
+                "Material Input Method",
+                ["Select from list", "Enter manually"],
+                horizontal=True
+            )
             
-        if inventory_df.empty:
-            st.error("Inventory is empty")
-            return
+            if input_method == "Enter manually":
+                # Direct text input for material name
+                material_name = st.text_input("Material Name", value="")
+                if not material_name.strip():
+                    st.warning("Please enter a material name")
+                    material_name = ""  # Prevent empty names by using empty string which won't match any existing material
+            else:
+                # Select from existing options
+                existing_materials = inventory_df['Name'].unique().tolist() if not inventory_df.empty else []
+                default_materials = ["Coffee Beans", "Fresh Milk", "Sugar", "Plastic Cup", "Paper Cup", "Syrup"]
+                
+                # Combine and remove duplicates while preserving order
+                all_materials = []
+                for item in existing_materials + default_materials:
+                    if item not in all_materials:
+                        all_materials.append(item)
+                
+                if not all_materials:
+                    all_materials = ["Coffee Beans"]  # Default if no materials exist
+                    
+                material_name = st.selectbox(
+                    "Material Name", 
+                    options=all_materials,
+                    index=0
+                )
             
-        # Find the item
-        if item_id not in inventory_df['ID'].values:
-            st.error(f"Item ID {item_id} not found in inventory")
-            return
+            # Unit selection
+            unit_options = ["g", "ml", "pcs", "kg", "l"]
+            if not inventory_df.empty and material_name in inventory_df['Name'].values:
+                default_unit = inventory_df[inventory_df['Name'] == material_name]['Unit'].values[0]
+                unit_index = unit_options.index(default_unit) if default_unit in unit_options else 0
+            else:
+                unit_index = 0
             
-        # Get item details for confirmation message
-        item_row = inventory_df[inventory_df['ID'] == item_id].iloc[0]
-        item_name = item_row['Name']
-        
-        # Delete the item
-        inventory_df = inventory_df[inventory_df['ID'] != item_id].reset_index(drop=True)
-        
-        # Reindex IDs to maintain sequence
-        inventory_df['ID'] = range(1, len(inventory_df) + 1)
-        
-        # Save updated inventory
-        inventory_df.to_csv("data/inventory.csv", index=False)
-        
-        # Record transaction in inventory_transactions.csv
-        try:
-            trans_df = pd.read_csv("data/inventory_transactions.csv")
-        except FileNotFoundError:
-            trans_df = pd.DataFrame(columns=['Date', 'Material', 'Quantity', 'Unit', 'Unit_Cost', 'Total_Cost', 'Type'])
-        
-        # Add deletion transaction - using loc instead of concat
-        new_idx = len(trans_df)
-        trans_df.loc[new_idx] = [
-            datetime.datetime.now().strftime('%Y-%m-%d'),
-            item_name,
-            0,  # Quantity is 0 for deletion
-            "",  # Empty unit for deletion
-            0,   # Unit cost is 0 for deletion
-            0,   # Total cost is 0 for deletion
-            'Deletion'
-        ]
-        
-        trans_df.to_csv("data/inventory_transactions.csv", index=False)
-        
-        st.success(f"Deleted inventory item: {item_name}")
-        
-        # After successful delete, refresh the form/page
-        st.rerun()
+            unit = st.selectbox("Unit", options=unit_options, index=unit_index)
         
-    except Exception as e:
-        st.error(f"Error deleting inventory item: {str(e)}")
-        
-def edit_inventory_item(item_id, new_name, new_unit, new_quantity, new_cost, new_date):
-    """Edit an inventory item"""
-    try:
-        # Load current inventory
-        try:
-            inventory_df = pd.read_csv("data/inventory.csv")
-        except FileNotFoundError:
-            st.error("No inventory data found")
-            return
+        with col2:
+            # Quantity input
+            add_quantity = st.number_input("Purchase Quantity", min_value=0.0, value=500.0, step=50.0)
             
-        if inventory_df.empty:
-            st.error("Inventory is empty")
-            return
+            # Cost input - now for total purchase
+            total_purchase_cost = st.number_input("Purchase Cost (VND)", min_value=0.0, value=100000.0, step=10000.0)
             
-        # Find the item
-        if item_id not in inventory_df['ID'].values:
-            st.error(f"Item ID {item_id} not found in inventory")
-            return
-        
-        # Get original item details for recording changes
-        item_idx = inventory_df[inventory_df['ID'] == item_id].index[0]
-        old_item = inventory_df.loc[item_idx].copy()
-        
-        # Update the item
-        inventory_df.loc[item_idx, 'Name'] = new_name
-        inventory_df.loc[item_idx, 'Unit'] = new_unit
-        inventory_df.loc[item_idx, 'Quantity'] = new_quantity
-        inventory_df.loc[item_idx, 'Avg_Cost'] = new_cost
-        inventory_df.loc[item_idx, 'Date'] = new_date.strftime('%Y-%m-%d')
-        
-        # Save updated inventory
-        inventory_df.to_csv("data/inventory.csv", index=False)
-        
-        # Record transaction in inventory_transactions.csv
-        try:
-            trans_df = pd.read_csv("data/inventory_transactions.csv")
-        except FileNotFoundError:
-            trans_df = pd.DataFrame(columns=['Date', 'Material', 'Quantity', 'Unit', 'Unit_Cost', 'Total_Cost', 'Type'])
-        
-        # Add edit transaction
-        new_idx = len(trans_df)
-        trans_df.loc[new_idx] = [
-            datetime.datetime.now().strftime('%Y-%m-%d'),
-            new_name,
-            new_quantity,
-            new_unit,
-            new_cost,
-            new_quantity * new_cost,
-            'Edit'
-        ]
-        
-        trans_df.to_csv("data/inventory_transactions.csv", index=False)
-        
-        st.success(f"Updated inventory item: {new_name}")
+            # Calculate unit cost from total purchase
+            unit_cost = total_purchase_cost / add_quantity if add_quantity > 0 else 0
+            
+            # Date selection
+            inventory_date = st.date_input("Date", datetime.datetime.now())
         
-        # After successful edit, refresh the form/page
-        st.rerun()
+        # Display calculated unit cost and total
+        st.info(f"Unit Cost: {utils.format_currency(unit_cost)} per {unit}")
+        st.info(f"Total Purchase Cost: {utils.format_currency(total_purchase_cost)}")
         
-    except Exception as e:
-        st.error(f"Error editing inventory item: {str(e)}")
+        # Add inventory button
+        if st.button("Add to Inventory"):
+            add_inventory()
 
-try:
-    # Ensure data directory exists
-    utils.ensure_data_dir()
-    
-    # Initialize session state variables
-    utils.initialize_session_state()
-        
-    # Load inventory data
-    try:
-        inventory_df = pd.read_csv("data/inventory.csv")
-    except FileNotFoundError:
-        inventory_df = pd.DataFrame(columns=['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
-        inventory_df.to_csv("data/inventory.csv", index=False)
-    
-    # Form for adding inventory
-    st.header("Add Inventory Items")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Option to switch between select and manual input
-        input_method = st.radio(
-            "Material Input Method",
-            ["Select from list", "Enter manually"],
-            horizontal=True
-        )
+        # Bulk import of a supplier invoice
+        with st.expander("Import Supplier Invoice"):
+            st.write("Enter each invoice line or upload a CSV with columns: Material, Quantity, Unit, Total_Cost")
+
+            invoice_file = st.file_uploader("Upload Invoice (CSV)", type="csv", key="invoice_upload")
+
+            if invoice_file is not None:
+                invoice_df = pd.read_csv(invoice_file)
+                st.dataframe(invoice_df)
+            else:
+                invoice_df = st.data_editor(
+                    pd.DataFrame({
+                        'Material': pd.Series(dtype='str'),
+                        'Quantity': pd.Series(dtype='float'),
+                        'Unit': pd.Series(dtype='str'),
+                        'Total_Cost': pd.Series(dtype='float')
+                    }),
+                    num_rows="dynamic",
+                    column_config={
+                        'Unit': st.column_config.SelectboxColumn("Unit", options=["g", "ml", "pcs", "kg", "l"]),
+                        'Total_Cost': st.column_config.NumberColumn("Total Cost (VND)", min_value=0.0)
+                    },
+                    key="invoice_editor"
+                )
+
+            invoice_date = st.date_input("Invoice Date", datetime.datetime.now(), key="invoice_date")
+
+            missing_cols = {'Material', 'Quantity', 'Unit', 'Total_Cost'} - set(invoice_df.columns)
+            if missing_cols:
+                st.error(f"Invoice is missing columns: {', '.join(sorted(missing_cols))}")
+            elif st.button("Import Invoice"):
+                import_invoice(invoice_df, invoice_date)
+
+        # Display current inventory
+        st.header("Current Inventory")
         
-        if input_method == "Enter manually":
-            # Direct text input for material name
-            material_name = st.text_input("Material Name", value="")
-            if not material_name.strip():
-                st.warning("Please enter a material name")
-                material_name = ""  # Prevent empty names by using empty string which won't match any existing material
-        else:
-            # Select from existing options
-            existing_materials = inventory_df['Name'].unique().tolist() if not inventory_df.empty else []
-            default_materials = ["Coffee Beans", "Fresh Milk", "Sugar", "Plastic Cup", "Paper Cup", "Syrup"]
-            
-            # Combine and remove duplicates while preserving order
-            all_materials = []
-            for item in existing_materials + default_materials:
-                if item not in all_materials:
-                    all_materials.append(item)
-            
-            if not all_materials:
-                all_materials = ["Coffee Beans"]  # Default if no materials exist
+        if not inventory_df.empty:
+            # Format inventory table for display
+            display_df = inventory_df.copy()
+            display_df['Total Value'] = display_df['Quantity'] * display_df['Avg_Cost']
+            
+            # Format columns
+            display_df['Avg_Cost'] = display_df['Avg_Cost'].apply(utils.format_currency)
+            display_df['Total Value'] = display_df['Total Value'].apply(utils.format_currency)
+            
+            # Rearrange and display
+            columns_to_show = ['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Total Value', 'Date']
+            st.dataframe(display_df[columns_to_show])
+            
+            # Add management options
+            st.subheader("Manage Inventory Items")
+            
+            # Create columns for management actions
+            manage_col1, manage_col2 = st.columns([1, 3])
+            
+            with manage_col1:
+                # Selection dropdown for item to manage
+                selected_item_id = st.selectbox(
+                    "Select Item ID", 
+                    options=inventory_df['ID'].tolist(),
+                    format_func=lambda x: f"ID: {x} - {inventory_df[inventory_df['ID']==x]['Name'].values[0]}"
+                )
+            
+            with manage_col2:
+                # Display information about selected item
+                selected_item = inventory_df[inventory_df['ID'] == selected_item_id].iloc[0]
+                st.write(f"Selected: **{selected_item['Name']}** ({selected_item['Quantity']} {selected_item['Unit']})")
                 
-            material_name = st.selectbox(
-                "Material Name", 
-                options=all_materials,
-                index=0
-            )
-        
-        # Unit selection
-        unit_options = ["g", "ml", "pcs", "kg", "l"]
-        if not inventory_df.empty and material_name in inventory_df['Name'].values:
-            default_unit = inventory_df[inventory_df['Name'] == material_name]['Unit'].values[0]
-            unit_index = unit_options.index(default_unit) if default_unit in unit_options else 0
-        else:
-            unit_index = 0
-        
-        unit = st.selectbox("Unit", options=unit_options, index=unit_index)
-    
-    with col2:
-        # Quantity input
-        add_quantity = st.number_input("Purchase Quantity", min_value=0.0, value=500.0, step=50.0)
-        
-        # Cost input - now for total purchase
-        total_purchase_cost = st.number_input("Purchase Cost (VND)", min_value=0.0, value=100000.0, step=10000.0)
-        
-        # Calculate unit cost from total purchase
-        unit_cost = total_purchase_cost / add_quantity if add_quantity > 0 else 0
-        
-        # Date selection
-        inventory_date = st.date_input("Date", datetime.datetime.now())
-    
-    # Display calculated unit cost and total
-    st.info(f"Unit Cost: {utils.format_currency(unit_cost)} per {unit}")
-    st.info(f"Total Purchase Cost: {utils.format_currency(total_purchase_cost)}")
-    
-    # Add inventory button
-    if st.button("Add to Inventory"):
-        add_inventory()
-    
-    # Display current inventory
-    st.header("Current Inventory")
-    
-    if not inventory_df.empty:
-        # Format inventory table for display
-        display_df = inventory_df.copy()
-        display_df['Total Value'] = display_df['Quantity'] * display_df['Avg_Cost']
-        
-        # Format columns
-        display_df['Avg_Cost'] = display_df['Avg_Cost'].apply(utils.format_currency)
-        display_df['Total Value'] = display_df['Total Value'].apply(utils.format_currency)
-        
-        # Rearrange and display
-        columns_to_show = ['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Total Value', 'Date']
-        st.dataframe(display_df[columns_to_show])
-        
-        # Add management options
-        st.subheader("Manage Inventory Items")
-        
-        # Create columns for management actions
-        manage_col1, manage_col2 = st.columns([1, 3])
-        
-        with manage_col1:
-            # Selection dropdown for item to manage
-            selected_item_id = st.selectbox(
-                "Select Item ID", 
-                options=inventory_df['ID'].tolist(),
-                format_func=lambda x: f"ID: {x} - {inventory_df[inventory_df['ID']==x]['Name'].values[0]}"
-            )
-        
-        with manage_col2:
-            # Display information about selected item
-            selected_item = inventory_df[inventory_df['ID'] == selected_item_id].iloc[0]
-            st.write(f"Selected: **{selected_item['Name']}** ({selected_item['Quantity']} {selected_item['Unit']})")
-            
-            # Initialize session state for editing
-            if 'edit_mode' not in st.session_state:
-                st.session_state.edit_mode = False
-            
-            # Action buttons - wrapped in columns for layout
-            action_col1, action_col2 = st.columns(2)
-            
-            with action_col1:
-                # Edit button
-                edit_button = st.button("✏️ Edit Item", key="edit_btn")
-                if edit_button:
-                    st.session_state.edit_mode = True
-                    
-            with action_col2:
-                # Delete button
-                delete_button = st.button("🗑️ Delete Item", key="delete_btn")
-                if delete_button:
-                    # Show confirmation dialog using session state
-                    st.session_state.delete_confirmation = True
-            
-            # Show delete confirmation outside of the columns
-            if st.session_state.get('delete_confirmation', False):
-                st.warning(f"Are you sure you want to delete {selected_item['Name']}?")
-                confirm_col1, confirm_col2 = st.columns(2)
-                with confirm_col1:
-                    if st.button("✓ Yes, Delete", key="confirm_delete"):
-                        delete_inventory_item(selected_item_id)
-                with confirm_col2:
-                    if st.button("✗ Cancel", key="cancel_delete"):
-                        st.session_state.delete_confirmation = False
-                        st.rerun()
-            
-            # Show edit form if in edit mode
-            if st.session_state.edit_mode:
-                st.write("---")
-                st.subheader(f"Edit Item: {selected_item['Name']}")
+                # Initialize session state for editing
+                if 'edit_mode' not in st.session_state:
+                    st.session_state.edit_mode = False
                 
-                edit_col1, edit_col2 = st.columns(2)
+                # Action buttons - wrapped in columns for layout
+                action_col1, action_col2 = st.columns(2)
                 
-                with edit_col1:
-                    # Edit name
-                    edit_name = st.text_input("Material Name", value=selected_item['Name'], key="edit_name")
-                    
-                    # Edit unit
-                    unit_options = ["g", "ml", "pcs", "kg", "l"]
-                    current_unit_index = unit_options.index(selected_item['Unit']) if selected_item['Unit'] in unit_options else 0
-                    edit_unit = st.selectbox("Unit", options=unit_options, index=current_unit_index, key="edit_unit")
+                with action_col1:
+                    # Edit button
+                    edit_button = st.button("✏️ Edit Item", key="edit_btn")
+                    if edit_button:
+                        st.session_state.edit_mode = True
+                        
+                with action_col2:
+                    # Delete button
+                    delete_button = st.button("🗑️ Delete Item", key="delete_btn")
+                    if delete_button:
+                        # Show confirmation dialog using session state
+                        st.session_state.delete_confirmation = True
                 
-                with edit_col2:
-                    # Edit quantity
-                    edit_quantity = st.number_input("Quantity", min_value=0.0, value=selected_item['Quantity'], step=10.0, key="edit_quantity")
+                # Show delete confirmation outside of the columns
+                if st.session_state.get('delete_confirmation', False):
+                    st.warning(f"Are you sure you want to delete {selected_item['Name']}?")
+                    confirm_col1, confirm_col2 = st.columns(2)
+                    with confirm_col1:
+                        if st.button("✓ Yes, Delete", key="confirm_delete"):
+                            delete_inventory_item(selected_item_id)
+                    with confirm_col2:
+                        if st.button("✗ Cancel", key="cancel_delete"):
+                            st.session_state.delete_confirmation = False
+                            st.rerun()
+                
+                # Show edit form if in edit mode
+                if st.session_state.edit_mode:
+                    st.write("---")
+                    st.subheader(f"Edit Item: {selected_item['Name']}")
+                    
+                    edit_col1, edit_col2 = st.columns(2)
                     
-                    # Edit cost
-                    edit_cost = st.number_input("Cost per Unit (VND)", min_value=0.0, value=selected_item['Avg_Cost'], step=1000.0, key="edit_cost")
+                    with edit_col1:
+                        # Edit name
+                        edit_name = st.text_input("Material Name", value=selected_item['Name'], key="edit_name")
+                        
+                        # Edit unit
+                        unit_options = ["g", "ml", "pcs", "kg", "l"]
+                        current_unit_index = unit_options.index(selected_item['Unit']) if selected_item['Unit'] in unit_options else 0
+                        edit_unit = st.selectbox("Unit", options=unit_options, index=current_unit_index, key="edit_unit")
                     
-                    # Edit date
-                    try:
-                        original_date = datetime.datetime.strptime(selected_item['Date'], '%Y-%m-%d').date()
-                    except:
-                        original_date = datetime.datetime.now().date()
+                    with edit_col2:
+                        # Edit quantity
+                        edit_quantity = st.number_input("Quantity", min_value=0.0, value=selected_item['Quantity'], step=10.0, key="edit_quantity")
                         
-                    edit_date = st.date_input("Last Updated", value=original_date, key="edit_date")
+                        # Edit cost
+                        edit_cost = st.number_input("Cost per Unit (VND)", min_value=0.0, value=selected_item['Avg_Cost'], step=1000.0, key="edit_cost")
+                        
+                        # Edit date
+                        try:
+                            original_date = datetime.datetime.strptime(selected_item['Date'], '%Y-%m-%d').date()
+                        except:
+                            original_date = datetime.datetime.now().date()
+                            
+                        edit_date = st.date_input("Last Updated", value=original_date, key="edit_date")
+                    
+                    # Total value calculation
+                    edit_total_value = edit_quantity * edit_cost
+                    st.info(f"Total Value: {utils.format_currency(edit_total_value)}")
+                    
+                    # Save and Cancel buttons
+                    save_col1, save_col2 = st.columns(2)
+                    
+                    with save_col1:
+                        if st.button("💾 Save Changes", key="save_edit"):
+                            edit_inventory_item(
+                                selected_item_id,
+                                edit_name,
+                                edit_unit,
+                                edit_quantity,
+                                edit_cost,
+                                edit_date
+                            )
+                            
+                    with save_col2:
+                        if st.button("❌ Cancel", key="cancel_edit"):
+                            st.session_state.edit_mode = False
+                            st.rerun()
+            
+            # Calculate total inventory value
+            total_inventory_value = (inventory_df['Quantity'] * inventory_df['Avg_Cost']).sum()
+            st.subheader(f"Total Inventory Value: {utils.format_currency(total_inventory_value)}")
+            
+            # Inventory visualization
+            st.header("Inventory Visualization")
+            
+            # Group inventory by unit type
+            if not inventory_df.empty:
+                # Extract base unit types (remove numbers)
+                inventory_df['Unit_Group'] = inventory_df['Unit'].str.lower().replace({'kg': 'g', 'l': 'ml'})
                 
-                # Total value calculation
-                edit_total_value = edit_quantity * edit_cost
-                st.info(f"Total Value: {utils.format_currency(edit_total_value)}")
+                # Get unique unit groups
+                unit_groups = sorted(inventory_df['Unit_Group'].unique())
                 
-                # Save and Cancel buttons
-                save_col1, save_col2 = st.columns(2)
+                # Create tabs for each unit group
+                tabs = st.tabs([unit.upper() for unit in unit_groups])
                 
-                with save_col1:
-                    if st.button("💾 Save Changes", key="save_edit"):
-                        edit_inventory_item(
-                            selected_item_id,
-                            edit_name,
-                            edit_unit,
-                            edit_quantity,
-                            edit_cost,
-                            edit_date
-                        )
+                # Display inventory by unit group
+                for i, unit in enumerate(unit_groups):
+                    with tabs[i]:
+                        unit_data = inventory_df[inventory_df['Unit_Group'] == unit].copy()
                         
-                with save_col2:
-                    if st.button("❌ Cancel", key="cancel_edit"):
-                        st.session_state.edit_mode = False
-                        st.rerun()
-        
-        # Calculate total inventory value
-        total_inventory_value = (inventory_df['Quantity'] * inventory_df['Avg_Cost']).sum()
-        st.subheader(f"Total Inventory Value: {utils.format_currency(total_inventory_value)}")
+                        if not unit_data.empty:
+                            # Bar chart for this unit group, cached per inventory version
+                            def build_unit_levels():
+                                import plotly.express as px
+                                # Sort the data from smallest to largest quantity
+                                return px.bar(
+                                    unit_data.sort_values('Quantity'),
+                                    x='Name',
+                                    y='Quantity',
+                                    color='Name',
+                                    labels={'Name': 'Material', 'Quantity': f'Quantity ({unit})'},
+                                    title=f"Inventory Levels - {unit.upper()} Units"
+                                )
+                            
+                            fig = charts.figure("inventory.levels", ["data/inventory.csv"], build_unit_levels,
+                                                params=(unit,))
+                            utils.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.info(f"No inventory items with unit type: {unit}")
+            
+            # Intelligent low inventory alerts with category-based thresholds
+            st.header("Inventory Alerts")
+            
+            # Ranked alerts shared with the Dashboard, cached per inventory version
+            inventory_alerts.render_alerts(inventory_alerts.get_inventory_alerts(st.session_state.alert_threshold))
+
+            # Usage-based forecast: how long stock lasts at the current sales pace
+            st.subheader("Days of Cover & Reorder Points")
+            fc_col1, fc_col2, fc_col3 = st.columns(3)
+            with fc_col1:
+                forecast_method = st.selectbox("Usage Estimate", forecast.FORECAST_METHODS,
+                                               help="Weighted Recent Average favours the last few weeks; "
+                                                    "Day-of-Week Average follows the weekly pattern")
+            with fc_col2:
+                lead_time_days = st.number_input("Supplier Lead Time (days)", min_value=0, max_value=30, value=2)
+            with fc_col3:
+                review_days = st.number_input("Order Covers (days)", min_value=1, max_value=30, value=7)
+
+            try:
+                forecast_df, as_of = forecast.get_forecast(forecast_method, lead_time_days, review_days)
+                if forecast_df.empty:
+                    st.info("Not enough sales history to forecast ingredient usage yet.")
+                else:
+                    st.caption(f"Based on sales up to {as_of.strftime('%Y-%m-%d')}")
+                    reorder_count = int((forecast_df['Status'] == 'Reorder now').sum())
+                    if reorder_count:
+                        st.warning(f"{reorder_count} ingredients are at or below their reorder point.")
+
+                    display_forecast = forecast_df.copy()
+                    display_forecast['Days_Of_Cover'] = display_forecast['Days_Of_Cover'].apply(
+                        lambda days: f"{forecast.HORIZON_DAYS}+" if days == float('inf') else f"{days:.0f}"
+                    )
+                    st.dataframe(
+                        display_forecast.round({'Stock': 1, 'Daily_Usage': 2, 'Reorder_Point': 1, 'Suggested_Order': 1}),
+                        column_config={
+                            'Daily_Usage': "Daily Usage",
+                            'Days_Of_Cover': "Days of Cover",
+                            'Reorder_Point': "Reorder Point",
+                            'Suggested_Order': "Suggested Order"
+                        },
+                        hide_index=True
+                    )
+            except Exception as e:
+                st.error(f"Error forecasting inventory usage: {e}")
+        else:
+            st.info("No inventory data available. Please add items.")
         
-        # Inventory visualization
-        st.header("Inventory Visualization")
+        # Inventory transactions
+        st.header("Recent Inventory Transactions")
         
-        # Group inventory by unit type
-        if not inventory_df.empty:
-            # Extract base unit types (remove numbers)
-            inventory_df['Unit_Group'] = inventory_df['Unit'].str.lower().replace({'kg': 'g', 'l': 'ml'})
+        try:
+            trans_df = storage.read_csv("data/inventory_transactions.csv")
+            trans_df['Date'] = pd.to_datetime(trans_df['Date'], format='mixed')
             
-            # Get unique unit groups
-            unit_groups = sorted(inventory_df['Unit_Group'].unique())
+            # Filter by movement type
+            movement_types = st.multiselect(
+                "Movement Types",
+                options=inventory_ledger.MOVEMENT_TYPES,
+                default=inventory_ledger.MOVEMENT_TYPES
+            )
+            trans_df = trans_df[trans_df['Type'].isin(movement_types)]
             
-            # Create tabs for each unit group
-            tabs = st.tabs([unit.upper() for unit in unit_groups])
+            # Sort by date (most recent first)
+            trans_df = trans_df.sort_values('Date', ascending=False, kind='stable')
             
-            # Display inventory by unit group
-            for i, unit in enumerate(unit_groups):
-                with tabs[i]:
-                    unit_data = inventory_df[inventory_df['Unit_Group'] == unit].copy()
-                    
-                    if not unit_data.empty:
-                        # Sort the data from smallest to largest quantity
-                        unit_data = unit_data.sort_values('Quantity')
-                        
-                        # Bar chart for this unit group
-                        fig = px.bar(
-                            unit_data,
-                            x='Name',
-                            y='Quantity',
-                            color='Name',
-                            labels={'Name': 'Material', 'Quantity': f'Quantity ({unit})'},
-                            title=f"Inventory Levels - {unit.upper()} Units"
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.info(f"No inventory items with unit type: {unit}")
-        
-        # Intelligent low inventory alerts with category-based thresholds
-        st.header("Inventory Alerts")
-        
-        # Define thresholds by unit type
-        thresholds = {
-            'ml': 300.0,  # For liquid ingredients (more than 3 coffee drinks)
-            'g': 100.0,   # For dry ingredients
-            'pcs': st.session_state.alert_threshold  # Use general threshold for pieces
-        }
-        
-        # Track low inventory items
-        low_inventory_items = []
-        
-        # Check each inventory item against its appropriate threshold
-        for idx, row in inventory_df.iterrows():
-            unit_type = row['Unit'].lower()
-            # Convert units to base units
-            if unit_type == 'l':
-                unit_type = 'ml'
-                threshold = thresholds['ml'] * 1000  # Convert to ml
-            elif unit_type == 'kg':
-                unit_type = 'g'
-                threshold = thresholds['g'] * 1000  # Convert to g
-            else:
-                # Handle standard units
-                threshold = thresholds.get(unit_type, st.session_state.alert_threshold)
-            
-            # Check if below threshold
-            if row['Quantity'] <= threshold:
-                low_inventory_items.append({
-                    'Name': row['Name'],
-                    'Quantity': row['Quantity'],
-                    'Unit': row['Unit'],
-                    'Threshold': threshold
-                })
-        
-        # Display low inventory alerts
-        if low_inventory_items:
-            st.warning(f"{len(low_inventory_items)} items below recommended threshold!")
+            # Format for display
+            display_trans = trans_df.head(10).copy()
+            display_trans['Date'] = display_trans['Date'].dt.strftime('%Y-%m-%d %H:%M')
+            display_trans['Unit_Cost'] = display_trans['Unit_Cost'].apply(utils.format_currency)
+            display_trans['Total_Cost'] = display_trans['Total_Cost'].apply(utils.format_currency)
             
-            for item in low_inventory_items:
-                st.info(f"{item['Name']}: {item['Quantity']} {item['Unit']} remaining (threshold: {item['Threshold']} {item['Unit']})")
-        else:
-            st.success("All inventory items are at healthy levels.")
-    else:
-        st.info("No inventory data available. Please add items.")
-    
-    # Inventory transactions
-    st.header("Recent Inventory Transactions")
-    
-    try:
-        trans_df = pd.read_csv("data/inventory_transactions.csv")
-        trans_df['Date'] = pd.to_datetime(trans_df['Date'])
-        
-        # Sort by date (most recent first)
-        trans_df = trans_df.sort_values('Date', ascending=False)
+            st.dataframe(display_trans)
+        except FileNotFoundError:
+            st.info("No transaction history available yet")
         
-        # Format for display
-        display_trans = trans_df.copy()
-        display_trans['Date'] = display_trans['Date'].dt.strftime('%Y-%m-%d')
-        display_trans['Unit_Cost'] = display_trans['Unit_Cost'].apply(utils.format_currency)
-        display_trans['Total_Cost'] = display_trans['Total_Cost'].apply(utils.format_currency)
+        # Point-in-time stock and ledger consistency
+        st.header("Stock History")
         
-        st.dataframe(display_trans.head(10))
-    except FileNotFoundError:
-        st.info("No transaction history available yet")
+        with st.expander("Stock at a Point in Time"):
+            history_col1, history_col2 = st.columns(2)
+            with history_col1:
+                history_date = st.date_input("Date", datetime.datetime.now(), key="history_date")
+            with history_col2:
+                history_time = st.time_input("Time", datetime.time(23, 59), key="history_time")
+            
+            if st.button("Show Stock", key="show_stock_btn"):
+                history_df = inventory_ledger.stock_at(datetime.datetime.combine(history_date, history_time))
+                if history_df.empty:
+                    st.info("No stock recorded at that time")
+                else:
+                    history_df['Total Value'] = (history_df['Quantity'] * history_df['Avg_Cost']).apply(utils.format_currency)
+                    history_df['Avg_Cost'] = history_df['Avg_Cost'].apply(utils.format_currency)
+                    st.dataframe(history_df, hide_index=True)
+        
+        with st.expander("Check Inventory Against Ledger"):
+            st.write("Current inventory is derived from the ledger of stock movements. "
+                     "Use these tools to verify it or rebuild it.")
+            
+            check_col1, check_col2, check_col3 = st.columns(3)
+            with check_col1:
+                if st.button("Verify Inventory", key="verify_inventory_btn"):
+                    mismatches = inventory_ledger.verify_inventory()
+                    if mismatches.empty:
+                        st.success("Inventory matches the ledger")
+                    else:
+                        st.warning(f"{len(mismatches)} items differ from the ledger")
+                        st.dataframe(mismatches, hide_index=True)
+            with check_col2:
+                if st.button("Rebuild Inventory from Ledger", key="rebuild_inventory_btn"):
+                    inventory_ledger.rebuild_inventory(write=True)
+                    st.success("Inventory rebuilt from the ledger")
+                    st.rerun()
+            with check_col3:
+                if st.button("Reconcile Ledger to Inventory", key="reconcile_ledger_btn"):
+                    appended = inventory_ledger.reconcile_ledger()
+                    st.success(f"Recorded {appended} reconciling movements")
+            
+            if st.button("Take Snapshot Now", key="snapshot_btn"):
+                if inventory_ledger.take_snapshot(force=True):
+                    st.success("Snapshot saved")
+                else:
+                    st.info("Latest snapshot is already up to date")
 
-except Exception as e:
-    st.error(f"Error loading inventory data: {str(e)}")
-    st.write("Please check that your data files exist and are properly formatted.")
+    except Exception as e:
+        st.error(f"Error loading inventory data: {str(e)}")
+        st.write("Please check that your data files exist and are properly formatted.")
@@ -2,172 +2,392 @@ import streamlit as st
 import pandas as pd
 import os
 import utils
+from theta_core import tracing, metrics, archive
+import inventory_alerts
+import profiling
+import memory_monitor
+import warmup
+import tracemalloc
 
 # Initialize session_state
 utils.initialize_session_state()
+with utils.page_run("7_settings"):
+    st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
 
-st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
-
-st.title("Settings")
-st.subheader("Configure application preferences")
-
-# Function to toggle theme
-def toggle_theme():
-    # Toggle the theme between light and dark
-    current_theme = st.session_state.get('theme', 'light')
-    new_theme = 'dark' if current_theme == 'light' else 'light'
-    
-    # Update the theme in session state
-    st.session_state.theme = new_theme
-    
-    # Update config.toml file with new theme
-    theme_config = {
-        'light': {
-            'primaryColor': "#FF4B4B",
-            'backgroundColor': "#FFFFFF",
-            'secondaryBackgroundColor': "#F0F2F6",
-            'textColor': "#262730"
-        },
-        'dark': {
-            'primaryColor': "#FF4B4B",
-            'backgroundColor': "#0E1117",
-            'secondaryBackgroundColor': "#262730",
-            'textColor': "#FAFAFA"
+    st.title("Settings")
+    st.subheader("Configure application preferences")
+
+    # Function to toggle theme
+    def toggle_theme():
+        # Toggle the theme between light and dark
+        current_theme = st.session_state.get('theme', 'light')
+        new_theme = 'dark' if current_theme == 'light' else 'light'
+        
+        # Update the theme in session state
+        st.session_state.theme = new_theme
+        
+        # Update config.toml file with new theme
+        theme_config = {
+            'light': {
+                'primaryColor': "#FF4B4B",
+                'backgroundColor': "#FFFFFF",
+                'secondaryBackgroundColor': "#F0F2F6",
+                'textColor': "#262730"
+            },
+            'dark': {
+                'primaryColor': "#FF4B4B",
+                'backgroundColor': "#0E1117",
+                'secondaryBackgroundColor': "#262730",
+                'textColor': "#FAFAFA"
+            }
         }
-    }
-    
-    # Get the current theme configuration
-    selected_theme = theme_config[new_theme]
-    
-    # Update config.toml
-    with open('.streamlit/config.toml', 'r') as file:
-        config_content = file.read()
-    
-    # Replace theme section
-    import re
-    theme_section = f"""[theme]
+        
+        # Get the current theme configuration
+        selected_theme = theme_config[new_theme]
+        
+        # Update config.toml
+        with open('.streamlit/config.toml', 'r') as file:
+            config_content = file.read()
+        
+        # Replace theme section
+        import re
+        theme_section = f"""[theme]
 primaryColor = "{selected_theme['primaryColor']}"
 backgroundColor = "{selected_theme['backgroundColor']}"
 secondaryBackgroundColor = "{selected_theme['secondaryBackgroundColor']}"
 textColor = "{selected_theme['textColor']}"
 font = "sans serif"
 """
-    
-    # Check if theme section exists and replace it
-    if '[theme]' in config_content:
-        pattern = r'\[theme\].*?(?=\[|\Z)'
-        config_content = re.sub(pattern, theme_section, config_content, flags=re.DOTALL)
-    else:
-        # Add theme section if it doesn't exist
-        config_content += "\n" + theme_section
-    
-    # Write updated config back to file
-    with open('.streamlit/config.toml', 'w') as file:
-        file.write(config_content)
-    
-    st.success(f"Theme changed to {new_theme.capitalize()} Mode! Refresh your browser to see the changes.")
-
-# Save settings function
-def save_settings():
-    st.session_state.currency = currency
-    st.session_state.alert_threshold = alert_threshold
-    st.session_state.default_time_filter = default_time_filter
-    st.session_state.username = username
-    st.session_state.theme = theme_mode
-    st.success("Settings saved successfully!")
-
-# Settings form
-st.header("Application Settings")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    # Inventory alert threshold
-    alert_threshold = st.number_input(
-        "Inventory Alert Threshold",
-        min_value=1.0,  # Ensure all numeric values are float
-        value=float(st.session_state.alert_threshold),
-        step=1.0,
-        help="Set the minimum inventory level that will trigger alerts"
-    )
-    
-    # Currency selection
-    currency_options = ["VND", "USD"]
-    currency = st.selectbox(
-        "Currency",
-        options=currency_options,
-        index=currency_options.index(st.session_state.currency),
-        help="Select the currency to display throughout the application"
-    )
+        
+        # Check if theme section exists and replace it
+        if '[theme]' in config_content:
+            pattern = r'\[theme\].*?(?=\[|\Z)'
+            config_content = re.sub(pattern, theme_section, config_content, flags=re.DOTALL)
+        else:
+            # Add theme section if it doesn't exist
+            config_content += "\n" + theme_section
+        
+        # Write updated config back to file
+        with open('.streamlit/config.toml', 'w') as file:
+            file.write(config_content)
+        
+        st.success(f"Theme changed to {new_theme.capitalize()} Mode! Refresh your browser to see the changes.")
 
-with col2:
-    # Default time filter
-    time_filter_options = ["Today", "Last 7 Days", "Last 30 Days"]
-    default_time_filter = st.selectbox(
-        "Default Time Filter",
-        options=time_filter_options,
-        index=time_filter_options.index(st.session_state.default_time_filter),
-        help="Set the default time filter for reports and dashboard"
-    )
-    
-    # Username
-    username = st.text_input(
-        "Username",
-        value=st.session_state.username,
-        help="Enter your name or username for the application"
+    # Save settings function
+    def save_settings():
+        st.session_state.currency = currency
+        st.session_state.alert_threshold = alert_threshold
+        st.session_state.default_time_filter = default_time_filter
+        st.session_state.username = username
+        st.session_state.theme = theme_mode
+        st.success("Settings saved successfully!")
+
+    # Settings form
+    st.header("Application Settings")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Inventory alert threshold
+        alert_threshold = st.number_input(
+            "Inventory Alert Threshold",
+            min_value=1.0,  # Ensure all numeric values are float
+            value=float(st.session_state.alert_threshold),
+            step=1.0,
+            help="Set the minimum inventory level that will trigger alerts"
+        )
+        
+        # Currency selection
+        currency_options = ["VND", "USD"]
+        currency = st.selectbox(
+            "Currency",
+            options=currency_options,
+            index=currency_options.index(st.session_state.currency),
+            help="Select the currency to display throughout the application"
+        )
+
+    with col2:
+        # Default time filter
+        time_filter_options = ["Today", "Last 7 Days", "Last 30 Days"]
+        default_time_filter = st.selectbox(
+            "Default Time Filter",
+            options=time_filter_options,
+            index=time_filter_options.index(st.session_state.default_time_filter),
+            help="Set the default time filter for reports and dashboard"
+        )
+        
+        # Username
+        username = st.text_input(
+            "Username",
+            value=st.session_state.username,
+            help="Enter your name or username for the application"
+        )
+        
+        # Theme Mode selection
+        theme_options = ["light", "dark"]
+        current_theme = st.session_state.get('theme', 'light')
+        theme_mode = st.selectbox(
+            "Theme Mode",
+            options=theme_options,
+            index=theme_options.index(current_theme),
+            help="Choose between Light and Dark mode for the application"
+        )
+
+    # Save settings button
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("Save Settings", on_click=save_settings)
+    with col2:
+        st.button("Toggle Theme Now", on_click=toggle_theme, help="Immediately switch between light and dark mode")
+
+    # Per-unit and per-item alert thresholds
+    st.header("Inventory Alert Thresholds")
+    st.write("Set thresholds per unit (applies to every item in that unit, e.g. 'ml' also covers 'l') "
+             "or per item. Units without a threshold use the Inventory Alert Threshold above.")
+
+    thresholds_df = st.data_editor(
+        inventory_alerts.load_thresholds(),
+        num_rows="dynamic",
+        column_config={
+            'Scope': st.column_config.SelectboxColumn("Scope", options=["Unit", "Item"], required=True),
+            'Key': st.column_config.TextColumn("Unit or Item Name", required=True),
+            'Threshold': st.column_config.NumberColumn("Threshold", min_value=0.0, required=True),
+            'Unit': st.column_config.SelectboxColumn("Threshold Unit", options=list(utils.UNIT_CONVERSIONS.keys()))
+        },
+        hide_index=True,
+        key="thresholds_editor"
     )
-    
-    # Theme Mode selection
-    theme_options = ["light", "dark"]
-    current_theme = st.session_state.get('theme', 'light')
-    theme_mode = st.selectbox(
-        "Theme Mode",
-        options=theme_options,
-        index=theme_options.index(current_theme),
-        help="Choose between Light and Dark mode for the application"
+
+    if st.button("Save Thresholds"):
+        inventory_alerts.save_thresholds(thresholds_df)
+        st.success("Alert thresholds saved!")
+
+    # Rerun timings recorded by theta_core.tracing in this app process
+    st.header("Performance")
+    st.write("Time spent by recent page reruns on data loads, computations, chart renders and file writes.")
+
+    metrics_port, metrics_error = metrics.server_status()
+    if metrics_port:
+        st.caption(f"Prometheus metrics are served on port {metrics_port} at /metrics.")
+    elif metrics_error:
+        st.warning(f"The metrics endpoint could not start: {metrics_error}")
+    else:
+        st.caption("Set THETA_METRICS_PORT to serve rerun times, I/O and cache counters to Prometheus at /metrics.")
+
+    page_times = tracing.page_percentiles()
+    if page_times.empty:
+        st.info("No reruns recorded yet. Open a few pages and come back here.")
+    else:
+        milliseconds = st.column_config.NumberColumn(format="%.1f ms")
+
+        st.subheader("Rerun Time per Page")
+        st.dataframe(page_times, hide_index=True, column_config={
+            'p50_ms': milliseconds, 'p95_ms': milliseconds, 'Max_ms': milliseconds
+        })
+
+        st.subheader("Recent Reruns")
+        st.dataframe(tracing.recent_reruns(), hide_index=True, column_config={'Duration_ms': milliseconds})
+
+        st.subheader("Slowest Spans")
+        st.dataframe(tracing.slowest_spans(), hide_index=True, column_config={'Duration_ms': milliseconds})
+
+        if st.button("Clear Performance Data"):
+            tracing.clear()
+            st.rerun()
+
+    # Background cache warm-up started by the first page rerun in this process
+    st.header("Warm-up")
+    st.write("After a restart, data files, dashboard rollups, the BOM matrix and order locations are loaded "
+             "into the shared caches in the background, so the first visitor does not wait for them.")
+
+    if not warmup.enabled():
+        st.caption("Warm-up is turned off (THETA_WARMUP=0).")
+    elif warmup.started() is None:
+        st.info("The warm-up has not run in this process yet.")
+    else:
+        warmup_progress = warmup.progress()
+        if warmup.running():
+            st.progress(warmup_progress, text=f"Warming up caches ({warmup_progress:.0%}), started {warmup.started():%H:%M:%S}")
+        else:
+            st.progress(1.0, text=f"Warm-up finished at {warmup.finished():%H:%M:%S}")
+        st.dataframe(warmup.status(), hide_index=True,
+                     column_config={'Duration_ms': st.column_config.NumberColumn(format="%.1f ms")})
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if warmup.running() and st.button("Refresh Progress"):
+                st.rerun()
+        with col2:
+            if not warmup.running() and st.button("Warm Up Again"):
+                warmup.start(force=True)
+                st.rerun()
+
+    # Opt-in profiling of page reruns
+    st.header("Profiling")
+    st.write(f"Profile page reruns to find hot spots. Add `?profile=1` to a page URL, or switch profiling on "
+             f"here for this session. At most one rerun is profiled every {profiling.MIN_INTERVAL_SECONDS} seconds, "
+             f"so it is safe to leave on.")
+
+    # Stored outside the widget keys so the choice survives switching pages
+    col1, col2 = st.columns(2)
+    with col1:
+        st.session_state.profile_reruns = st.toggle("Profile page reruns",
+                                                    value=st.session_state.get('profile_reruns', False))
+    with col2:
+        engine_options = ["cProfile", "pyinstrument"] if profiling.pyinstrument_available() else ["cProfile"]
+        current_engine = st.session_state.get('profile_engine', "cProfile")
+        st.session_state.profile_engine = st.selectbox(
+            "Profiler", options=engine_options,
+            index=engine_options.index(current_engine) if current_engine in engine_options else 0,
+            help="pyinstrument gives a call tree with an HTML report (pip install pyinstrument)"
+        )
+
+    reports = profiling.list_reports()
+    if not reports:
+        st.info("No profiles captured yet.")
+    else:
+        report_names = [f"{report['captured']:%Y-%m-%d %H:%M:%S} - {report['page']}" for report in reports]
+        selected_report = reports[report_names.index(st.selectbox("Captured Profiles", options=report_names))]
+        st.code(profiling.read_summary(selected_report), language=None)
+        with open(selected_report['path'], 'rb') as file:
+            st.download_button("Download Report", data=file.read(), file_name=selected_report['name'])
+
+    # Memory used by this process, its caches and this session
+    st.header("Memory")
+
+    resident = memory_monitor.resident_bytes()
+    budget_mb = memory_monitor.load_budget()
+    caches = memory_monitor.cache_sizes()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Resident Memory", f"{resident / memory_monitor.MB:,.1f} MB" if resident else "Unknown")
+    with col2:
+        st.metric("Memory Budget", f"{budget_mb:,} MB" if budget_mb else "Off")
+    with col3:
+        st.metric("Cached Results", f"{caches['Bytes'].sum() / memory_monitor.MB:,.1f} MB")
+
+    new_budget = st.number_input(
+        "Memory Budget (MB)",
+        min_value=0,
+        value=budget_mb,
+        step=64,
+        help="When the app process grows past this size, cached results are cleared (largest first) "
+             "at the start of the next page rerun. 0 turns the budget off."
     )
+    if st.button("Save Memory Budget"):
+        memory_monitor.save_budget(new_budget)
+        st.success("Memory budget saved!")
+
+    megabytes = st.column_config.NumberColumn(format="%.2f MB")
+
+    st.subheader("Caches")
+    st.dataframe(caches.assign(Bytes=caches['Bytes'] / memory_monitor.MB), hide_index=True,
+                 column_config={'Bytes': megabytes})
+
+    st.subheader("This Session")
+    session_sizes = memory_monitor.session_state_sizes()
+    st.dataframe(session_sizes.assign(Bytes=session_sizes['Bytes'] / memory_monitor.MB), hide_index=True,
+                 column_config={'Bytes': megabytes})
 
-# Save settings button
-col1, col2 = st.columns(2)
-with col1:
-    st.button("Save Settings", on_click=save_settings)
-with col2:
-    st.button("Toggle Theme Now", on_click=toggle_theme, help="Immediately switch between light and dark mode")
-
-# Data management
-st.header("Data Management")
-
-# Export data
-with st.expander("Export Data"):
-    st.write("Export your data to CSV files")
-    
-    if st.button("Export All Data"):
-        # ZIP file creation would go here in a full implementation
-        st.info("Data export functionality will be added in a future update")
-
-# Import data
-with st.expander("Import Data"):
-    st.write("Import data from CSV files")
-    
-    st.file_uploader("Upload Sales Data (CSV)", type="csv", key="sales_upload")
-    st.file_uploader("Upload Inventory Data (CSV)", type="csv", key="inventory_upload")
-    st.file_uploader("Upload Products Data (CSV)", type="csv", key="products_upload")
-    
-    if st.button("Import Selected Files"):
-        st.info("Data import functionality will be added in a future update")
-
-# Reset application
-with st.expander("Reset Application"):
-    st.write("⚠️ Warning: This will reset all data and settings to default values")
-    
-    if st.button("Reset Application", key="reset_button"):
-        # This would reset all data files and settings
-        st.warning("Reset functionality will be added in a future update")
-
-# About section
-st.header("About")
-
-st.markdown("""
+    evictions = memory_monitor.eviction_log()
+    if not evictions.empty:
+        st.subheader("Budget Evictions")
+        for column in ['Resident_Before', 'Resident_After', 'Budget']:
+            evictions[column] = evictions[column] / memory_monitor.MB
+        st.dataframe(evictions, hide_index=True, column_config={
+            'Resident_Before': megabytes, 'Resident_After': megabytes, 'Budget': megabytes
+        })
+
+    # Heavier measurements only run when asked for
+    with st.expander("Detailed Memory Report"):
+        col1, col2 = st.columns(2)
+        with col1:
+            measure_datasets = st.button("Measure Datasets", help="Load every data file and measure its size in memory")
+        with col2:
+            count_objects = st.button("Count Objects")
+
+        if measure_datasets:
+            datasets = memory_monitor.dataset_sizes()
+            for column in ['File_Bytes', 'Memory_Bytes']:
+                datasets[column] = datasets[column] / memory_monitor.MB
+            st.dataframe(datasets, hide_index=True,
+                         column_config={'File_Bytes': megabytes, 'Memory_Bytes': megabytes})
+        if count_objects:
+            st.dataframe(memory_monitor.object_counts(), hide_index=True)
+
+        if tracemalloc.is_tracing():
+            st.write("Allocation tracing is on (it slows every page down while it runs).")
+            col1, col2 = st.columns(2)
+            with col1:
+                show_allocations = st.button("Show Top Allocators")
+            with col2:
+                if st.button("Stop Allocation Tracing"):
+                    tracemalloc.stop()
+                    st.rerun()
+            if show_allocations:
+                allocations = memory_monitor.top_allocations()
+                st.dataframe(allocations.assign(Bytes=allocations['Bytes'] / memory_monitor.MB), hide_index=True,
+                             column_config={'Bytes': megabytes})
+        elif st.button("Start Allocation Tracing", help="Track which source lines allocate memory from now on"):
+            tracemalloc.start()
+            st.rerun()
+
+    # Data management
+    st.header("Data Management")
+
+    # Export data
+    with st.expander("Export Data"):
+        st.write("Export your data to CSV files")
+        
+        if st.button("Export All Data"):
+            # ZIP file creation would go here in a full implementation
+            st.info("Data export functionality will be added in a future update")
+
+    # Import data
+    with st.expander("Import Data"):
+        st.write("Import data from CSV files")
+        
+        st.file_uploader("Upload Sales Data (CSV)", type="csv", key="sales_upload")
+        st.file_uploader("Upload Inventory Data (CSV)", type="csv", key="inventory_upload")
+        st.file_uploader("Upload Products Data (CSV)", type="csv", key="products_upload")
+        
+        if st.button("Import Selected Files"):
+            st.info("Data import functionality will be added in a future update")
+
+    # Move old sales out of the live file
+    with st.expander("Archive Old Sales"):
+        st.write("Sales of months that ended before the horizon move from sales.csv into compressed monthly "
+                 "Parquet files. Periods within the horizon read sales.csv only; All Time and custom periods "
+                 "that reach further back read the archive too. Archived orders can no longer be edited.")
+        archived_months = archive.partitions()
+        if archived_months:
+            st.write(f"Archived months: {len(archived_months)} "
+                     f"({archive.partition_month(archived_months[0])} to {archive.partition_month(archived_months[-1])})")
+        if not archive.available():
+            st.info("Archiving needs pyarrow (pip install pyarrow)")
+        else:
+            horizon_days = st.number_input("Keep sales live for (days)", min_value=31,
+                                           value=archive.DEFAULT_HORIZON_DAYS, step=1)
+            if st.button("Archive Now"):
+                result = archive.archive_sales(horizon_days=int(horizon_days))
+                if result['rows']:
+                    st.success(f"Archived {result['rows']:,} sale lines into {', '.join(result['partitions'])}")
+                else:
+                    st.info(f"No sales before {archive.archive_cutoff(int(horizon_days)).date()} left to archive")
+
+    # Reset application
+    with st.expander("Reset Application"):
+        st.write("⚠️ Warning: This will reset all data and settings to default values")
+        
+        if st.button("Reset Application", key="reset_button"):
+            # This would reset all data files and settings
+            st.warning("Reset functionality will be added in a future update")
+
+    # About section
+    st.header("About")
+
+    st.markdown("""
 ### Cafe Management System
 Version 1.0
 
@@ -180,25 +400,25 @@ This application helps you manage your cafe operations including:
 For support or feedback, please contact the developer.
 """)
 
-# System information
-st.subheader("System Information")
-
-# Check data files
-data_files = [
-    "data/sales.csv",
-    "data/inventory.csv",
-    "data/products.csv",
-    "data/product_recipe.csv",
-    "data/operational_costs.csv",
-    "data/inventory_transactions.csv"
-]
-
-file_status = []
-for file in data_files:
-    file_status.append({
-        "File": file,
-        "Status": "Available" if os.path.exists(file) else "Not Found"
-    })
-
-status_df = pd.DataFrame(file_status)
-st.dataframe(status_df)
+    # System information
+    st.subheader("System Information")
+
+    # Check data files
+    data_files = [
+        "data/sales.csv",
+        "data/inventory.csv",
+        "data/products.csv",
+        "data/product_recipe.csv",
+        "data/operational_costs.csv",
+        "data/inventory_transactions.csv"
+    ]
+
+    file_status = []
+    for file in data_files:
+        file_status.append({
+            "File": file,
+            "Status": "Available" if os.path.exists(file) else "Not Found"
+        })
+
+    status_df = pd.DataFrame(file_status)
+    st.dataframe(status_df)
@@ -0,0 +1,115 @@
+import streamlit as st
+import hmac
+import math
+import utils
+from theta_core import console, sql
+
+# Initialize session_state
+utils.initialize_session_state()
+with utils.page_run("8_sql_console"):
+    st.set_page_config(page_title="SQL Console", page_icon="🗄️", layout="wide")
+
+    st.title("SQL Console")
+    st.subheader("Read-only SQL over the sales, orders, inventory and cost data")
+
+    PAGE_SIZES = [50, 100, 500, 1000]
+
+    EXAMPLE_QUERY = """-- Promotion spend per product per week
+SELECT Product, date_trunc('week', Date) AS Week, SUM(Promo) AS Promo_Spend
+FROM sales
+GROUP BY ALL
+ORDER BY Week DESC, Promo_Spend DESC"""
+
+    def unlocked():
+        """True once this session entered the admin passcode"""
+        if st.session_state.get('sql_console_unlocked'):
+            return True
+        entered = st.text_input("Admin Passcode", type="password", key="sql_console_passcode")
+        if entered and hmac.compare_digest(entered.encode(), console.admin_password().encode()):
+            st.session_state.sql_console_unlocked = True
+            return True
+        if entered:
+            st.error("Wrong passcode")
+        return False
+
+    def show_tables():
+        """Views the console can query, with their columns"""
+        with st.expander("Tables"):
+            for view, (file_name, columns) in sql.TABLES.items():
+                st.markdown(f"**{view}** ({file_name}): {', '.join(columns)}")
+            st.markdown("**orders** (one row per order): Order_ID, Date, Location, Lines, Items, Total, Promo, Net_Total")
+            st.caption("The sales view includes archived months. Dates are timestamps; use date_trunc('week', Date) "
+                       "and similar to group by period.")
+
+    def show_result(query):
+        """Status, one page of rows and the CSV download of a finished query"""
+        if query.status == "Failed":
+            st.error(query.error)
+            return
+        summary = f"{query.rows:,} rows in {query.elapsed():.2f} s"
+        if query.status != "Done":
+            st.warning(f"{query.status}: {query.error or 'stopped'}. {summary} fetched before that.")
+        elif query.truncated:
+            st.warning(f"Showing the first {summary}; the row limit was reached.")
+        else:
+            st.success(summary)
+
+        result = query.result()
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Rows per Page", PAGE_SIZES, key="sql_console_page_size")
+        with col2:
+            pages = max(1, math.ceil(len(result) / page_size))
+            # A larger page size leaves fewer pages
+            st.session_state.sql_console_page = min(st.session_state.get('sql_console_page', 1), pages)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="sql_console_page")
+        st.dataframe(result.iloc[(page - 1) * page_size:page * page_size], hide_index=True, use_container_width=True)
+        st.download_button("Download CSV", data=query.csv(), file_name="query.csv", mime="text/csv")
+
+    def run_console():
+        """Query editor, limits, run/cancel and the streamed result"""
+        show_tables()
+        st.text_area("SQL", value=EXAMPLE_QUERY, height=180, key="sql_console_text")
+
+        query = st.session_state.get('sql_console_query')
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            row_limit = st.number_input("Row Limit", min_value=1, max_value=console.ROW_LIMIT,
+                                        value=min(10_000, console.ROW_LIMIT), step=1000)
+        with col2:
+            timeout = st.number_input("Time Limit (seconds)", min_value=1.0, max_value=console.TIMEOUT_SECONDS,
+                                      value=min(10.0, console.TIMEOUT_SECONDS), step=1.0)
+        with col3:
+            run = st.button("Run Query", type="primary")
+        with col4:
+            cancel = st.button("Cancel Query", disabled=query is None or not query.running())
+
+        if run:
+            if query is not None:
+                query.cancel()
+            query = console.Query(st.session_state.sql_console_text, "data", int(row_limit), float(timeout))
+            st.session_state.sql_console_query = query
+            st.session_state.sql_console_page = 1
+        elif cancel and query is not None:
+            query.cancel()
+
+        if query is None:
+            return
+        if query.running():
+            # Rows are shown as they arrive; clicking Cancel reruns the page and stops the query
+            status = st.empty()
+            preview = st.empty()
+            while query.running():
+                status.info(f"Running for {query.elapsed():.1f} s, {query.rows:,} rows so far")
+                preview.dataframe(query.head(PAGE_SIZES[0]), hide_index=True, use_container_width=True)
+                query.wait(0.25)
+            status.empty()
+            preview.empty()
+        show_result(query)
+
+    if not console.admin_password():
+        st.info("The SQL console is turned off. Set THETA_ADMIN_PASSWORD to give administrators access.")
+    elif not sql.available():
+        st.warning("The SQL console needs duckdb (pip install duckdb).")
+    elif unlocked():
+        run_console()
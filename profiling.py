@@ -0,0 +1,184 @@
+import streamlit as st
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+
+# Opt-in profiling of a single page rerun, triggered by ?profile=1 in the URL or
+# the toggle in Settings. Captures are rate limited process-wide so leaving the
+# toggle on costs at most one profiled rerun every MIN_INTERVAL_SECONDS.
+PROFILE_DIR = "profiles"
+MIN_INTERVAL_SECONDS = 30
+MAX_PROFILES = 50
+SUMMARY_LINES = 40
+
+_lock = threading.Lock()
+_state = {'last_capture': 0.0, 'active': None}
+_local = threading.local()
+
+def requested():
+    """True if this rerun asked to be profiled"""
+    try:
+        from_url = st.query_params.get("profile") == "1"
+    except Exception:
+        from_url = False
+    return from_url or bool(st.session_state.get('profile_reruns', False))
+
+def pyinstrument_available():
+    """True if the optional pyinstrument profiler is installed"""
+    try:
+        import pyinstrument  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _new_profiler(engine):
+    """Start a profiler for the current thread"""
+    if engine == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+def _stop_profiler(engine, profiler):
+    """Stop a profiler started by _new_profiler"""
+    if engine == "pyinstrument":
+        profiler.stop()
+    else:
+        profiler.disable()
+
+def start(page):
+    """Start profiling this rerun of ``page`` if requested and allowed
+
+    Returns:
+        True if a capture started
+    """
+    if not requested():
+        return False
+
+    engine = st.session_state.get('profile_engine', "cProfile")
+    if engine == "pyinstrument" and not pyinstrument_available():
+        engine = "cProfile"
+
+    now = time.monotonic()
+    with _lock:
+        active = _state['active']
+        # A rerun that stopped early (st.stop, st.rerun) never reaches stop();
+        # its capture is abandoned once the interval has passed
+        if active is not None and now - active['started'] > MIN_INTERVAL_SECONDS:
+            try:
+                _stop_profiler(active['engine'], active['profiler'])
+            except Exception:
+                pass
+            _state['active'] = active = None
+        if active is not None or now - _state['last_capture'] < MIN_INTERVAL_SECONDS:
+            return False
+
+        try:
+            profiler = _new_profiler(engine)
+        except (ValueError, RuntimeError):
+            # Another profiler already owns the interpreter
+            return False
+        capture = {'page': page, 'engine': engine, 'profiler': profiler,
+                   'started': now, 'wall_start': time.perf_counter()}
+        _state['active'] = capture
+        _state['last_capture'] = now
+
+    _local.capture = capture
+    return True
+
+def stop():
+    """Finish the capture started in this thread and save its report
+
+    Returns:
+        Path of the saved report, or None if this rerun was not profiled
+    """
+    capture = getattr(_local, 'capture', None)
+    if capture is None:
+        return None
+    _local.capture = None
+
+    with _lock:
+        if _state['active'] is not capture:
+            return None
+        _stop_profiler(capture['engine'], capture['profiler'])
+        _state['active'] = None
+
+    duration = time.perf_counter() - capture['wall_start']
+    path = save_report(capture['page'], capture['engine'], capture['profiler'], duration)
+    prune_reports()
+    st.caption(f"This rerun was profiled ({duration * 1000:.0f} ms). "
+               f"The report is in Settings under Profiling: {os.path.basename(path)}")
+    return path
+
+def save_report(page, engine, profiler, duration, profile_dir=PROFILE_DIR):
+    """Write the raw profile and a text summary
+
+    Returns:
+        Path of the raw report (.prof for cProfile, .html for pyinstrument)
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    stem = os.path.join(profile_dir, f"{datetime.now():%Y%m%d-%H%M%S}-{page}")
+    header = f"{page} rerun profiled with {engine}, {duration * 1000:.0f} ms wall time\n\n"
+
+    if engine == "pyinstrument":
+        path = stem + ".html"
+        with open(path, 'w') as file:
+            file.write(profiler.output_html())
+        summary = profiler.output_text(unicode=True, color=False)
+    else:
+        path = stem + ".prof"
+        profiler.dump_stats(path)
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).strip_dirs().sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        summary = buffer.getvalue()
+
+    with open(stem + ".txt", 'w') as file:
+        file.write(header + summary)
+    return path
+
+def prune_reports(profile_dir=PROFILE_DIR, keep=MAX_PROFILES):
+    """Delete the oldest reports beyond ``keep`` captures"""
+    reports = list_reports(profile_dir)
+    for report in reports[keep:]:
+        for path in (report['path'], report['summary_path']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def list_reports(profile_dir=PROFILE_DIR):
+    """Saved captures, newest first"""
+    if not os.path.isdir(profile_dir):
+        return []
+    reports = []
+    for name in os.listdir(profile_dir):
+        stem, extension = os.path.splitext(name)
+        if extension not in ('.prof', '.html'):
+            continue
+        try:
+            captured = datetime.strptime(stem[:15], '%Y%m%d-%H%M%S')
+        except ValueError:
+            continue
+        reports.append({
+            'name': name,
+            'path': os.path.join(profile_dir, name),
+            'summary_path': os.path.join(profile_dir, stem + ".txt"),
+            'page': stem[16:],
+            'captured': captured
+        })
+    return sorted(reports, key=lambda report: report['name'], reverse=True)
+
+def read_summary(report):
+    """Text summary saved next to a report"""
+    try:
+        with open(report['summary_path']) as file:
+            return file.read()
+    except OSError:
+        return "No summary available for this capture."
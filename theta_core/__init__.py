@@ -0,0 +1,16 @@
+"""Headless analytics core for Theta Coffee Lab
+
+Pure pandas functions shared by the Streamlit pages and the ``theta`` CLI.
+Inputs are dataframes and a time window, outputs are result frames or dicts,
+so nothing in this package imports Streamlit.
+"""
+from theta_core.data import (
+    date_range, filter_period, load_sales, load_live_sales, load_appended_sales, load_archived_sales, load_products,
+    load_recipes, load_inventory, load_operational_costs
+)
+from theta_core.kpis import sales_kpis, product_sales, ingredient_usage, daily_revenue
+from theta_core.financial import (
+    COSTING_METHODS, merge_cogs, apply_cost_stamps, profit_by_product,
+    financial_kpis, daily_finance, business_costs
+)
+from theta_core.geo import order_locations, locate_orders
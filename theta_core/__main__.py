@@ -0,0 +1,4 @@
+import sys
+from theta_core.cli import main
+
+sys.exit(main())
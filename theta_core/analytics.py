@@ -0,0 +1,239 @@
+import os
+import pandas as pd
+from theta_core import data, kpis, financial, sql, tracing, cost_layers
+
+# One analytics API, two engines. 'pandas' loads the data files into frames and
+# runs the kpis/financial functions; 'duckdb' runs the same figures as SQL over
+# the files themselves (see theta_core.sql), reading only the columns and
+# archive row groups a period needs, on all cores. Both return the same shapes,
+# and benchmarks/parity.py checks that they agree.
+ENGINES = ("pandas", "duckdb")
+
+def default_engine():
+    """Engine named by THETA_ENGINE, pandas when unset or when duckdb is not installed"""
+    engine = os.environ.get("THETA_ENGINE", "pandas")
+    return engine if engine in ENGINES and (engine != "duckdb" or sql.available()) else "pandas"
+
+def resolve(engine=None):
+    """Check an engine name, falling back to default_engine() for None"""
+    engine = engine or default_engine()
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown analytics engine {engine!r} (choose from {', '.join(ENGINES)})")
+    if engine == "duckdb" and not sql.available():
+        raise RuntimeError("The duckdb engine needs duckdb (pip install duckdb)")
+    return engine
+
+def whole(value):
+    """Plain int for a whole quantity (SQL sums of quantities come back as floats)"""
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+def whole_column(frame, column):
+    """Make a column of whole quantities int64, as pandas sums of integer quantities are"""
+    values = frame[column]
+    if len(values) and values.notna().all() and (values % 1 == 0).all():
+        frame[column] = values.astype('int64')
+    return frame
+
+def period_filter(start_date=None, end_date=None, column='Date'):
+    """SQL condition equivalent to data.filter_period (whole days, None means unbounded)"""
+    conditions = []
+    if start_date is not None:
+        conditions.append(f"{column} >= {sql.literal(pd.Timestamp(start_date))}::TIMESTAMP")
+    if end_date is not None:
+        conditions.append(f"{column} < {sql.literal(pd.Timestamp(end_date) + pd.Timedelta(days=1))}::TIMESTAMP")
+    return " AND ".join(conditions) or "true"
+
+def period_sales(data_dir, start_date=None, end_date=None):
+    """Sale lines within the period, archive included (pandas engine)"""
+    return data.filter_period(data.load_sales(data_dir, start_date, end_date), start_date, end_date)
+
+def costed_sales(data_dir, sales, costing_method, save_stamps=True):
+    """Sale lines with COGS for the chosen costing method (pandas engine)
+
+    With ``save_stamps=False`` missing cost stamps are computed without being written.
+    """
+    merged = financial.merge_cogs(sales, data.load_products(data_dir))
+    if financial.COSTING_METHODS[costing_method] is not None and not merged.empty:
+        stamps, _ = cost_layers.update_sales_cogs(data_dir, save=save_stamps)
+        merged = financial.apply_cost_stamps(merged, stamps, costing_method)
+    return merged
+
+def dashboard_figures(sales, products, recipes):
+    """Dashboard KPIs and chart data from period sales already in memory"""
+    return {
+        'kpis': kpis.sales_kpis(sales, products),
+        'ingredients': kpis.ingredient_usage(sales, recipes),
+        'daily_revenue': kpis.daily_revenue(sales),
+        'products': kpis.product_sales(sales)
+    }
+
+# DuckDB versions of the kpis functions, over the 'period' table of sales
+SALES_KPIS_SQL = """
+    SELECT COALESCE(SUM(Net_Total), 0) AS total_revenue, COUNT(DISTINCT Order_ID) AS total_orders,
+           COALESCE(SUM(Quantity), 0) AS total_cups,
+           (SELECT COALESCE(SUM(p.COGS * s.Quantity), 0)
+            FROM period s JOIN products p ON s.Product = p.Name) AS cogs
+    FROM period
+"""
+PRODUCT_SALES_SQL = """
+    SELECT Product, COALESCE(SUM(Quantity), 0) AS Quantity
+    FROM period WHERE Product IS NOT NULL
+    GROUP BY Product ORDER BY Quantity DESC, Product
+"""
+INGREDIENT_USAGE_SQL = """
+    SELECT r.Ingredient, COALESCE(SUM(s.Quantity * r.Quantity), 0) AS Quantity_Used
+    FROM period s JOIN recipes r ON s.Product = r.Product
+    WHERE r.Ingredient IS NOT NULL
+    GROUP BY r.Ingredient ORDER BY Quantity_Used DESC, r.Ingredient
+"""
+DAILY_REVENUE_SQL = """
+    SELECT CAST(Date AS DATE) AS Date, COALESCE(SUM(Net_Total), 0) AS Net_Total
+    FROM period WHERE Date IS NOT NULL
+    GROUP BY 1 ORDER BY 1
+"""
+
+# Sale lines grouped by the stamp key without Line: a group takes its stamped
+# cost when every line in it is stamped, else current COGS x quantity (the
+# lines of one product are either all stamped or all without a recipe)
+LINE_COGS_SQL = """
+    WITH lines AS (
+        SELECT Order_ID, Product, Date, COUNT(*) AS Lines, SUM(Quantity) AS Quantity
+        FROM period GROUP BY Order_ID, Product, Date
+    ), stamped AS (
+        SELECT Order_ID, Product, Date, COUNT({stamp}) AS Stamped, SUM({stamp}) AS Stamp
+        FROM (SELECT DISTINCT ON (Order_ID, Product, Date, Line) * FROM cost_stamps)
+        GROUP BY Order_ID, Product, Date
+    )
+    SELECT l.Product, l.Date, p.Price * l.Quantity AS Revenue,
+           CASE WHEN st.Stamped = l.Lines THEN st.Stamp ELSE p.COGS * l.Quantity END AS COGS
+    FROM lines l
+    LEFT JOIN products p ON l.Product = p.Name
+    LEFT JOIN stamped st
+        ON st.Order_ID = l.Order_ID AND st.Product = l.Product AND st.Date = l.Date
+"""
+# Profit per product, ordered like profit_by_product (first sale first)
+PRODUCT_PROFIT_SQL = """
+    SELECT Product, COALESCE(SUM(Revenue - COGS), 0) AS Profit
+    FROM line_cogs WHERE Product IS NOT NULL
+    GROUP BY Product ORDER BY MIN(Date), Product
+"""
+FINANCIAL_TOTALS_SQL = """
+    SELECT COALESCE(SUM(Total), 0) AS gross_revenue, COALESCE(SUM(Net_Total), 0) AS net_revenue,
+           (SELECT COALESCE(SUM(COGS), 0) FROM line_cogs) AS total_cogs,
+           (SELECT COUNT(*) FROM line_cogs) AS lines,
+           (SELECT COALESCE(SUM(Amount), 0) FROM costs WHERE {costs_filter}) AS operational_costs
+    FROM period
+"""
+
+# Columns of the sales the KPI queries use
+PERIOD_COLUMNS = "Date, Order_ID, Product, Quantity, Total, Net_Total"
+
+def connect(data_dir, start_date=None, end_date=None):
+    """DuckDB connection over ``data_dir`` with a 'period' table of the sales in range
+
+    The period is scanned once (only the KPI columns, only the archive row
+    groups in range) and every query after that reads the table.
+    """
+    connection = sql.connect(data_dir)
+    connection.execute(f"CREATE TEMP TABLE period AS SELECT {PERIOD_COLUMNS} FROM sales "
+                       f"WHERE {period_filter(start_date, end_date)}")
+    return connection
+
+def cost_lines(connection, data_dir, costing_method, save_stamps=True):
+    """Create the 'line_cogs' table for a costing method, updating the cost stamps it reads first
+
+    With ``save_stamps=False`` the stamps are computed in memory and replace the cost_stamps view.
+    """
+    stamp_column = financial.COSTING_METHODS[costing_method]
+    # A period without sales needs no stamps, as in costed_sales
+    if stamp_column is not None and connection.execute("SELECT COUNT(*) FROM period").fetchone()[0]:
+        stamps, processed = cost_layers.update_sales_cogs(data_dir, save=save_stamps)
+        if not save_stamps and processed:
+            connection.register("unsaved_stamps", stamps[list(sql.TABLES['cost_stamps'][1])])
+            connection.execute("CREATE OR REPLACE TEMP VIEW cost_stamps AS SELECT * FROM unsaved_stamps")
+    # Without a stamp column every group falls back to current COGS
+    stamp = f'"{stamp_column}"' if stamp_column is not None else "CAST(NULL AS DOUBLE)"
+    connection.execute(f"CREATE OR REPLACE TEMP TABLE line_cogs AS {LINE_COGS_SQL.format(stamp=stamp)}")
+
+def duckdb_dashboard(connection):
+    """dashboard_figures() computed by DuckDB over the 'period' table"""
+    totals = sql.query(connection, SALES_KPIS_SQL, name="sales kpis").iloc[0]
+    products = whole_column(sql.query(connection, PRODUCT_SALES_SQL, name="product sales"), 'Quantity')
+    daily = sql.query(connection, DAILY_REVENUE_SQL, name="daily revenue")
+    daily['Date'] = pd.to_datetime(daily['Date']).dt.date
+
+    total_revenue = float(totals['total_revenue'])
+    gross_profit = total_revenue - float(totals['cogs'])
+    if products.empty:
+        top_product, top_quantity = 'N/A', 0
+    else:
+        top_product, top_quantity = products['Product'].iloc[0], whole(float(products['Quantity'].iloc[0]))
+    figures = {
+        'total_revenue': total_revenue,
+        'total_orders': int(totals['total_orders']),
+        'top_product': top_product,
+        'top_product_quantity': top_quantity,
+        'total_cups': whole(float(totals['total_cups'])),
+        'gross_profit': gross_profit,
+        'gross_margin': (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
+    }
+    return {
+        'kpis': figures,
+        'ingredients': sql.query(connection, INGREDIENT_USAGE_SQL, name="ingredient usage"),
+        'daily_revenue': daily,
+        'products': products
+    }
+
+@tracing.traced()
+def dashboard(data_dir="data", start_date=None, end_date=None, engine=None):
+    """Dashboard KPIs and chart data for a period
+
+    Returns:
+        Dict with 'kpis' (kpis.sales_kpis), 'ingredients' (kpis.ingredient_usage),
+        'daily_revenue' (kpis.daily_revenue) and 'products' (kpis.product_sales)
+    """
+    if resolve(engine) == "pandas":
+        return dashboard_figures(period_sales(data_dir, start_date, end_date),
+                                 data.load_products(data_dir), data.load_recipes(data_dir))
+    return duckdb_dashboard(connect(data_dir, start_date, end_date))
+
+@tracing.traced()
+def product_profit(data_dir="data", start_date=None, end_date=None, costing_method="Moving Average", engine=None,
+                   save_stamps=True):
+    """Gross profit per product for a period (financial.profit_by_product)
+
+    ``save_stamps=False`` leaves the cost stamp files untouched (see costed_sales).
+    """
+    if resolve(engine) == "pandas":
+        sales = period_sales(data_dir, start_date, end_date)
+        return financial.profit_by_product(costed_sales(data_dir, sales, costing_method, save_stamps))
+    connection = connect(data_dir, start_date, end_date)
+    cost_lines(connection, data_dir, costing_method, save_stamps)
+    return sql.query(connection, PRODUCT_PROFIT_SQL, name="product profit")
+
+@tracing.traced()
+def financial_kpis(data_dir="data", start_date=None, end_date=None, costing_method="Moving Average", engine=None,
+                   save_stamps=True):
+    """Financial KPIs for a period (financial.financial_kpis)
+
+    ``save_stamps=False`` leaves the cost stamp files untouched (see costed_sales).
+    """
+    if resolve(engine) == "pandas":
+        sales = period_sales(data_dir, start_date, end_date)
+        costs = data.filter_period(data.load_operational_costs(data_dir), start_date, end_date)
+        return financial.financial_kpis(sales, costed_sales(data_dir, sales, costing_method, save_stamps), costs)
+
+    connection = connect(data_dir, start_date, end_date)
+    cost_lines(connection, data_dir, costing_method, save_stamps)
+    totals = sql.query(connection, FINANCIAL_TOTALS_SQL.format(costs_filter=period_filter(start_date, end_date)),
+                       name="financial totals").iloc[0]
+    profit = sql.query(connection, PRODUCT_PROFIT_SQL, name="product profit")
+    if profit.empty:
+        most_profitable = ('N/A', 0)
+    else:
+        # The first sold product wins a tie, as with idxmax over profit_by_product
+        best = profit.loc[profit['Profit'].idxmax()]
+        most_profitable = (best['Product'], float(best['Profit']))
+    return financial.kpi_figures(float(totals['gross_revenue']), float(totals['net_revenue']),
+                                 float(totals['total_cogs']) if totals['lines'] else 0,
+                                 float(totals['operational_costs']), most_profitable)
@@ -0,0 +1,115 @@
+import importlib.util
+import io
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+from theta_core import storage, tracing
+
+# Hot/cold tiering of sales.csv. archive_sales() moves the sale lines of every
+# month that ended more than a horizon ago out of the live CSV into one Parquet
+# file per month (sales-YYYY-MM.parquet, zstd compressed, with column statistics
+# so date filters skip row groups). New orders keep appending to sales.csv.
+# The move is one storage command, so the CSV rewrite and the partitions reach
+# disk (and readers' pinned generations) together. Archived orders are
+# read-only: the order page edits and deletes only what is in sales.csv.
+PARTITION_PATTERN = "sales-????-??.parquet"
+# Keeps every preset period up to "Last Year" in the live file
+DEFAULT_HORIZON_DAYS = int(os.environ.get("THETA_ARCHIVE_DAYS", "366") or 366)
+ROW_GROUP_ROWS = 50_000
+
+def available():
+    """True if pyarrow, which reads and writes the archive, is installed"""
+    # Looked up without importing it: pyarrow is only loaded once a partition is read or written
+    return importlib.util.find_spec("pyarrow") is not None
+
+def partition_name(month):
+    """File name of the archive partition holding ``month`` (a Period or Timestamp)"""
+    return f"sales-{month.year:04d}-{month.month:02d}.parquet"
+
+def partition_month(name):
+    """Monthly period of an archive partition file name"""
+    return pd.Period(name[len("sales-"):len("sales-YYYY-MM")], freq='M')
+
+def partitions(data_dir="data", start_date=None, end_date=None):
+    """Archive partitions whose month overlaps [start_date, end_date]; None means unbounded"""
+    names = storage.list_files(data_dir, PARTITION_PATTERN)
+    if start_date is not None:
+        names = [name for name in names if partition_month(name).end_time >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        names = [name for name in names if partition_month(name).start_time <= pd.Timestamp(end_date)]
+    return names
+
+def archive_cutoff(horizon_days=DEFAULT_HORIZON_DAYS, today=None):
+    """First day of the oldest month that stays live"""
+    oldest = (today or datetime.now().date()) - timedelta(days=horizon_days)
+    return pd.Timestamp(oldest.year, oldest.month, 1)
+
+def to_parquet_bytes(rows):
+    """Parquet file content for archived sale lines"""
+    buffer = io.BytesIO()
+    rows.to_parquet(buffer, engine='pyarrow', compression='zstd', index=False,
+                    row_group_size=ROW_GROUP_ROWS, write_statistics=True)
+    return buffer.getvalue()
+
+@tracing.traced()
+def read_sales(data_dir="data", names=None, start_date=None, end_date=None):
+    """Archived sale lines from partitions ``names`` (default: all)
+
+    Only rows within [start_date, end_date] are read (None means unbounded);
+    the Date column statistics let whole row groups be skipped.
+
+    Returns:
+        Sale lines with a parsed Date column, empty if nothing is archived
+    """
+    names = partitions(data_dir) if names is None else names
+    if not names:
+        return pd.DataFrame()
+    filters = []
+    if start_date is not None:
+        filters.append(('Date', '>=', pd.Timestamp(start_date)))
+    if end_date is not None:
+        filters.append(('Date', '<', pd.Timestamp(end_date) + pd.Timedelta(days=1)))
+    frames = [pd.read_parquet(io.BytesIO(storage.read_bytes(os.path.join(data_dir, name))),
+                              engine='pyarrow', filters=filters or None)
+              for name in names]
+    return pd.concat(frames, ignore_index=True)
+
+def archive_sales(data_dir="data", horizon_days=DEFAULT_HORIZON_DAYS, today=None):
+    """Move sale lines of the months that ended ``horizon_days`` ago into the archive
+
+    Lines back-dated into an archived month later are merged into its partition
+    the next time this runs.
+
+    Returns:
+        Dict with the number of 'rows' moved and the 'partitions' written
+    """
+    if not available():
+        raise RuntimeError("Archiving sales needs pyarrow (pip install pyarrow)")
+    cutoff = archive_cutoff(horizon_days, today)
+    path = os.path.join(data_dir, "sales.csv")
+
+    def archive():
+        try:
+            sales = storage.read_csv(path, dtype={'Order_ID': str})
+        except FileNotFoundError:
+            return {'rows': 0, 'partitions': []}
+        dates = pd.to_datetime(sales['Date'], format='mixed')
+        old = dates < cutoff
+        if not old.any():
+            return {'rows': 0, 'partitions': []}
+
+        moved = sales[old].assign(Date=dates[old])
+        written = []
+        for month, rows in moved.groupby(moved['Date'].dt.to_period('M')):
+            target = os.path.join(data_dir, partition_name(month))
+            try:
+                archived = pd.read_parquet(io.BytesIO(storage.read_bytes(target)), engine='pyarrow')
+                rows = pd.concat([archived, rows], ignore_index=True)
+            except FileNotFoundError:
+                pass
+            storage.write_bytes(to_parquet_bytes(rows.sort_values('Date', kind='stable')), target)
+            written.append(partition_name(month))
+        storage.to_csv(sales[~old], path, index=False)
+        return {'rows': int(old.sum()), 'partitions': written}
+
+    return storage.submit(archive, data_dir)
@@ -0,0 +1,140 @@
+import argparse
+import json
+import sys
+from datetime import date
+from theta_core import data, financial, archive, analytics
+
+def format_amount(value):
+    """Format a money amount the same way as the app"""
+    return f"{value:,.0f} VND"
+
+def iso_date(value):
+    """argparse type for --start / --end"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def parse_period(parser, args):
+    """Resolve --period / --start / --end into an inclusive date range"""
+    start_date, end_date = data.date_range(args.period)
+    start_date = args.start or start_date
+    end_date = args.end or end_date
+    if start_date > end_date:
+        parser.error(f"the start date {start_date} is after the end date {end_date}")
+    return start_date, end_date
+
+def period_kpis(data_dir, start_date, end_date, costing_method, engine=None):
+    """Dashboard and financial KPIs for a date range
+
+    Read-only: sale lines not yet stamped are costed in memory, not written.
+    """
+    results = analytics.dashboard(data_dir, start_date, end_date, engine)['kpis']
+    # The dashboard profit uses current product COGS; keep it apart from the financial figures
+    results['dashboard_gross_profit'] = results.pop('gross_profit')
+    results['dashboard_gross_margin'] = results.pop('gross_margin')
+    results.update(analytics.financial_kpis(data_dir, start_date, end_date, costing_method, engine,
+                                            save_stamps=False))
+    return results
+
+def print_kpis(results, start_date, end_date, costing_method):
+    """Print KPIs as a readable report"""
+    print(f"Theta Coffee Lab KPIs {start_date} to {end_date} ({costing_method})")
+    rows = [
+        ("Gross Revenue", format_amount(results['gross_revenue'])),
+        ("Net Revenue", format_amount(results['net_revenue'])),
+        ("Promotion Impact", f"{results['promo_impact']:.2f}%"),
+        ("Total Orders", f"{results['total_orders']}"),
+        ("Total Cups Sold", f"{results['total_cups']}"),
+        ("Best Selling Product", f"{results['top_product']} ({int(results['top_product_quantity'])} units)"),
+        ("Total COGS", format_amount(results['total_cogs'])),
+        ("Gross Profit", format_amount(results['gross_profit'])),
+        ("Gross Profit Margin", f"{results['gross_profit_margin']:.2f}%"),
+        ("Operational Costs", format_amount(results['operational_costs'])),
+        ("Net Profit", format_amount(results['net_profit'])),
+        ("Net Profit Margin", f"{results['net_margin']:.2f}%"),
+        ("Most Profitable Product",
+         f"{results['most_profitable_product']} ({format_amount(results['most_profitable_profit'])})")
+    ]
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label:<{width}}  {value}")
+
+def run_archive(data_dir, horizon_days):
+    """Move old sales into the archive and report what moved"""
+    try:
+        result = archive.archive_sales(data_dir, horizon_days)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if result['rows']:
+        print(f"Archived {result['rows']:,} sale lines into {', '.join(result['partitions'])}")
+    else:
+        print(f"No sales before {archive.archive_cutoff(horizon_days).date()} left to archive")
+    return 0
+
+def to_json(value):
+    """Make numpy scalars JSON serialisable"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def main(argv=None):
+    """Entry point of the ``theta`` command"""
+    parser = argparse.ArgumentParser(prog="theta", description="Theta Coffee Lab analytics without the browser")
+    parser.add_argument("--data-dir", default="data", help="Directory holding the CSV data files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in [("kpis", "Print dashboard and financial KPIs"),
+                            ("products", "Print units sold and profit per product"),
+                            ("ingredients", "Print ingredient usage")]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--period", default="All Time",
+                         choices=list(data.PERIOD_DAYS) + ["All Time"], help="Preset time period")
+        sub.add_argument("--start", type=iso_date, help="Start date (YYYY-MM-DD), overrides --period")
+        sub.add_argument("--end", type=iso_date, help="End date (YYYY-MM-DD), overrides --period")
+        sub.add_argument("--costing", default="Moving Average", choices=list(financial.COSTING_METHODS),
+                         help="How sale lines are costed")
+        sub.add_argument("--engine", choices=analytics.ENGINES,
+                         help="Analytics engine (default: THETA_ENGINE, else pandas)")
+        sub.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+
+    sub = subparsers.add_parser("archive", help="Move old sales from sales.csv into the Parquet archive")
+    sub.add_argument("--days", type=int, default=archive.DEFAULT_HORIZON_DAYS,
+                     help="Keep sales of the months that ended in the last DAYS days live "
+                          "(default: THETA_ARCHIVE_DAYS or 366)")
+
+    args = parser.parse_args(argv)
+    if args.command == "archive":
+        return run_archive(args.data_dir, args.days)
+    start_date, end_date = parse_period(parser, args)
+    try:
+        engine = analytics.resolve(args.engine)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.command == "kpis":
+        results = period_kpis(args.data_dir, start_date, end_date, args.costing, engine)
+        if args.json:
+            print(json.dumps(results, default=to_json, indent=2))
+        else:
+            print_kpis(results, start_date, end_date, args.costing)
+        return 0
+
+    figures = analytics.dashboard(args.data_dir, start_date, end_date, engine)
+    if args.command == "products":
+        profit = analytics.product_profit(args.data_dir, start_date, end_date, args.costing, engine,
+                                          save_stamps=False)
+        result = figures['products'].merge(profit, on='Product', how='left')
+    else:
+        result = figures['ingredients']
+
+    if args.json:
+        print(result.to_json(orient='records', indent=2))
+    elif result.empty:
+        print(f"No sales between {start_date} and {end_date}")
+    else:
+        print(result.to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
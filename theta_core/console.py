@@ -0,0 +1,237 @@
+import os
+import re
+import threading
+import time
+import pandas as pd
+from theta_core import sql, storage, tracing
+
+# Read-only SQL for the admin console (pages/8_sql_console.py). Each query runs
+# in a background thread on its own DuckDB connection with the theta_core.sql
+# views, so the page can show rows as they stream in and cancel the query.
+# The views a query uses are copied into in-memory tables first, then the
+# connection is locked down: no file can be read or written, extensions cannot
+# be installed or loaded and settings cannot be changed. Only a single SELECT,
+# or an EXPLAIN of one, is accepted. A query is interrupted at its time limit
+# and stops fetching at its row limit.
+TIMEOUT_SECONDS = float(os.environ.get("THETA_SQL_TIMEOUT", "30") or 30)
+ROW_LIMIT = int(os.environ.get("THETA_SQL_ROW_LIMIT", "100000") or 100000)
+MEMORY_LIMIT = os.environ.get("THETA_SQL_MEMORY", "1GB") or "1GB"
+
+ALLOWED_STATEMENTS = ("SELECT",)
+# EXPLAIN and its options, in front of the statement it explains
+EXPLAIN_PREFIX = re.compile(r"^\s*EXPLAIN(\s+ANALY[SZ]E)?(\s*\([^)]*\))?\s*", re.IGNORECASE)
+# Views a console query can use (see theta_core.sql)
+VIEWS = tuple(sql.TABLES) + ("orders",)
+
+class QueryError(Exception):
+    """A console query that was refused or failed; the message is meant for the user"""
+
+def admin_password():
+    """Passcode unlocking the console (THETA_ADMIN_PASSWORD); empty disables it"""
+    return os.environ.get("THETA_ADMIN_PASSWORD", "")
+
+def used_views(connection, statement):
+    """Views of VIEWS that ``statement`` reads (all of them if that cannot be told)"""
+    import duckdb
+    try:
+        names = connection.get_table_names(statement)
+    except duckdb.Error:
+        return set(VIEWS)
+    used = names & set(VIEWS)
+    # orders is a view over sales
+    if 'orders' in used:
+        used.add('sales')
+    return used
+
+def load_views(connection, views):
+    """Replace ``views`` of a theta_core.sql connection by in-memory tables and drop the others"""
+    if 'orders' not in views:
+        connection.execute("DROP VIEW orders")
+    for view in sql.TABLES:
+        if view in views:
+            connection.execute(f"CREATE TABLE {view}_data AS SELECT * FROM {view}")
+            connection.execute(f"DROP VIEW {view}")
+            connection.execute(f"ALTER TABLE {view}_data RENAME TO {view}")
+        else:
+            connection.execute(f"DROP VIEW {view}")
+
+def lock_down(connection):
+    """Take away file access, extensions and settings changes before user SQL runs"""
+    for setting in ("enable_external_access=false",
+                    "autoinstall_known_extensions=false",
+                    "autoload_known_extensions=false",
+                    f"memory_limit={sql.literal(MEMORY_LIMIT)}",
+                    "lock_configuration=true"):
+        connection.execute(f"SET {setting}")
+
+def readonly_connection(data_dir="data", views=VIEWS):
+    """Connection holding ``views`` of the data directory in memory, with no file access"""
+    connection = sql.connect(data_dir)
+    load_views(connection, set(views))
+    lock_down(connection)
+    return connection
+
+def parse(connection, text):
+    """The single read-only statement in ``text``
+
+    Raises:
+        QueryError: If the text does not parse, or is not exactly one SELECT or an EXPLAIN of one
+    """
+    import duckdb
+    try:
+        statements = connection.extract_statements(text)
+    except duckdb.Error as e:
+        raise QueryError(str(e)) from e
+    if len(statements) != 1:
+        raise QueryError(f"Enter one statement at a time ({len(statements)} found)")
+    statement = statements[0]
+    kind = statement.type.name
+    if kind == "EXPLAIN":
+        # EXPLAIN ANALYZE runs the statement it explains, so that must be a SELECT too
+        try:
+            explained = connection.extract_statements(EXPLAIN_PREFIX.sub("", statement.query, count=1))
+        except duckdb.Error:
+            explained = []
+        kind = explained[0].type.name if len(explained) == 1 else "EXPLAIN"
+        if kind not in ALLOWED_STATEMENTS:
+            raise QueryError(f"Only SELECT queries can be explained here, not {kind}")
+    elif kind not in ALLOWED_STATEMENTS:
+        raise QueryError(f"Only SELECT queries can run here, not {kind}")
+    return statement.query
+
+class Query:
+    """A console query running in a background thread
+
+    ``status`` goes from "Running" to "Done", "Failed", "Timed out" or
+    "Cancelled"; ``rows`` and ``head()`` follow the rows fetched so far.
+    """
+
+    def __init__(self, text, data_dir="data", row_limit=ROW_LIMIT, timeout=TIMEOUT_SECONDS):
+        self.text = text
+        self.row_limit = row_limit
+        self.timeout = timeout
+        self.status = "Running"
+        self.error = None
+        self.rows = 0
+        self.truncated = False
+        self.started = time.perf_counter()
+        self.finished = None
+        self._chunks = []
+        self._result = None
+        self._csv = None
+        self._connection = None
+        self._stop = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(data_dir,), name="theta-sql", daemon=True)
+        self._thread.start()
+
+    def running(self):
+        """True until the query has finished, failed or been stopped"""
+        return self.finished is None
+
+    def elapsed(self):
+        """Seconds the query ran (so far)"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def wait(self, timeout=None):
+        """Block until the query is over (or ``timeout`` seconds pass)"""
+        self._thread.join(timeout)
+        return not self.running()
+
+    def cancel(self):
+        """Stop the query; rows fetched so far are kept"""
+        self._interrupt("Cancelled")
+
+    def _interrupt(self, reason):
+        """Interrupt the running statement, recording why"""
+        with self._lock:
+            if self._stop is None and self.running():
+                self._stop = reason
+                if self._connection is not None:
+                    self._connection.interrupt()
+
+    def _fetch(self, result):
+        """Pull result chunks until the end or the row limit"""
+        while self._stop is None:
+            chunk = result.fetch_df_chunk()
+            if chunk.empty:
+                if not self._chunks:
+                    # Keeps the column names of a query without rows
+                    self._chunks.append(chunk)
+                return
+            room = self.row_limit - self.rows
+            if room <= 0 or len(chunk) > room:
+                self.truncated = True
+                chunk = chunk.iloc[:max(room, 0)]
+            if not chunk.empty:
+                with self._lock:
+                    self._chunks.append(chunk)
+                    self.rows += len(chunk)
+            if self.truncated:
+                return
+
+    def _run(self, data_dir):
+        """Worker thread: open a locked-down connection, run the statement and fetch"""
+        import duckdb
+        # Pinned so the generation links the views read are not collected mid-query
+        storage.pin()
+        timer = threading.Timer(self.timeout, self._interrupt, args=("Timed out",))
+        timer.daemon = True
+        connection = None
+        try:
+            connection = sql.connect(data_dir)
+            statement = parse(connection, self.text)
+            with self._lock:
+                self._connection = connection
+            # Loading the tables counts towards the time limit and can be cancelled
+            timer.start()
+            with tracing.span("sql console load", 'load'):
+                if self._stop is None:
+                    load_views(connection, used_views(connection, statement))
+            lock_down(connection)
+            with tracing.span("sql console") as current:
+                if self._stop is None:
+                    self._fetch(connection.execute(statement))
+                current.record(rows=self.rows)
+            status = self._stop or "Done"
+        except duckdb.InterruptException:
+            status = self._stop or "Cancelled"
+        except Exception as e:
+            status, self.error = "Failed", str(e)
+        finally:
+            timer.cancel()
+            with self._lock:
+                self._connection = None
+            if connection is not None:
+                connection.close()
+            storage.unpin()
+        if status == "Timed out":
+            self.error = f"Stopped after {self.timeout:g} seconds"
+        self.status = status
+        self.finished = time.perf_counter()
+
+    def head(self, rows):
+        """First ``rows`` rows fetched so far"""
+        with self._lock:
+            chunks = list(self._chunks)
+        frame, taken = [], 0
+        for chunk in chunks:
+            if taken >= rows:
+                break
+            frame.append(chunk.iloc[:rows - taken])
+            taken += len(frame[-1])
+        return pd.concat(frame, ignore_index=True) if frame else pd.DataFrame()
+
+    def result(self):
+        """All rows fetched, once the query is over"""
+        if self._result is None and not self.running():
+            with self._lock:
+                chunks = list(self._chunks)
+            self._result = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        return self._result
+
+    def csv(self):
+        """The fetched rows as CSV bytes"""
+        if self._csv is None:
+            self._csv = self.result().to_csv(index=False).encode('utf-8')
+        return self._csv
@@ -0,0 +1,277 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+from collections import deque
+from theta_core import storage, data, inventory_ledger
+
+# Historical COGS per sale line, stamped by a single time-ordered pass over the
+# purchase ledger and sale consumption. Each ingredient keeps both a moving
+# average cost and FIFO cost layers. Results are stored in sales_cogs.csv and
+# the engine state in cost_state.json, so later runs only process new events.
+# Both are written by one storage command, which re-checks the state under the
+# write lock, so concurrent updates never stamp a line twice.
+STAMP_COLUMNS = ['Date', 'Order_ID', 'Product', 'Line', 'Quantity', 'COGS_Moving_Avg', 'COGS_FIFO']
+LINE_KEYS = ['Order_ID', 'Product', 'Date', 'Line']
+
+def stamps_path(data_dir="data"):
+    """Path of the stamped sale line costs"""
+    return os.path.join(data_dir, "sales_cogs.csv")
+
+def state_path(data_dir="data"):
+    """Path of the saved engine state"""
+    return os.path.join(data_dir, "cost_state.json")
+
+def prepare_sales(sales_df):
+    """Parse sales dates and number repeated lines so every line has a stable key"""
+    sales = sales_df[['Date', 'Order_ID', 'Product', 'Quantity']].copy()
+    sales['Date'] = pd.to_datetime(sales['Date'], format='mixed')
+    sales['Order_ID'] = sales['Order_ID'].astype(str)
+    sales['Line'] = sales.groupby(['Order_ID', 'Product', 'Date']).cumcount()
+    return sales
+
+def sales_digest(sales):
+    """Order-independent fingerprint of sale lines"""
+    if sales.empty:
+        return "0"
+    hashed = pd.util.hash_pandas_object(sales[LINE_KEYS + ['Quantity']], index=False)
+    return str(int(hashed.sum()))
+
+def new_ingredient_state():
+    """Empty cost state for one ingredient"""
+    return {'qty': 0.0, 'avg': 0.0, 'layers': deque(), 'last_cost': 0.0}
+
+def consume(state, quantity):
+    """Consume stock from an ingredient and return (moving average cost, FIFO cost)"""
+    ma_cost = quantity * state['avg']
+    state['qty'] = max(0.0, state['qty'] - quantity)
+
+    fifo_cost = 0.0
+    remaining = quantity
+    layers = state['layers']
+    while remaining > 1e-12 and layers:
+        layer = layers[0]
+        used = min(layer[0], remaining)
+        fifo_cost += used * layer[1]
+        layer[0] -= used
+        remaining -= used
+        if layer[0] <= 1e-12:
+            layers.popleft()
+    if remaining > 1e-12:
+        # Selling stock we never recorded buying: value it at the latest known cost
+        fifo_cost += remaining * state['last_cost']
+
+    return ma_cost, fifo_cost
+
+def receive(state, movement_type, quantity, unit_cost):
+    """Apply a ledger movement to an ingredient's cost layers"""
+    if movement_type == 'Addition':
+        new_qty = state['qty'] + quantity
+        state['avg'] = (state['qty'] * state['avg'] + quantity * unit_cost) / new_qty if new_qty > 0 else unit_cost
+        state['qty'] = new_qty
+        state['layers'].append([quantity, unit_cost])
+        state['last_cost'] = unit_cost
+    elif movement_type in ('Edit', 'Reconcile'):
+        # A manual count replaces the stock with one layer at the recorded cost
+        state['qty'] = quantity
+        state['avg'] = unit_cost
+        state['layers'] = deque([[quantity, unit_cost]]) if quantity > 0 else deque()
+        state['last_cost'] = unit_cost
+    elif movement_type == 'Deletion':
+        state.update(new_ingredient_state())
+
+def run_engine(purchases, lines, recipe_df, ingredients):
+    """Merge purchases and sale consumption in time order and cost each sale line
+
+    Args:
+        purchases: Ledger rows to apply (Timestamp, Material, Type, Quantity, Unit_Cost)
+        lines: Sale lines to cost (prepared with prepare_sales)
+        recipe_df: Product recipes
+        ingredients: Per-ingredient cost state, updated in place
+
+    Returns:
+        DataFrame of stamped lines using STAMP_COLUMNS
+    """
+    # Explode sale lines into ingredient consumption with one merge
+    lines = lines.reset_index(drop=True)
+    recipe = recipe_df[['Product', 'Ingredient', 'Quantity']].rename(columns={'Quantity': 'Recipe_Quantity'})
+    usage = lines.reset_index().merge(recipe, on='Product')
+    usage['Needed'] = usage['Quantity'] * pd.to_numeric(usage['Recipe_Quantity'], errors='coerce').fillna(0)
+
+    # Purchases sort before consumption at the same timestamp
+    events = pd.concat([
+        pd.DataFrame({
+            'Timestamp': purchases['Timestamp'], 'Kind': 0, 'Ingredient': purchases['Material'],
+            'Type': purchases['Type'], 'Amount': pd.to_numeric(purchases['Quantity'], errors='coerce').fillna(0),
+            'Unit_Cost': pd.to_numeric(purchases['Unit_Cost'], errors='coerce').fillna(0), 'Line': -1
+        }),
+        pd.DataFrame({
+            'Timestamp': usage['Date'], 'Kind': 1, 'Ingredient': usage['Ingredient'], 'Type': 'Sale',
+            'Amount': usage['Needed'], 'Unit_Cost': 0.0, 'Line': usage['index']
+        })
+    ], ignore_index=True).sort_values(['Timestamp', 'Kind'], kind='stable')
+
+    cogs_ma = np.zeros(len(lines))
+    cogs_fifo = np.zeros(len(lines))
+
+    for event in events.itertuples(index=False):
+        state = ingredients.setdefault(event.Ingredient, new_ingredient_state())
+        if event.Kind == 0:
+            receive(state, event.Type, event.Amount, event.Unit_Cost)
+        else:
+            ma_cost, fifo_cost = consume(state, event.Amount)
+            cogs_ma[event.Line] += ma_cost
+            cogs_fifo[event.Line] += fifo_cost
+
+    stamped = lines.copy()
+    stamped['COGS_Moving_Avg'] = cogs_ma
+    stamped['COGS_FIFO'] = cogs_fifo
+
+    # Lines with no recipe have no ingredient cost to stamp
+    has_recipe = np.zeros(len(lines), dtype=bool)
+    has_recipe[usage['index'].unique()] = True
+    stamped.loc[~has_recipe, ['COGS_Moving_Avg', 'COGS_FIFO']] = np.nan
+
+    return stamped[STAMP_COLUMNS]
+
+def load_state(data_dir="data"):
+    """Load the saved engine state, or None if there is none"""
+    try:
+        saved = json.loads(storage.read_bytes(state_path(data_dir)))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    for state in saved['ingredients'].values():
+        state['layers'] = deque(state['layers'])
+    saved['watermark'] = pd.Timestamp(saved['watermark'])
+    return saved
+
+def save_state(state, data_dir="data"):
+    """Stage the engine state (call from a storage command)"""
+    saved = dict(state)
+    saved['watermark'] = str(state['watermark'])
+    saved['ingredients'] = {
+        name: dict(values, layers=[list(layer) for layer in values['layers']])
+        for name, values in state['ingredients'].items()
+    }
+    storage.write_bytes(json.dumps(saved).encode('utf-8'), state_path(data_dir))
+
+def load_stamps(data_dir="data"):
+    """Load stamped sale line costs"""
+    try:
+        stamps = storage.read_csv(stamps_path(data_dir), dtype={'Order_ID': str})
+    except FileNotFoundError:
+        stamps = pd.DataFrame(columns=STAMP_COLUMNS)
+    stamps['Date'] = pd.to_datetime(stamps['Date'], format='mixed')
+    return stamps
+
+def write_stamps(stamps, data_dir="data", append=False):
+    """Stage stamped lines, appending new ones or replacing the file (call from a storage command)"""
+    stamps = stamps.copy()
+    stamps['Date'] = stamps['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    if append:
+        storage.append_csv(stamps, stamps_path(data_dir), index=False)
+    else:
+        storage.to_csv(stamps, stamps_path(data_dir), index=False)
+
+def load_inputs(data_dir="data"):
+    """Ledger, prepared sale lines and recipes the engine runs on"""
+    ledger = inventory_ledger.load_ledger(data_dir)
+    sales = prepare_sales(data.load_sales(data_dir))
+    recipe_df = storage.read_csv(os.path.join(data_dir, "product_recipe.csv"))
+    return ledger, sales, recipe_df
+
+def is_current(state, ledger, sales):
+    """True if the saved state already covers every ledger row and sale line"""
+    return (
+        state['ledger_rows'] == len(ledger)
+        and not (sales['Date'] > state['watermark']).any()
+        and sales_digest(sales) == state['sales_digest']
+    )
+
+def advance(state, ledger, sales, recipe_df):
+    """Cost the events the state has not seen yet
+
+    Only events after the saved watermark are processed. A full recompute is
+    done when there is no state or an older sale or purchase was added, edited
+    or deleted.
+
+    Returns:
+        Tuple of (newly stamped lines, True if they extend the saved stamps, new state)
+    """
+    purchases_mask = ledger['Type'].isin(['Addition', 'Edit', 'Reconcile', 'Deletion']) & ledger['Material'].notna()
+    if state is not None:
+        watermark = state['watermark']
+        new_ledger = ledger.iloc[state['ledger_rows']:]
+        processed = sales[sales['Date'] <= watermark]
+        unchanged = (
+            state['ledger_rows'] <= len(ledger)
+            and not (new_ledger['Timestamp'] <= watermark).any()
+            and sales_digest(processed) == state['sales_digest']
+        )
+        if not unchanged:
+            state = None
+
+    if state is None:
+        # Full recompute from the start of history
+        state = {'ingredients': {}, 'watermark': pd.Timestamp.min}
+        purchases = ledger[purchases_mask]
+        lines = sales
+        append = False
+    else:
+        purchases = new_ledger[purchases_mask.iloc[state['ledger_rows']:]]
+        lines = sales[sales['Date'] > state['watermark']]
+        append = True
+
+    stamped = run_engine(purchases, lines, recipe_df, state['ingredients'])
+
+    event_times = pd.concat([purchases['Timestamp'], lines['Date']])
+    if not event_times.empty:
+        state['watermark'] = max(state['watermark'], event_times.max())
+    state['ledger_rows'] = len(ledger)
+    state['sales_digest'] = sales_digest(sales[sales['Date'] <= state['watermark']])
+    return stamped, append, state
+
+def _update_command(data_dir, force):
+    """Storage command bringing the stamps and the state up to date together"""
+    def update_stamps():
+        ledger, sales, recipe_df = load_inputs(data_dir)
+        state = None if force else load_state(data_dir)
+        # Another update may have caught up since the caller looked
+        if state is not None and is_current(state, ledger, sales):
+            return 0
+        stamped, append, state = advance(state, ledger, sales, recipe_df)
+        if not stamped.empty or not append:
+            write_stamps(stamped, data_dir, append=append)
+        save_state(state, data_dir)
+        return len(stamped)
+    return update_stamps
+
+def update_sales_cogs(data_dir="data", force=False, save=True):
+    """Bring the historical COGS stamps up to date
+
+    The stamps and the engine state are written by one storage command, so
+    concurrent updates take turns and a crash leaves both as they were.
+    With ``save=False`` the missing stamps are computed in memory and nothing
+    is written (for read-only callers such as the CLI).
+
+    Returns:
+        Tuple of (all stamped lines, number of lines processed in this run)
+    """
+    ledger, sales, recipe_df = load_inputs(data_dir)
+    state = None if force else load_state(data_dir)
+    if state is not None and is_current(state, ledger, sales):
+        return load_stamps(data_dir), 0
+    if not save:
+        stamped, append, _ = advance(state, ledger, sales, recipe_df)
+        stamps = pd.concat([load_stamps(data_dir), stamped], ignore_index=True) if append else stamped
+        return stamps, len(stamped)
+    processed = storage.submit(_update_command(data_dir, force), data_dir)
+    return load_stamps(data_dir), processed
+
+def attach_line_keys(sales_df):
+    """Add the Line key used by the stamps to a parsed sales dataframe"""
+    keyed = sales_df.copy()
+    keyed['Order_ID'] = keyed['Order_ID'].astype(str)
+    keyed['Line'] = keyed.groupby(['Order_ID', 'Product', 'Date']).cumcount()
+    return keyed
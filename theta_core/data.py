@@ -0,0 +1,110 @@
+import pandas as pd
+import os
+from datetime import datetime, timedelta
+from theta_core import tracing, storage, archive
+
+SALES_COLUMNS = ['Date', 'Order_ID', 'Product', 'Quantity', 'Unit_Price', 'Total', 'Promo', 'Net_Total', 'Location']
+
+# Days before today covered by each preset time filter ("Today" is day 0)
+PERIOD_DAYS = {
+    "Today": 0,
+    "Last 7 Days": 6,
+    "Last 30 Days": 29,
+    "Last 90 Days": 89,
+    "Last 6 Months": 180,
+    "Last Year": 365
+}
+
+def date_range(time_filter, today=None):
+    """Get start and end dates (inclusive) for a preset time filter"""
+    end_date = today or datetime.now().date()
+
+    if time_filter in PERIOD_DAYS:
+        start_date = end_date - timedelta(days=PERIOD_DAYS[time_filter])
+    elif time_filter == "All Time":
+        start_date = datetime(2020, 1, 1).date()
+    else:  # Custom - handled separately in the app
+        start_date = end_date - timedelta(days=7)  # Default fallback
+
+    return start_date, end_date
+
+@tracing.traced()
+def filter_period(df, start_date=None, end_date=None, column='Date'):
+    """Keep rows whose date falls within [start_date, end_date]; None means unbounded"""
+    days = df[column].dt.normalize()
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= days >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= days <= pd.Timestamp(end_date)
+    return df[mask]
+
+def read_table(name, data_dir="data", columns=None, dtype=None):
+    """Read a data file, returning an empty frame with ``columns`` if it is missing"""
+    try:
+        return storage.read_csv(os.path.join(data_dir, name), dtype=dtype)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=columns)
+
+def sales_columns(sales):
+    """Parse sale dates and make sure the promotion columns are present"""
+    sales['Date'] = pd.to_datetime(sales['Date'], format='mixed')
+    if 'Net_Total' not in sales.columns:
+        sales['Net_Total'] = sales['Total']
+    if 'Promo' not in sales.columns:
+        sales['Promo'] = 0.0
+    return sales
+
+def load_live_sales(data_dir="data"):
+    """Load the sales still in sales.csv (see theta_core.archive for older ones)"""
+    return sales_columns(read_table("sales.csv", data_dir, SALES_COLUMNS, dtype={'Order_ID': str}))
+
+def load_appended_sales(data_dir="data", since=None):
+    """Sale lines appended to sales.csv after version ``since`` (see storage.version)
+
+    Returns:
+        The new lines, or None if sales.csv was rewritten since (an order was
+        edited or deleted, or sales were archived) and has to be read whole
+    """
+    appended = storage.read_appended(os.path.join(data_dir, "sales.csv"), since, dtype={'Order_ID': str})
+    return None if appended is None else sales_columns(appended)
+
+def load_archived_sales(data_dir="data", names=None, start_date=None, end_date=None):
+    """Load archived sales from partitions ``names`` (default: all), see archive.read_sales"""
+    archived = archive.read_sales(data_dir, names, start_date, end_date)
+    if archived.empty:
+        return pd.DataFrame(columns=SALES_COLUMNS).astype({'Date': 'datetime64[ns]'})
+    return sales_columns(archived)
+
+def load_sales(data_dir="data", start_date=None, end_date=None):
+    """Load sales with parsed dates and the promotion columns always present
+
+    The archive is read only when [start_date, end_date] reaches into an
+    archived month (None means unbounded), and only its rows in the range are
+    kept. Live rows are not filtered; use filter_period for that.
+    """
+    sales = load_live_sales(data_dir)
+    names = archive.partitions(data_dir, start_date, end_date)
+    archived = archive.read_sales(data_dir, names, start_date, end_date) if names else pd.DataFrame()
+    if archived.empty:
+        return sales
+    return pd.concat([sales_columns(archived), sales], ignore_index=True)
+
+def load_products(data_dir="data"):
+    """Load the product catalog"""
+    return read_table("products.csv", data_dir, ['Name', 'Price', 'COGS', 'Profit'])
+
+def load_recipes(data_dir="data"):
+    """Load product recipes"""
+    return read_table("product_recipe.csv", data_dir, ['Product', 'Ingredient', 'Quantity', 'Unit'])
+
+def load_inventory(data_dir="data"):
+    """Load current inventory"""
+    return read_table("inventory.csv", data_dir, ['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
+
+def load_operational_costs(data_dir="data"):
+    """Load operational costs with parsed dates and numeric amounts"""
+    costs = read_table("operational_costs.csv", data_dir, ['Date', 'Type', 'Amount'])
+    costs['Date'] = pd.to_datetime(costs['Date'])
+    costs['Amount'] = pd.to_numeric(costs['Amount'], errors='coerce').fillna(0)
+    return costs
@@ -0,0 +1,139 @@
+import pandas as pd
+from theta_core.tracing import traced
+from theta_core import cost_layers
+
+# Costing methods and the stamp column each one reads (None = current product COGS)
+COSTING_METHODS = {
+    "Moving Average": 'COGS_Moving_Avg',
+    "FIFO": 'COGS_FIFO',
+    "Current Recipe Cost": None
+}
+
+@traced()
+def merge_cogs(sales, products):
+    """Attach product price and current COGS to each sale line (Quantity becomes Order_Quantity)"""
+    merged = sales.rename(columns={'Quantity': 'Order_Quantity'})
+    return pd.merge(merged, products, left_on='Product', right_on='Name', how='left')
+
+@traced()
+def apply_cost_stamps(merged, stamps, costing_method):
+    """Replace current COGS with the historical cost stamped on each sale line
+
+    Lines without a stamp (e.g. no recipe) keep the current product COGS.
+    """
+    stamp_column = COSTING_METHODS[costing_method]
+    if stamp_column is None or merged.empty:
+        return merged
+
+    merged = cost_layers.attach_line_keys(merged)
+    # A line stamped twice must not be costed twice
+    stamps = stamps.drop_duplicates(cost_layers.LINE_KEYS, keep='last')
+    merged = pd.merge(merged, stamps[cost_layers.LINE_KEYS + [stamp_column]],
+                      on=cost_layers.LINE_KEYS, how='left')
+    historical_unit_cogs = merged[stamp_column] / merged['Order_Quantity']
+    merged['COGS'] = historical_unit_cogs.fillna(merged['COGS'])
+    return merged
+
+@traced()
+def profit_by_product(merged):
+    """Gross profit (price - COGS) per product, in order of first sale"""
+    if merged.empty or not {'Price', 'COGS', 'Order_Quantity'}.issubset(merged.columns):
+        return pd.DataFrame(columns=['Product', 'Profit'])
+
+    profit = (pd.to_numeric(merged['Price'], errors='coerce') - pd.to_numeric(merged['COGS'], errors='coerce')) \
+        * merged['Order_Quantity']
+    by_product = profit.groupby(merged['Product'], sort=False).sum()
+    return by_product.rename('Profit').rename_axis('Product').reset_index()
+
+@traced()
+def financial_kpis(sales, merged, period_costs):
+    """Financial KPIs for a period
+
+    Args:
+        sales: Sales in the period
+        merged: Sale lines with COGS (from merge_cogs / apply_cost_stamps)
+        period_costs: Operational costs in the period
+
+    Returns:
+        Dict of revenue, COGS, profit and margin figures
+    """
+    total_cogs = (merged['COGS'] * merged['Order_Quantity']).sum() if not merged.empty else 0
+
+    product_profit = profit_by_product(merged)
+    if not product_profit.empty and product_profit['Profit'].notnull().any():
+        best = product_profit.loc[product_profit['Profit'].idxmax()]
+        most_profitable = (best['Product'], best['Profit'])
+    else:
+        most_profitable = ('N/A', 0)
+
+    return kpi_figures(sales['Total'].sum(), sales['Net_Total'].sum(), total_cogs,
+                       period_costs['Amount'].sum(), most_profitable)
+
+def kpi_figures(gross_revenue, net_revenue, total_cogs, operational_costs, most_profitable):
+    """Financial KPIs from the period totals (shared by both analytics engines)
+
+    Args:
+        most_profitable: (product, gross profit) of the most profitable product
+    """
+    # Gross Profit = Net Revenue - COGS; Net Profit = Gross Profit - operational costs
+    # (no taxes, returns or financial expenses are tracked)
+    gross_profit = net_revenue - total_cogs
+    net_profit = gross_profit - operational_costs
+    most_profitable, most_profitable_amount = most_profitable
+
+    return {
+        'gross_revenue': gross_revenue,
+        'net_revenue': net_revenue,
+        'promo_impact': ((gross_revenue - net_revenue) / gross_revenue * 100) if gross_revenue > 0 else 0,
+        'total_cogs': total_cogs,
+        'gross_profit': gross_profit,
+        'gross_profit_margin': (gross_profit / net_revenue * 100) if net_revenue > 0 else 0,
+        'operational_costs': operational_costs,
+        'net_profit': net_profit,
+        'net_margin': (net_profit / net_revenue * 100) if net_revenue > 0 else 0,
+        'most_profitable_product': most_profitable,
+        'most_profitable_profit': most_profitable_amount
+    }
+
+@traced()
+def daily_finance(sales, merged, operational_costs=0):
+    """Daily revenue, promotions, COGS and profit
+
+    Operational costs for the period are spread evenly over the days with sales.
+    """
+    daily = sales.groupby(sales['Date'].dt.date).agg(
+        {'Total': 'sum', 'Net_Total': 'sum', 'Promo': 'sum'}
+    ).reset_index()
+
+    if not merged.empty and 'COGS' in merged.columns:
+        row_cogs = merged['COGS'] * merged['Order_Quantity']
+        cogs = row_cogs.groupby(merged['Date'].dt.date).sum().rename('COGS')
+        daily = daily.merge(cogs, left_on='Date', right_index=True, how='left').fillna(0)
+    else:
+        daily['COGS'] = 0
+
+    daily['Net_Revenue'] = daily['Net_Total']
+    daily['Gross_Profit'] = daily['Net_Revenue'] - daily['COGS']
+    daily_op_cost = operational_costs / len(daily) if len(daily) > 0 and operational_costs > 0 else 0
+    daily['Operating_Profit'] = daily['Gross_Profit'] - daily_op_cost
+    return daily
+
+@traced()
+def business_costs(inventory, operational_costs):
+    """Inventory value per item plus all operational costs by type, smallest first"""
+    quantity = pd.to_numeric(inventory['Quantity'], errors='coerce')
+    unit_cost = pd.to_numeric(inventory['Avg_Cost'], errors='coerce')
+    inventory_costs = pd.DataFrame({
+        'Category': inventory['Name'],
+        'Amount': quantity * unit_cost,
+        'Type': 'Variable Cost'
+    }).dropna(subset=['Category'])
+
+    op_costs = operational_costs.groupby('Type')['Amount'].sum().reset_index()
+    op_costs = op_costs.rename(columns={'Type': 'Category'})
+    op_costs['Type'] = 'Operational'
+
+    all_costs = pd.concat([inventory_costs, op_costs], ignore_index=True)
+    all_costs['Amount'] = pd.to_numeric(all_costs['Amount'], errors='coerce').fillna(0)
+    all_costs = all_costs[all_costs['Amount'] > 0]
+    return all_costs.sort_values('Amount')
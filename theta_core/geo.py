@@ -0,0 +1,36 @@
+import pandas as pd
+from theta_core.tracing import traced
+
+@traced()
+def order_locations(sales):
+    """One row per order with a usable location: Order_ID, Date, Location, Total
+
+    The location and date come from the first line of each order.
+    """
+    if 'Location' not in sales.columns or sales.empty:
+        return pd.DataFrame(columns=['Order_ID', 'Date', 'Location', 'Total'])
+
+    first_lines = sales.drop_duplicates('Order_ID', keep='first').set_index('Order_ID')[['Date', 'Location']]
+    totals = sales.groupby('Order_ID')['Total'].sum()
+    orders = first_lines.join(totals).sort_index().reset_index()
+
+    location = orders['Location'].where(orders['Location'].map(lambda value: isinstance(value, str)), '')
+    valid = (location.str.strip() != '') & (location.str.lower() != 'nan')
+    return orders[valid].reset_index(drop=True)
+
+@traced()
+def locate_orders(orders, geocode):
+    """Add Latitude/Longitude to orders, geocoding each distinct location once
+
+    Args:
+        orders: Orders from order_locations
+        geocode: Function mapping an address to (lat, lon), or (None, None)
+
+    Returns:
+        Orders whose location could be resolved
+    """
+    coordinates = {location: geocode(location) for location in orders['Location'].unique()}
+    located = orders.copy()
+    located['Latitude'] = located['Location'].map(lambda location: coordinates[location][0])
+    located['Longitude'] = located['Location'].map(lambda location: coordinates[location][1])
+    return located.dropna(subset=['Latitude', 'Longitude']).reset_index(drop=True)
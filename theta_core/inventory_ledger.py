@@ -0,0 +1,262 @@
+import pandas as pd
+import numpy as np
+import os
+from datetime import datetime
+from theta_core import storage
+
+# Every stock movement is one row in inventory_transactions.csv. Row order is the
+# order the movements were applied, so replaying the file rebuilds inventory.csv.
+# Snapshots, rebuilds and reconciliations run as commands on the
+# theta_core.storage writer; append_movements is called from inside one.
+LEDGER_COLUMNS = ['Date', 'Material', 'Quantity', 'Unit', 'Unit_Cost', 'Total_Cost', 'Type', 'Reference']
+SNAPSHOT_COLUMNS = ['Ledger_Rows', 'Snapshot_Date', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date']
+INVENTORY_COLUMNS = ['ID', 'Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date']
+
+# Movement types and how they are replayed
+#   Addition           purchase, adds quantity and blends the average cost
+#   Sale / Restore     signed quantity change from saving or deleting an order
+#   Edit / Reconcile   sets quantity, unit and cost to the recorded values
+#   Deletion           removes the item
+MOVEMENT_TYPES = ['Addition', 'Sale', 'Restore', 'Edit', 'Reconcile', 'Deletion']
+
+# Take a new snapshot once this many rows have been appended since the last one
+SNAPSHOT_INTERVAL = 500
+
+def ledger_path(data_dir="data"):
+    """Path of the inventory ledger"""
+    return os.path.join(data_dir, "inventory_transactions.csv")
+
+def snapshot_path(data_dir="data"):
+    """Path of the inventory snapshot file"""
+    return os.path.join(data_dir, "inventory_snapshots.csv")
+
+def timestamp(value=None):
+    """Format a movement time for the ledger"""
+    return (value or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+def append_movements(movements, data_dir="data"):
+    """Append stock movements to the ledger
+
+    Args:
+        movements: DataFrame or list of dicts using LEDGER_COLUMNS
+        data_dir: Directory holding the data files
+    """
+    movements = pd.DataFrame(movements)
+    if movements.empty:
+        return
+
+    storage.append_csv(movements.reindex(columns=LEDGER_COLUMNS), ledger_path(data_dir), index=False)
+
+def load_ledger(data_dir="data"):
+    """Load the ledger in file order with a parsed Timestamp column"""
+    try:
+        ledger = storage.read_csv(ledger_path(data_dir))
+    except FileNotFoundError:
+        ledger = pd.DataFrame(columns=LEDGER_COLUMNS)
+
+    ledger = ledger.reindex(columns=LEDGER_COLUMNS)
+    ledger['Timestamp'] = pd.to_datetime(ledger['Date'], format='mixed')
+    return ledger
+
+def load_snapshots(data_dir="data"):
+    """Load all stored snapshots"""
+    try:
+        snapshots = storage.read_csv(snapshot_path(data_dir))
+    except FileNotFoundError:
+        snapshots = pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+
+    snapshots['Snapshot_Date'] = pd.to_datetime(snapshots['Snapshot_Date'], format='mixed')
+    snapshots['Ledger_Rows'] = snapshots['Ledger_Rows'].astype(int)
+    return snapshots
+
+def replay(ledger, state=None):
+    """Apply ledger rows, in order, to an inventory state
+
+    The state maps Name -> [Quantity, Unit, Avg_Cost, Date] and keeps inventory order.
+    """
+    state = {name: list(values) for name, values in (state or {}).items()}
+
+    for row in ledger.itertuples(index=False):
+        name = row.Material
+        if pd.isna(name):
+            continue
+
+        quantity = 0.0 if pd.isna(row.Quantity) else float(row.Quantity)
+        unit_cost = 0.0 if pd.isna(row.Unit_Cost) else float(row.Unit_Cost)
+        date = row.Timestamp.strftime('%Y-%m-%d')
+
+        if row.Type == 'Addition':
+            if name in state:
+                item = state[name]
+                new_qty = item[0] + quantity
+                item[2] = (item[0] * item[2] + quantity * unit_cost) / new_qty if new_qty > 0 else unit_cost
+                item[0] = new_qty
+                item[3] = date
+            else:
+                state[name] = [quantity, row.Unit, unit_cost, date]
+
+        elif row.Type in ('Sale', 'Restore'):
+            if name in state:
+                state[name][0] += quantity
+
+        elif row.Type in ('Edit', 'Reconcile'):
+            # An edit may also rename the item, keeping its position
+            old_name = row.Reference
+            if isinstance(old_name, str) and old_name != name and old_name in state:
+                state = {(name if key == old_name else key): values for key, values in state.items()}
+            state[name] = [quantity, row.Unit, unit_cost, date]
+
+        elif row.Type == 'Deletion':
+            state.pop(name, None)
+
+    return state
+
+def state_to_frame(state):
+    """Convert a replay state into the inventory.csv layout"""
+    rows = [[name] + values for name, values in state.items()]
+    inventory = pd.DataFrame(rows, columns=['Name', 'Quantity', 'Unit', 'Avg_Cost', 'Date'])
+    inventory.insert(0, 'ID', range(1, len(inventory) + 1))
+    return inventory
+
+def frame_to_state(inventory):
+    """Convert inventory or snapshot rows into a replay state"""
+    inventory = inventory.dropna(subset=['Name'])
+    return {
+        row.Name: [float(row.Quantity), row.Unit, float(row.Avg_Cost), row.Date]
+        for row in inventory.itertuples(index=False)
+    }
+
+def stock_at(when=None, data_dir="data", ledger=None):
+    """Return inventory as it stood at a point in time
+
+    Starts from the latest snapshot that is fully before ``when`` and replays
+    only the ledger rows after it. ``when=None`` returns the current stock.
+    """
+    if ledger is None:
+        ledger = load_ledger(data_dir)
+    snapshots = load_snapshots(data_dir)
+    cutoff = pd.Timestamp(when) if when is not None else None
+
+    # A snapshot holds every row before Ledger_Rows, so it is usable once all of them are <= cutoff
+    usable = snapshots[snapshots['Ledger_Rows'] <= len(ledger)]
+    if cutoff is not None:
+        usable = usable[usable['Snapshot_Date'] <= cutoff]
+
+    if usable.empty:
+        start_row, state = 0, {}
+    else:
+        start_row = int(usable['Ledger_Rows'].max())
+        state = frame_to_state(usable[usable['Ledger_Rows'] == start_row])
+
+    tail = ledger.iloc[start_row:]
+    if cutoff is not None:
+        tail = tail[tail['Timestamp'] <= cutoff]
+
+    return state_to_frame(replay(tail, state))
+
+def take_snapshot(data_dir="data", ledger=None, force=False):
+    """Store the current stock as a snapshot of the whole ledger
+
+    Unless forced, a snapshot is only taken after SNAPSHOT_INTERVAL new rows.
+
+    Returns:
+        True if a snapshot was written
+    """
+    def take():
+        current = load_ledger(data_dir) if ledger is None else ledger
+        if current.empty:
+            return False
+
+        snapshots = load_snapshots(data_dir)
+        last_rows = int(snapshots['Ledger_Rows'].max()) if not snapshots.empty else 0
+        if last_rows >= len(current) or (not force and len(current) - last_rows < SNAPSHOT_INTERVAL):
+            return False
+
+        snapshot = stock_at(None, data_dir, current).drop(columns=['ID'])
+        if snapshot.empty:
+            # Keep a marker row so an empty inventory is still a valid starting point
+            snapshot = pd.DataFrame([{'Name': np.nan, 'Quantity': 0.0, 'Unit': '', 'Avg_Cost': 0.0, 'Date': ''}])
+        snapshot.insert(0, 'Ledger_Rows', len(current))
+        snapshot.insert(1, 'Snapshot_Date', timestamp(current['Timestamp'].max()))
+
+        storage.append_csv(snapshot[SNAPSHOT_COLUMNS], snapshot_path(data_dir), index=False)
+        return True
+    return storage.submit(take, data_dir)
+
+def rebuild_inventory(data_dir="data", write=False):
+    """Rebuild inventory.csv from the ledger
+
+    Args:
+        data_dir: Directory holding the data files
+        write: Whether to overwrite inventory.csv with the rebuilt view
+    """
+    def rebuild():
+        ledger = load_ledger(data_dir)
+        inventory = stock_at(None, data_dir, ledger)
+        take_snapshot(data_dir, ledger)
+
+        if write:
+            storage.to_csv(inventory, os.path.join(data_dir, "inventory.csv"), index=False)
+
+        return inventory
+    return storage.submit(rebuild, data_dir)
+
+def verify_inventory(data_dir="data"):
+    """Compare inventory.csv with the inventory replayed from the ledger
+
+    Read-only: the replay stays in memory and no snapshot is taken.
+
+    Returns:
+        DataFrame of items whose quantity, unit or cost disagree (empty if consistent)
+    """
+    rebuilt = stock_at(None, data_dir)
+    try:
+        current = storage.read_csv(os.path.join(data_dir, "inventory.csv"))
+    except FileNotFoundError:
+        current = pd.DataFrame(columns=INVENTORY_COLUMNS)
+
+    merged = pd.merge(
+        rebuilt[['Name', 'Quantity', 'Unit', 'Avg_Cost']],
+        current[['Name', 'Quantity', 'Unit', 'Avg_Cost']],
+        on='Name', how='outer', suffixes=('_Ledger', '_Inventory'), indicator=True
+    )
+
+    qty_ok = np.isclose(merged['Quantity_Ledger'].astype(float), merged['Quantity_Inventory'].astype(float))
+    cost_ok = np.isclose(merged['Avg_Cost_Ledger'].astype(float), merged['Avg_Cost_Inventory'].astype(float))
+    unit_ok = merged['Unit_Ledger'].astype(str) == merged['Unit_Inventory'].astype(str)
+    matched = (merged['_merge'] == 'both') & qty_ok & cost_ok & unit_ok
+
+    mismatches = merged[~matched].rename(columns={'_merge': 'Found_In'})
+    mismatches['Found_In'] = mismatches['Found_In'].map({
+        'both': 'Both', 'left_only': 'Ledger only', 'right_only': 'Inventory only'
+    })
+    return mismatches.reset_index(drop=True)
+
+def reconcile_ledger(data_dir="data"):
+    """Append Reconcile/Deletion rows so the ledger matches inventory.csv
+
+    Used once to bring movements recorded before the ledger existed into line.
+
+    Returns:
+        Number of rows appended
+    """
+    def reconcile():
+        mismatches = verify_inventory(data_dir)
+        if mismatches.empty:
+            return 0
+
+        now = timestamp()
+        movements = []
+        for row in mismatches.itertuples(index=False):
+            if row.Found_In == 'Ledger only':
+                movements.append({'Date': now, 'Material': row.Name, 'Quantity': 0, 'Unit': '',
+                                  'Unit_Cost': 0, 'Total_Cost': 0, 'Type': 'Deletion'})
+            else:
+                movements.append({'Date': now, 'Material': row.Name, 'Quantity': row.Quantity_Inventory,
+                                  'Unit': row.Unit_Inventory, 'Unit_Cost': row.Avg_Cost_Inventory,
+                                  'Total_Cost': row.Quantity_Inventory * row.Avg_Cost_Inventory,
+                                  'Type': 'Reconcile'})
+
+        append_movements(movements, data_dir)
+        return len(movements)
+    return storage.submit(reconcile, data_dir)
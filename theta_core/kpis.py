@@ -0,0 +1,57 @@
+import pandas as pd
+from theta_core.tracing import traced
+
+@traced()
+def sales_kpis(sales, products):
+    """Dashboard KPIs for a period of sales
+
+    Args:
+        sales: Sales in the period (from load_sales, already filtered)
+        products: Product catalog with COGS
+
+    Returns:
+        Dict with revenue, orders, top product, cups sold, gross profit and margin
+    """
+    total_revenue = sales['Net_Total'].sum()
+
+    quantities = sales.groupby('Product')['Quantity'].sum()
+    if quantities.empty:
+        top_product, top_quantity = 'N/A', 0
+    else:
+        top_product, top_quantity = quantities.idxmax(), quantities.max()
+
+    # Products without a catalog entry have no known cost and are left out of COGS
+    costs = sales[['Product', 'Quantity']].merge(products[['Name', 'COGS']], left_on='Product', right_on='Name')
+    gross_profit = total_revenue - (costs['COGS'] * costs['Quantity']).sum()
+
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': sales['Order_ID'].nunique(),
+        'top_product': top_product,
+        'top_product_quantity': top_quantity,
+        'total_cups': sales['Quantity'].sum(),
+        'gross_profit': gross_profit,
+        'gross_margin': (gross_profit / total_revenue * 100) if total_revenue > 0 else 0
+    }
+
+@traced()
+def product_sales(sales):
+    """Units sold per product, best sellers first"""
+    breakdown = sales.groupby('Product')['Quantity'].sum().reset_index()
+    return breakdown.sort_values('Quantity', ascending=False)
+
+@traced()
+def ingredient_usage(sales, recipes):
+    """Ingredient quantities used by a period of sales, most used first"""
+    usage = sales[['Product', 'Quantity']].rename(columns={'Quantity': 'Order_Quantity'}).merge(
+        recipes[['Product', 'Ingredient', 'Quantity']].rename(columns={'Quantity': 'Recipe_Quantity'}),
+        on='Product'
+    )
+    usage['Quantity_Used'] = usage['Order_Quantity'] * usage['Recipe_Quantity']
+    used = usage.groupby('Ingredient')['Quantity_Used'].sum().reset_index()
+    return used.sort_values('Quantity_Used', ascending=False)
+
+@traced()
+def daily_revenue(sales):
+    """Net revenue per day"""
+    return sales.groupby(sales['Date'].dt.date)['Net_Total'].sum().reset_index()
@@ -0,0 +1,79 @@
+import pandas as pd
+from theta_core import data, kpis
+
+# Incremental dashboard figures for live mode. A LiveRollup keeps running totals
+# for one period: revenue, cups, the set of orders, units per product and
+# revenue per day. It is filled once from the period's sales, then add() takes
+# only the sale lines appended since its watermark (the version of sales.csv
+# it has read up to). KPIs, ingredient usage and the chart series are derived
+# from those totals on demand. Ingredient usage and COGS are linear in the
+# units sold per product, so the totals are all they need. The figures equal
+# analytics.dashboard_figures over the same sales, up to float rounding.
+
+def combine(left, right):
+    """Sum two Series by index, keeping integer dtypes, sorted by index like a groupby"""
+    if left.empty:
+        return right.sort_index()
+    return pd.concat([left, right]).groupby(level=0).sum()
+
+class LiveRollup:
+    """Running dashboard totals for the sales of [start_date, end_date]
+
+    ``versions`` identifies the other inputs (products, recipes, archive);
+    when they change the rollup must be rebuilt.
+    """
+
+    def __init__(self, start_date, end_date, versions):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.versions = versions
+        self.watermark = None
+        self.revenue = 0
+        self.cups = 0
+        self.orders = set()
+        self.quantities = pd.Series(dtype='int64')
+        self.daily = pd.Series(dtype='float64')
+        self.lines = 0
+
+    def matches(self, start_date, end_date, versions):
+        """True if this rollup can be brought up to date for the period and inputs"""
+        return (self.start_date, self.end_date, self.versions) == (start_date, end_date, versions)
+
+    def add(self, sales, watermark):
+        """Fold in sale lines (only the period's are kept) and move the watermark"""
+        sales = data.filter_period(sales, self.start_date, self.end_date)
+        self.watermark = watermark
+        if sales.empty:
+            return
+        self.revenue += sales['Net_Total'].sum()
+        self.cups += sales['Quantity'].sum()
+        self.orders.update(sales['Order_ID'].dropna())
+        self.quantities = combine(self.quantities, sales.groupby('Product')['Quantity'].sum())
+        self.daily = combine(self.daily, sales.groupby(sales['Date'].dt.date)['Net_Total'].sum())
+        self.lines += len(sales)
+
+    def figures(self, products, recipes):
+        """Same dict as analytics.dashboard_figures, from the running totals"""
+        if self.quantities.empty:
+            top_product, top_quantity = 'N/A', 0
+        else:
+            top_product, top_quantity = self.quantities.idxmax(), self.quantities.max()
+        # Products without a catalog entry have no known cost and are left out of COGS
+        unit_cogs = products.groupby('Name')['COGS'].sum()
+        gross_profit = self.revenue - (self.quantities * unit_cogs.reindex(self.quantities.index)).sum()
+
+        sold = self.quantities.rename_axis('Product').rename('Quantity').reset_index()
+        return {
+            'kpis': {
+                'total_revenue': self.revenue,
+                'total_orders': len(self.orders),
+                'top_product': top_product,
+                'top_product_quantity': top_quantity,
+                'total_cups': self.cups,
+                'gross_profit': gross_profit,
+                'gross_margin': (gross_profit / self.revenue * 100) if self.revenue > 0 else 0
+            },
+            'ingredients': kpis.ingredient_usage(sold, recipes),
+            'daily_revenue': self.daily.rename_axis('Date').rename('Net_Total').reset_index(),
+            'products': sold.sort_values('Quantity', ascending=False)
+        }
@@ -0,0 +1,222 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Process-wide counters and histograms in the Prometheus text format. They are
+# fed by theta_core.tracing (reruns, CSV I/O), the cached loaders, the order
+# write path and the writer queue in theta_core.storage, and served by an
+# optional background HTTP thread.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = {}
+_lock = threading.Lock()
+_server = {'instance': None, 'port': None, 'error': None}
+
+def _escape(value):
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    """Render {'page': 'x'} as {page="x"}"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add ``amount`` to the series for ``labels``"""
+        key = tuple((name, labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Current value of one series"""
+        key = tuple((name, labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        """(name, labels, value) for every series"""
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative histogram of observations, e.g. durations in seconds"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = tuple((name, labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        """Bucket, sum and count samples for every series"""
+        rows = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    rows.append((f"{self.name}_bucket", key + (('le', _format_value(float(bound))),), count))
+                rows.append((f"{self.name}_bucket", key + (('le', "+Inf"),), series['count']))
+                rows.append((f"{self.name}_sum", key, series['sum']))
+                rows.append((f"{self.name}_count", key, series['count']))
+        return rows
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def samples(self):
+        """Single sample from the callback (none if it fails or returns None)"""
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [] if value is None else [(self.name, (), value)]
+
+def _register(metric):
+    """Add a metric to the registry, returning the existing one on re-registration"""
+    with _lock:
+        return _registry.setdefault(metric.name, metric)
+
+def counter(name, documentation, labels=()):
+    """Get or create a counter"""
+    return _register(Counter(name, documentation, labels))
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    """Get or create a histogram"""
+    return _register(Histogram(name, documentation, labels, buckets))
+
+def gauge(name, documentation, callback):
+    """Register a gauge read from ``callback`` on every scrape (replaces an earlier one)"""
+    with _lock:
+        _registry[name] = Gauge(name, documentation, callback)
+        return _registry[name]
+
+RERUN_SECONDS = histogram("theta_rerun_duration_seconds", "Page rerun duration", ("page",))
+SPAN_SECONDS = histogram("theta_span_duration_seconds", "Traced span duration by kind", ("kind",))
+BYTES_READ = counter("theta_csv_read_bytes_total", "Bytes of data files read", ("file",))
+BYTES_WRITTEN = counter("theta_csv_written_bytes_total", "Bytes of data files written", ("file",))
+CACHE_REQUESTS = counter("theta_cache_requests_total", "Lookups of cached results", ("cache",))
+CACHE_MISSES = counter("theta_cache_misses_total", "Cached result lookups that had to compute", ("cache",))
+ORDERS_SAVED = counter("theta_orders_saved_total", "Orders saved")
+WRITE_LOCK_WAIT = histogram("theta_write_lock_wait_seconds", "Time spent waiting for the data write lock",
+                            ("file",), buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+WRITE_BATCH_COMMANDS = histogram("theta_write_batch_commands", "Commands applied per group commit",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64))
+
+def cache_request(cache):
+    """Count a lookup of ``cache`` (hits are lookups minus misses)"""
+    CACHE_REQUESTS.inc(cache=cache)
+
+def cache_miss(cache):
+    """Count a lookup of ``cache`` that had to compute its result"""
+    CACHE_MISSES.inc(cache=cache)
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    with _lock:
+        metrics = list(_registry.values())
+
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    # Hits are derived so the cached functions only need to count misses
+    lines.append("# HELP theta_cache_hits_total Cached result lookups served from the cache")
+    lines.append("# TYPE theta_cache_hits_total counter")
+    misses = {labels: value for _, labels, value in CACHE_MISSES.samples()}
+    for _, labels, requests in CACHE_REQUESTS.samples():
+        lines.append(f"theta_cache_hits_total{_format_labels(labels)} {max(requests - misses.get(labels, 0), 0)}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics and nothing else"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; later calls return the running server
+
+    Returns:
+        The server, or None if the port could not be bound
+    """
+    with _lock:
+        if _server['instance'] is not None or _server['error'] is not None:
+            return _server['instance']
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            _server['error'] = str(e)
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="theta-metrics", daemon=True).start()
+        _server['instance'] = server
+        _server['port'] = server.server_address[1]
+        return server
+
+def start_from_env():
+    """Start the endpoint if THETA_METRICS_PORT is set (called on every rerun, cheap after the first)"""
+    if _server['instance'] is not None or _server['error'] is not None:
+        return _server['instance']
+    port = os.environ.get("THETA_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return start_server(int(port), os.environ.get("THETA_METRICS_HOST", "0.0.0.0"))
+    except ValueError:
+        _server['error'] = f"invalid THETA_METRICS_PORT {port!r}"
+        return None
+
+def server_status():
+    """(port, error) of the metrics endpoint; both None when it is not enabled"""
+    return _server['port'], _server['error']
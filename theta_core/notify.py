@@ -0,0 +1,47 @@
+import os
+import threading
+
+# Change notifications for open pages. A page fragment subscribes to the data
+# files it draws from; when storage publishes a batch it calls changed() with
+# the files the batch touched, on the writer thread, and the wake-up of every
+# subscription to one of them runs right away. Nothing polls: a session whose
+# files did not change is not woken at all. The wake-up must return quickly
+# (utils queues a fragment rerun on the session's event loop) and returns
+# False once its session or fragment is gone, which drops the subscription.
+# Only commits made in this process are pushed; a page sees commits from
+# another process (a second server) on its next rerun, through stamp().
+_lock = threading.Lock()
+_subscriptions = {}
+
+def subscribe(key, data_dir, names, wake):
+    """Call wake() after each commit to one of the files ``names``, replacing the subscription ``key``"""
+    with _lock:
+        _subscriptions[key] = (os.path.abspath(data_dir), frozenset(names), wake)
+
+def unsubscribe(key):
+    """Drop the subscription ``key``, if any"""
+    with _lock:
+        _subscriptions.pop(key, None)
+
+def changed(data_dir, names):
+    """Wake the subscribers of ``names`` after storage published a batch"""
+    directory, names = os.path.abspath(data_dir), set(names)
+    with _lock:
+        woken = [(key, wake) for key, (subscribed_dir, files, wake) in _subscriptions.items()
+                 if subscribed_dir == directory and files & names]
+    for key, wake in woken:
+        try:
+            keep = wake()
+        except Exception:
+            keep = False
+        if keep is False:
+            with _lock:
+                # Unless it was subscribed again meanwhile
+                if _subscriptions.get(key, (None, None, None))[2] is wake:
+                    del _subscriptions[key]
+
+def stamp(data_dir, names):
+    """Latest committed version of each of ``names``, whatever this thread has pinned"""
+    # Imported here because storage reports its commits to this module
+    from theta_core import storage
+    return tuple(storage.latest_version(os.path.join(data_dir, name)) for name in names)
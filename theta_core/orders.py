@@ -0,0 +1,285 @@
+import pandas as pd
+import numpy as np
+import os
+from theta_core import storage, metrics, inventory_ledger
+
+# The order write path: sale lines go to sales.csv, recipe ingredients are
+# deducted from (or restored to) inventory.csv and every change is recorded
+# in the inventory ledger. Saving, deleting and editing an order (promotion,
+# time, ID, location) each run as one command on the theta_core.storage
+# writer, so concurrent tills never overwrite each other's changes.
+SALES_COLUMNS = ['Date', 'Order_ID', 'Product', 'Quantity', 'Unit_Price', 'Total', 'Promo', 'Net_Total', 'Location']
+
+# Order IDs are read as text: generated IDs are hex strings while older ones are
+# numbers, and a mixed column would otherwise be parsed inconsistently
+SALES_DTYPES = {'Order_ID': str}
+
+def order_lines(items, order_id, order_datetime, promo_amount=0.0, location=''):
+    """Build sales.csv rows for an order
+
+    The promotion is split over the items in proportion to their totals and
+    the location is only stored on the first item.
+    """
+    lines = pd.DataFrame(items, columns=['Product', 'Quantity', 'Unit_Price', 'Total'])
+    order_total = lines['Total'].sum()
+    lines['Promo'] = lines['Total'] / order_total * promo_amount if order_total > 0 else 0.0
+    lines['Net_Total'] = lines['Total'] - lines['Promo']
+    lines.insert(0, 'Date', order_datetime.strftime('%Y-%m-%d %H:%M'))
+    lines.insert(1, 'Order_ID', order_id)
+    lines['Location'] = [location] + [''] * (len(lines) - 1) if len(lines) else []
+    return lines[SALES_COLUMNS]
+
+def append_order_lines(lines, data_dir="data"):
+    """Add sale lines to sales.csv
+
+    The lines are appended, so saving an order writes only its own rows and
+    live dashboards can read just the new ones. A file written before the
+    promotion and location columns existed is rewritten once with them added.
+    """
+    path = os.path.join(data_dir, "sales.csv")
+    try:
+        columns = list(storage.read_csv(path, dtype=SALES_DTYPES, nrows=0).columns)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        columns = SALES_COLUMNS
+    if columns == SALES_COLUMNS:
+        storage.append_csv(lines, path, index=False)
+        return
+
+    sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+    # Older files may miss the promotion and location columns
+    if 'Promo' not in sales_df.columns:
+        sales_df['Promo'] = 0.0
+    if 'Net_Total' not in sales_df.columns:
+        sales_df['Net_Total'] = sales_df['Total']
+    if 'Location' not in sales_df.columns:
+        sales_df['Location'] = ''
+
+    sales_df = pd.concat([sales_df, lines], ignore_index=True)
+    storage.to_csv(sales_df, path, index=False)
+
+def ingredient_requirements(items, recipe_df):
+    """Explode order items into one row per ingredient, in item then recipe order"""
+    items = pd.DataFrame(items)[['Product', 'Quantity']]
+    recipe = recipe_df[['Product', 'Ingredient', 'Quantity']].rename(columns={'Quantity': 'Recipe_Quantity'})
+    needs = items.merge(recipe, on='Product', how='inner')
+    needs['Needed'] = needs['Quantity'] * needs['Recipe_Quantity']
+    return needs
+
+def adjust_inventory(inventory_df, needs, movement_type, when, reference):
+    """Apply ingredient requirements to inventory in one vectorised pass
+
+    Sales deduct stock and never take an item below zero; restores add it back.
+
+    Args:
+        inventory_df: Current inventory, updated in place
+        needs: Ingredient requirements from ingredient_requirements
+        movement_type: 'Sale' or 'Restore'
+        when: Movement time recorded in the ledger
+        reference: Order ID recorded in the ledger
+
+    Returns:
+        Tuple of (ledger movements, messages for the user)
+    """
+    first_rows = inventory_df.drop_duplicates('Name')
+    rows = needs['Ingredient'].map(pd.Series(first_rows.index, index=first_rows['Name']))
+    messages = [f"Warning: Ingredient {name} not found in inventory"
+                for name in needs.loc[rows.isna(), 'Ingredient']] if movement_type == 'Sale' else []
+
+    found = needs[rows.notna()].assign(Row=rows[rows.notna()].astype(int))
+    if found.empty:
+        return [], messages
+
+    stock = inventory_df.loc[found['Row'], 'Quantity'].to_numpy(dtype=float)
+    needed = found['Needed'].to_numpy(dtype=float)
+    cumulative = found.groupby('Row')['Needed'].cumsum().to_numpy(dtype=float)
+
+    if movement_type == 'Sale':
+        # Same result as deducting line by line and clamping at zero each time
+        before = np.maximum(stock - (cumulative - needed), 0.0)
+        after = np.maximum(before - needed, 0.0)
+        short = before - needed < 0
+        messages += [f"Warning: Not enough {name} in inventory. Quantity will be set to 0."
+                     for name in found.loc[short, 'Ingredient']]
+    else:
+        before = stock + cumulative - needed
+        after = before + needed
+        messages += [f"Restored {quantity} {name} to inventory"
+                     for quantity, name in zip(needed, found['Ingredient'])]
+
+    final = pd.Series(after, index=found['Row']).groupby(level=0).last()
+    inventory_df.loc[final.index, 'Quantity'] = final.to_numpy()
+
+    change = after - before
+    unit_cost = inventory_df.loc[found['Row'], 'Avg_Cost'].to_numpy()
+    movements = pd.DataFrame({
+        'Date': inventory_ledger.timestamp(when),
+        'Material': found['Ingredient'].to_numpy(),
+        'Quantity': change,
+        'Unit': inventory_df.loc[found['Row'], 'Unit'].to_numpy(),
+        'Unit_Cost': unit_cost,
+        'Total_Cost': change * unit_cost,
+        'Type': movement_type,
+        'Reference': reference
+    })
+    return movements, messages
+
+def deduct_order_stock(items, order_id, order_datetime, data_dir="data"):
+    """Deduct the ingredients of an order from inventory and record them in the ledger
+
+    Returns:
+        Warning messages (missing ingredients, stock clamped at zero)
+    """
+    inventory_df = storage.read_csv(os.path.join(data_dir, "inventory.csv"))
+    recipe_df = storage.read_csv(os.path.join(data_dir, "product_recipe.csv"))
+
+    movements, messages = adjust_inventory(
+        inventory_df, ingredient_requirements(items, recipe_df), 'Sale', order_datetime, order_id
+    )
+    storage.to_csv(inventory_df, os.path.join(data_dir, "inventory.csv"), index=False)
+    inventory_ledger.append_movements(movements, data_dir)
+    return messages
+
+def restore_order_stock(order_items, order_id, data_dir="data"):
+    """Put the ingredients of deleted sale lines back into inventory
+
+    Returns:
+        Messages describing what was restored
+    """
+    inventory_df = storage.read_csv(os.path.join(data_dir, "inventory.csv"))
+    recipe_df = storage.read_csv(os.path.join(data_dir, "product_recipe.csv"))
+
+    movements, messages = adjust_inventory(
+        inventory_df, ingredient_requirements(order_items, recipe_df), 'Restore', None, order_id
+    )
+    storage.to_csv(inventory_df, os.path.join(data_dir, "inventory.csv"), index=False)
+    inventory_ledger.append_movements(movements, data_dir)
+    return messages
+
+def save_order(items, order_id, order_datetime, promo_amount=0.0, location='', data_dir="data"):
+    """Save an order and deduct its ingredients
+
+    Returns:
+        Warning messages from the inventory update
+    """
+    def save():
+        append_order_lines(order_lines(items, order_id, order_datetime, promo_amount, location), data_dir)
+        return deduct_order_stock(items, order_id, order_datetime, data_dir)
+    messages = storage.submit(save, data_dir)
+    metrics.ORDERS_SAVED.inc()
+    return messages
+
+def find_order(order_id, data_dir="data"):
+    """Sale lines of a saved order, with parsed dates"""
+    sales_df = storage.read_csv(os.path.join(data_dir, "sales.csv"), dtype=SALES_DTYPES)
+    sales_df['Date'] = pd.to_datetime(sales_df['Date'], format='mixed')
+    return sales_df[sales_df['Order_ID'] == str(order_id).strip()]
+
+def delete_order(order_id, data_dir="data"):
+    """Delete an order and restore its ingredients
+
+    Returns:
+        Messages describing what was restored, or None if there is no such order
+    """
+    def delete():
+        path = os.path.join(data_dir, "sales.csv")
+        sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+        order_id_str = str(order_id).strip()
+        in_order = sales_df['Order_ID'].astype(str) == order_id_str
+        if not in_order.any():
+            return None
+
+        messages = restore_order_stock(sales_df[in_order], order_id_str, data_dir)
+        storage.to_csv(sales_df[~in_order], path, index=False)
+        return messages
+    return storage.submit(delete, data_dir)
+
+def update_order_promo(order_id, promo_amount, data_dir="data"):
+    """Spread a new promotion amount over an order's lines
+
+    Returns:
+        True if the order existed
+    """
+    def update_promo():
+        path = os.path.join(data_dir, "sales.csv")
+        sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+        in_order = sales_df['Order_ID'].astype(str) == str(order_id).strip()
+        if not in_order.any():
+            return False
+
+        totals = sales_df.loc[in_order, 'Total']
+        order_total = totals.sum()
+        promo = totals / order_total * promo_amount if order_total > 0 else 0.0
+        sales_df.loc[in_order, 'Promo'] = promo
+        sales_df.loc[in_order, 'Net_Total'] = totals - promo
+        storage.to_csv(sales_df, path, index=False)
+        return True
+    return storage.submit(update_promo, data_dir)
+
+
+def update_order_time(order_id, hour, minute, data_dir="data"):
+    """Move an order to another time of the same day
+
+    Returns:
+        True if the order existed
+    """
+    def update_time():
+        path = os.path.join(data_dir, "sales.csv")
+        sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+        in_order = sales_df['Order_ID'].astype(str) == str(order_id).strip()
+        if not in_order.any():
+            return False
+
+        days = pd.to_datetime(sales_df.loc[in_order, 'Date'], format='mixed').dt.normalize()
+        new_dates = days + pd.Timedelta(hours=hour, minutes=minute)
+        sales_df.loc[in_order, 'Date'] = new_dates.dt.strftime('%Y-%m-%d %H:%M')
+        storage.to_csv(sales_df, path, index=False)
+        return True
+    return storage.submit(update_time, data_dir)
+
+def update_order_id(order_id, new_order_id, data_dir="data"):
+    """Give an order a new Order_ID
+
+    Returns:
+        True if the order existed
+
+    Raises:
+        storage.Rejected: if another order already uses ``new_order_id``
+    """
+    def update_id():
+        path = os.path.join(data_dir, "sales.csv")
+        sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+        order_id_str = str(order_id).strip()
+        new_order_id_str = str(new_order_id).strip()
+        if new_order_id_str != order_id_str and (sales_df['Order_ID'].astype(str) == new_order_id_str).any():
+            raise storage.Rejected(f"Order ID {new_order_id_str} already exists. Please use a different ID.")
+
+        in_order = sales_df['Order_ID'].astype(str) == order_id_str
+        if not in_order.any():
+            return False
+
+        sales_df.loc[in_order, 'Order_ID'] = new_order_id_str
+        storage.to_csv(sales_df, path, index=False)
+        return True
+    return storage.submit(update_id, data_dir)
+
+def update_order_location(order_id, location, data_dir="data"):
+    """Set the delivery location of an order (stored on its first line only)
+
+    Returns:
+        True if the order existed
+    """
+    def update_location():
+        path = os.path.join(data_dir, "sales.csv")
+        sales_df = storage.read_csv(path, dtype=SALES_DTYPES)
+        in_order = sales_df['Order_ID'].astype(str) == str(order_id).strip()
+        if not in_order.any():
+            return False
+
+        # Older files may miss the location column
+        if 'Location' not in sales_df.columns:
+            sales_df['Location'] = ''
+        sales_df['Location'] = sales_df['Location'].astype(object)
+        sales_df.loc[in_order.idxmax(), 'Location'] = location
+        storage.to_csv(sales_df, path, index=False)
+        return True
+    return storage.submit(update_location, data_dir)
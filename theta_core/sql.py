@@ -0,0 +1,145 @@
+import csv
+import importlib.util
+import os
+from theta_core import storage, archive, tracing
+
+# Embedded DuckDB over the data directory (optional: pip install duckdb).
+# connect() opens an in-memory database whose views read the data files of the
+# generation this thread reads at. A query parses only the columns it uses,
+# runs on all cores and never copies whole files into pandas. The sales view
+# is the live CSV plus the Parquet archive, whose row groups are skipped by
+# Date filters.
+#
+# Columns are read as text and cast the way the pandas loaders coerce them:
+# unparseable numbers and dates become NULL, and a column missing from the file
+# is NULL (Net_Total falls back to Total and Promo to 0, as in load_sales).
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S']
+
+# View -> (data file, {column: SQL type})
+TABLES = {
+    'sales': ("sales.csv", {
+        'Date': 'TIMESTAMP', 'Order_ID': 'VARCHAR', 'Product': 'VARCHAR', 'Quantity': 'DOUBLE',
+        'Unit_Price': 'DOUBLE', 'Total': 'DOUBLE', 'Promo': 'DOUBLE', 'Net_Total': 'DOUBLE', 'Location': 'VARCHAR'
+    }),
+    'products': ("products.csv", {'Name': 'VARCHAR', 'Price': 'DOUBLE', 'COGS': 'DOUBLE', 'Profit': 'DOUBLE'}),
+    'recipes': ("product_recipe.csv", {
+        'Product': 'VARCHAR', 'Ingredient': 'VARCHAR', 'Quantity': 'DOUBLE', 'Unit': 'VARCHAR'
+    }),
+    'inventory': ("inventory.csv", {
+        'ID': 'VARCHAR', 'Name': 'VARCHAR', 'Quantity': 'DOUBLE', 'Unit': 'VARCHAR', 'Avg_Cost': 'DOUBLE',
+        'Date': 'TIMESTAMP'
+    }),
+    'transactions': ("inventory_transactions.csv", {
+        'Date': 'TIMESTAMP', 'Material': 'VARCHAR', 'Quantity': 'DOUBLE', 'Unit': 'VARCHAR', 'Unit_Cost': 'DOUBLE',
+        'Total_Cost': 'DOUBLE', 'Type': 'VARCHAR', 'Reference': 'VARCHAR'
+    }),
+    'costs': ("operational_costs.csv", {'Date': 'TIMESTAMP', 'Type': 'VARCHAR', 'Amount': 'DOUBLE'}),
+    'cost_stamps': ("sales_cogs.csv", {
+        'Date': 'TIMESTAMP', 'Order_ID': 'VARCHAR', 'Product': 'VARCHAR', 'Line': 'BIGINT', 'Quantity': 'DOUBLE',
+        'COGS_Moving_Avg': 'DOUBLE', 'COGS_FIFO': 'DOUBLE'
+    })
+}
+
+# Stand-ins for columns older files do not have: another column, or a constant
+FALLBACK_COLUMNS = {('sales', 'Net_Total'): 'Total'}
+FALLBACK_VALUES = {('sales', 'Promo'): '0.0'}
+
+ORDERS_VIEW = """
+    CREATE VIEW orders AS
+    SELECT Order_ID, MIN(Date) AS Date, MAX(Location) AS Location, COUNT(*) AS Lines,
+           SUM(Quantity) AS Items, SUM(Total) AS Total, SUM(Promo) AS Promo, SUM(Net_Total) AS Net_Total
+    FROM sales
+    GROUP BY Order_ID
+"""
+
+def available():
+    """True if the optional duckdb package is installed"""
+    return importlib.util.find_spec("duckdb") is not None
+
+def literal(value):
+    """SQL string literal"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def cast(column, sql_type):
+    """Expression coercing a text column to ``sql_type`` (NULL when it does not parse)"""
+    quoted = f'"{column}"'
+    if sql_type == 'TIMESTAMP':
+        # ISO timestamps (nearly every row) take the fast cast, the rest go through the formats
+        formats = ", ".join(literal(fmt) for fmt in DATE_FORMATS)
+        return f"COALESCE(TRY_CAST({quoted} AS TIMESTAMP), try_strptime({quoted}, [{formats}]))"
+    if sql_type == 'VARCHAR':
+        return quoted
+    return f"TRY_CAST({quoted} AS {sql_type})"
+
+def csv_header(path):
+    """Column names of a CSV file, None if it is missing or empty"""
+    try:
+        with open(path, newline='', encoding='utf-8') as file:
+            return next(csv.reader(file), None)
+    except FileNotFoundError:
+        return None
+
+def select_list(view, source_types):
+    """SELECT expressions giving ``view`` its declared columns from a source with ``source_types``"""
+    expressions = []
+    for column, sql_type in TABLES[view][1].items():
+        source = column if column in source_types else FALLBACK_COLUMNS.get((view, column))
+        if source not in source_types:
+            expression = FALLBACK_VALUES.get((view, column), "NULL")
+        elif source_types[source] == sql_type:
+            expression = f'"{source}"'
+        else:
+            expression = cast(source, sql_type)
+        expressions.append(f'CAST({expression} AS {sql_type}) AS "{column}"')
+    return ", ".join(expressions)
+
+def csv_source(view, path):
+    """SELECT over a data file with the view's columns, empty when the file is missing"""
+    header = csv_header(path)
+    if not header:
+        empty = ", ".join(f'CAST(NULL AS {sql_type}) AS "{column}"' for column, sql_type in TABLES[view][1].items())
+        return f"SELECT {empty} WHERE false"
+    # Every column is read as text and cast by select_list
+    as_text = ", ".join(f"{literal(name)}: 'VARCHAR'" for name in header)
+    reader = (f"read_csv({literal(path)}, header=true, auto_detect=false, delim=',', quote='\"', escape='\"', "
+              f"columns={{{as_text}}})")
+    return f"SELECT {select_list(view, dict.fromkeys(header, 'VARCHAR'))} FROM {reader}"
+
+def archive_source(connection, data_dir):
+    """SELECT over the Parquet sales archive, None when nothing is archived"""
+    names = archive.partitions(data_dir)
+    if not names:
+        return None
+    paths = ", ".join(literal(storage.version_path(os.path.join(data_dir, name))) for name in names)
+    reader = f"read_parquet([{paths}], union_by_name=true)"
+    described = connection.execute(f"DESCRIBE SELECT * FROM {reader}").fetchall()
+    # Archived dates are already timestamps, so the Date filter reaches the row group statistics
+    types = {name: 'TIMESTAMP' if str(sql_type).startswith('TIMESTAMP') else str(sql_type)
+             for name, sql_type, *_ in described}
+    return f"SELECT {select_list('sales', types)} FROM {reader}"
+
+def connect(data_dir="data"):
+    """In-memory DuckDB connection with a view per data file, plus ``orders``
+
+    Views: sales, orders, products, recipes, inventory, transactions, costs and
+    cost_stamps (the sale line costs stamped by cost_layers).
+    """
+    import duckdb
+    connection = duckdb.connect()
+    with tracing.span("open duckdb", 'load'):
+        for view, (name, _) in TABLES.items():
+            source = csv_source(view, storage.version_path(os.path.join(data_dir, name)))
+            if view == 'sales':
+                archived = archive_source(connection, data_dir)
+                if archived is not None:
+                    source = f"{archived} UNION ALL {source}"
+            connection.execute(f"CREATE VIEW {view} AS {source}")
+        connection.execute(ORDERS_VIEW)
+    return connection
+
+def query(connection, sql, params=None, name="sql"):
+    """Run a query and return the result as a DataFrame, recorded as a span"""
+    with tracing.span(name) as current:
+        result = connection.execute(sql, params or []).df()
+        current.record(rows=len(result))
+    return result
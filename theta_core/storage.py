@@ -0,0 +1,785 @@
+import fnmatch
+import glob
+import io
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import zlib
+import pandas as pd
+from theta_core import tracing, metrics, notify
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are still serialised within the process
+    fcntl = None
+
+# Every data mutation runs as a command on one writer thread per process.
+# Commands that arrive within GROUP_COMMIT_SECONDS of each other form a batch:
+# they run one after the other against a working copy of the files they touch,
+# then every changed file is written and fsynced once for the whole batch.
+# A command that raises is rolled back without affecting the rest of its
+# batch, and its caller gets the exception. Batches hold an exclusive lock
+# file in the data directory, so writers in other processes take turns too.
+# Binary files (the sales archive) are staged whole through write_bytes.
+#
+# A batch reaches disk crash-safely: rewritten files go to fsynced temp files
+# next to them, then one write-ahead log record naming the renames and the
+# appended text is fsynced (the commit point), then the renames and appends
+# are applied. recover() finishes a logged batch or drops an unlogged one, so
+# its cost depends on the log tail, never on the size of the data files.
+#
+# Every applied batch publishes a new generation in MANIFEST_NAME. Each file
+# version is kept as an immutable hard link in GENERATIONS_DIR (appended files
+# are pinned by their length), so a page rerun pins the generation current at
+# its first read and sees one consistent set of files however many commits
+# land meanwhile, without ever blocking the writer. Superseded versions are
+# deleted GRACE_SECONDS after they were replaced, unless a reader in this
+# process still pins them. Each publish wakes the theta_core.notify subscribers
+# of the files it changed.
+GROUP_COMMIT_SECONDS = 0.005
+MAX_BATCH = 64
+LOCK_NAME = ".write.lock"
+WAL_NAME = ".write.wal"
+MANIFEST_NAME = ".manifest.json"
+GENERATIONS_DIR = ".generations"
+GRACE_SECONDS = 60
+MAX_PIN_SECONDS = 600
+
+_lock = threading.Lock()
+_state = {'queue': queue.Queue(), 'thread': None}
+_local = threading.local()
+_manifests = {}   # absolute data directory -> (manifest file identity, manifest)
+_readers = {}     # thread ident -> {absolute data directory: pinned snapshot}
+
+class Rejected(Exception):
+    """Raised by a command to refuse a mutation; the message is meant for the user"""
+
+def _key(kwargs):
+    """Hashable form of read_csv keyword arguments"""
+    return tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+
+def _fsync(path):
+    """Flush a written file to disk"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _fsync_dir(path):
+    """Flush renames in a directory to disk (not possible on every platform)"""
+    try:
+        _fsync(path or ".")
+    except OSError:
+        pass
+
+def _temp_path(path, transaction):
+    """Hidden temp file next to ``path`` for one transaction"""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{transaction}.tmp")
+
+def _write_temp(df, path, transaction, kwargs):
+    """Write the new content of ``path`` to a fsynced temp file and return its path"""
+    temp = _temp_path(path, transaction)
+    with tracing.span(f"write {os.path.basename(path)}", 'write') as current:
+        df.to_csv(temp, **kwargs)
+        _fsync(temp)
+        current.record(rows=len(df), bytes_written=tracing.file_size(temp))
+    metrics.BYTES_WRITTEN.inc(current.bytes_written, file=os.path.basename(path))
+    return temp
+
+def _write_blob(data, path, transaction):
+    """Write the new bytes of a binary file to a fsynced temp file and return its path"""
+    temp = _temp_path(path, transaction)
+    with tracing.span(f"write {os.path.basename(path)}", 'write') as current:
+        with open(temp, 'wb') as file:
+            file.write(data)
+        _fsync(temp)
+        current.record(bytes_written=len(data))
+    metrics.BYTES_WRITTEN.inc(current.bytes_written, file=os.path.basename(path))
+    return temp
+
+def _write_log(data_dir, record):
+    """Durably log a batch before any data file changes"""
+    payload = json.dumps(record, sort_keys=True)
+    with open(os.path.join(data_dir, WAL_NAME), 'w', encoding='utf-8') as file:
+        file.write(f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+def _read_log(data_dir):
+    """The logged batch, or None when the log is empty or was torn by a crash"""
+    try:
+        with open(os.path.join(data_dir, WAL_NAME), encoding='utf-8') as file:
+            line = file.read()
+    except FileNotFoundError:
+        return None
+    checksum, _, payload = line.rstrip("\n").partition(" ")
+    if not line.endswith("\n") or f"{zlib.crc32(payload.encode('utf-8')):08x}" != checksum:
+        return None
+    return json.loads(payload)
+
+def _clear_log(data_dir):
+    """Mark the logged batch as applied
+
+    Not fsynced: replaying an applied batch leaves the files unchanged.
+    """
+    path = os.path.join(data_dir, WAL_NAME)
+    if tracing.file_size(path):
+        open(path, 'w').close()
+
+def _apply(data_dir, record):
+    """Apply a logged batch; safe to repeat after a crash part way through"""
+    for name, temp in record['rewrites']:
+        temp = os.path.join(data_dir, temp)
+        if os.path.exists(temp):
+            os.replace(temp, os.path.join(data_dir, name))
+    for name, size, text in record['appends']:
+        path = os.path.join(data_dir, name)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as file:
+            # Cut anything a crashed earlier attempt appended, then append
+            file.truncate(size)
+            file.seek(size)
+            file.write(text.encode('utf-8'))
+            file.flush()
+            os.fsync(file.fileno())
+    _fsync_dir(data_dir)
+    _publish(data_dir, record)
+
+def _recover_locked(data_dir):
+    """recover() for a caller already holding the directory lock"""
+    record = _read_log(data_dir)
+    if record is not None:
+        _apply(data_dir, record)
+    # Temp files left over are from batches that never reached the log
+    leftovers = glob.glob(os.path.join(glob.escape(data_dir), ".*.tmp"))
+    for temp in leftovers:
+        os.remove(temp)
+    _clear_log(data_dir)
+    return {
+        'replayed_files': len(record['rewrites']) + len(record['appends']) if record else 0,
+        'removed_temp_files': len(leftovers)
+    }
+
+def _identity(path):
+    """(inode, size, mtime) of a file, None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+def _generation_path(data_dir, name, generation):
+    """Immutable link to version ``generation`` of data file ``name``"""
+    return os.path.join(data_dir, GENERATIONS_DIR, f"{name}.{generation}")
+
+def _read_manifest(data_dir):
+    """Published generation and file versions of ``data_dir`` (do not modify)"""
+    key = os.path.abspath(data_dir)
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    identity = _identity(path)
+    cached = _manifests.get(key)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+    manifest = {'generation': 0, 'files': {}, 'retired': []}
+    if identity is not None:
+        try:
+            with open(path, encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            pass
+    _manifests[key] = (identity, manifest)
+    return manifest
+
+def _publish(data_dir, record):
+    """Link the files changed by an applied batch and publish its generation"""
+    manifest = _read_manifest(data_dir)
+    files = dict(manifest['files'])
+    retired = list(manifest['retired'])
+    rewritten = {name for name, _ in record['rewrites']}
+    os.makedirs(os.path.join(data_dir, GENERATIONS_DIR), exist_ok=True)
+
+    for name in dict.fromkeys([name for name, _ in record['rewrites']] + [row[0] for row in record['appends']]):
+        path = os.path.join(data_dir, name)
+        inode, size, mtime = _identity(path)
+        entry = files.get(name)
+        # Appends keep the file's inode, and with it the link of its last rewrite
+        generation = record.get('generation', manifest['generation'] + 1)
+        if entry is not None and name not in rewritten and entry['inode'] == inode:
+            generation = entry['generation']
+        link = _generation_path(data_dir, name, generation)
+        if not os.path.exists(link):
+            try:
+                os.link(path, link)
+            except OSError:
+                # Filesystems without hard links get a copy
+                shutil.copyfile(path, link)
+        if entry is not None and entry['generation'] != generation:
+            retired.append([os.path.basename(_generation_path(data_dir, name, entry['generation'])), time.time()])
+        files[name] = {'generation': generation, 'size': size, 'inode': inode, 'mtime_ns': mtime}
+
+    generation = record.get('generation', manifest['generation'] + 1)
+    manifest = {'generation': max(manifest['generation'], generation), 'files': files, 'retired': retired}
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    temp = path + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(temp, path)
+    notify.changed(data_dir, [name for name, _ in record['rewrites']] + [row[0] for row in record['appends']])
+
+def _pinned_links(data_dir):
+    """Generation links pinned by readers in this process"""
+    key = os.path.abspath(data_dir)
+    oldest = time.time() - MAX_PIN_SECONDS
+    with _lock:
+        snapshots = [pins[key] for pins in _readers.values() if key in pins]
+    return {os.path.basename(_generation_path(data_dir, name, entry['generation']))
+            for snapshot in snapshots if snapshot['pinned_at'] >= oldest
+            for name, entry in snapshot['files'].items()}
+
+def _collect_garbage(data_dir):
+    """Delete file versions superseded more than GRACE_SECONDS ago and not pinned here
+
+    Runs in the writer after every commit; returns the number of links deleted.
+    """
+    folder = os.path.join(data_dir, GENERATIONS_DIR)
+    if not os.path.isdir(folder):
+        return 0
+    manifest = _read_manifest(data_dir)
+    current = {os.path.basename(_generation_path(data_dir, name, entry['generation']))
+               for name, entry in manifest['files'].items()}
+    retired = {link: when for link, when in manifest['retired']}
+    keep = current | _pinned_links(data_dir)
+    cutoff = time.time() - GRACE_SECONDS
+
+    removed = 0
+    for link in os.listdir(folder):
+        # Links neither current nor retired come from a batch a crash cut short
+        if link in keep or retired.get(link, 0) > cutoff:
+            continue
+        os.remove(os.path.join(folder, link))
+        removed += 1
+    if removed:
+        remaining = set(os.listdir(folder))
+        manifest = dict(manifest, retired=[row for row in manifest['retired'] if row[0] in remaining])
+        path = os.path.join(data_dir, MANIFEST_NAME)
+        with open(path + ".tmp", 'w', encoding='utf-8') as file:
+            json.dump(manifest, file)
+        os.replace(path + ".tmp", path)
+    return removed
+
+def _current_snapshot(data_dir):
+    """Published file versions that still match the files on disk
+
+    A file changed behind the writer's back (restored backup, edited by hand)
+    no longer matches its entry and is read from its plain path instead.
+    """
+    manifest = _read_manifest(data_dir)
+    files = {}
+    for name, entry in manifest['files'].items():
+        if _identity(os.path.join(data_dir, name)) == (entry['inode'], entry['size'], entry['mtime_ns']):
+            files[name] = entry
+    return {'generation': manifest['generation'], 'files': files, 'pinned_at': time.time()}
+
+def pin():
+    """Start a consistent read: the first read of each data directory from
+    this thread pins its current generation until unpin()"""
+    with _lock:
+        _readers[threading.get_ident()] = {}
+
+def unpin():
+    """End the consistent read started by pin()"""
+    with _lock:
+        _readers.pop(threading.get_ident(), None)
+
+def pinned():
+    """True between pin() and unpin() in this thread"""
+    return threading.get_ident() in _readers
+
+def _snapshot(data_dir):
+    """The generation this thread reads ``data_dir`` at"""
+    key = os.path.abspath(data_dir)
+    pins = _readers.get(threading.get_ident())
+    if pins is None:
+        return _current_snapshot(data_dir)
+    snapshot = pins.get(key)
+    if snapshot is None:
+        snapshot = pins[key] = _current_snapshot(data_dir)
+    return snapshot
+
+def generation(data_dir="data"):
+    """Generation this thread reads ``data_dir`` at (0 before the first commit)"""
+    return _snapshot(data_dir)['generation']
+
+def _entry(path):
+    """Published version of ``path`` this thread reads, None if unmanaged"""
+    return _snapshot(os.path.dirname(path) or ".")['files'].get(os.path.basename(path))
+
+def version(path):
+    """Cheap cache key for the version of a data file this thread reads
+
+    Returns:
+        (file generation, size), or None for files the writer never published
+    """
+    entry = _entry(path)
+    return None if entry is None else (entry['generation'], entry['size'])
+
+def latest_version(path):
+    """version() of the newest commit rather than the generation this thread pinned
+
+    A file changed behind the writer's back is keyed by its (mtime, size).
+    """
+    data_dir, name = os.path.split(path)
+    entry = _read_manifest(data_dir or ".")['files'].get(name)
+    identity = _identity(path)
+    if identity is None:
+        return None
+    if entry is not None and identity == (entry['inode'], entry['size'], entry['mtime_ns']):
+        return (entry['generation'], entry['size'])
+    return (identity[2], identity[1])
+
+def _read_version(path, entry, kwargs):
+    """Read the pinned version of ``path``"""
+    data_dir, name = os.path.split(path)
+    link = _generation_path(data_dir or ".", name, entry['generation'])
+    with tracing.span(f"read {name}", 'load') as current:
+        if tracing.file_size(link) == entry['size']:
+            df = pd.read_csv(link, **kwargs)
+        elif os.path.exists(link):
+            # Appended files grow in place; this version ends at its recorded size
+            with open(link, 'rb') as file:
+                df = pd.read_csv(io.BytesIO(file.read(entry['size'])), **kwargs)
+        else:
+            # Collected by another process after the grace period
+            df = pd.read_csv(path, **kwargs)
+        current.record(rows=len(df), bytes_read=entry['size'])
+    metrics.BYTES_READ.inc(current.bytes_read, file=name)
+    return df
+
+class Batch:
+    """Working copy of the files touched by the commands of one group commit
+
+    A read after a staged write of the same file returns a copy of the frame
+    that was written, so the commands in a batch share one parse and one write
+    per file. Reads with other arguments re-parse the staged content.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.frames = {}    # path -> (read_csv arguments, frame) as last read or written
+        self.writes = {}    # path -> (frame, to_csv arguments) to rewrite the file with
+        self.appends = {}   # path -> [(frame, to_csv arguments)] to append to the file
+        self.blobs = {}     # path -> bytes to rewrite a binary file with
+        self.touched = set()
+
+    def checkpoint(self):
+        """State to roll back to if the next command fails"""
+        return (dict(self.frames), dict(self.writes), {path: list(rows) for path, rows in self.appends.items()},
+                dict(self.blobs))
+
+    def rollback(self, checkpoint):
+        """Drop everything staged since ``checkpoint``"""
+        self.frames, self.writes, self.appends, self.blobs = checkpoint
+
+    def staged_text(self, path):
+        """CSV text of ``path`` with the staged changes applied"""
+        if path in self.writes:
+            df, kwargs = self.writes[path]
+            text = df.to_csv(**kwargs)
+        elif os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                text = file.read()
+        else:
+            text = ""
+        for df, kwargs in self.appends.get(path, []):
+            text += df.to_csv(header=not text, **kwargs)
+        return text
+
+    def read_csv(self, path, **kwargs):
+        """Current content of ``path`` in this batch"""
+        self.touched.add(path)
+        key = _key(kwargs)
+        cached = self.frames.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1].copy()
+
+        if path in self.writes or path in self.appends:
+            df = pd.read_csv(io.StringIO(self.staged_text(path)), **kwargs)
+        else:
+            df = tracing.read_csv(path, **kwargs)
+        self.frames[path] = (key, df)
+        return df.copy()
+
+    def to_csv(self, df, path, **kwargs):
+        """Stage a rewrite of ``path``"""
+        self.touched.add(path)
+        cached = self.frames.get(path)
+        self.frames[path] = (cached[0] if cached is not None else None, df)
+        self.writes[path] = (df, kwargs)
+        self.appends.pop(path, None)
+
+    def append_csv(self, df, path, **kwargs):
+        """Stage rows to append to ``path``"""
+        self.touched.add(path)
+        self.frames.pop(path, None)
+        self.appends.setdefault(path, []).append((df, kwargs))
+
+    def read_bytes(self, path):
+        """Current content of binary file ``path`` in this batch"""
+        self.touched.add(path)
+        if path in self.blobs:
+            return self.blobs[path]
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def write_bytes(self, data, path):
+        """Stage a rewrite of binary file ``path``"""
+        self.touched.add(path)
+        self.blobs[path] = data
+
+    def commit(self):
+        """Write every changed file through temp files and the write-ahead log"""
+        if not self.writes and not self.appends and not self.blobs:
+            return
+        transaction = uuid.uuid4().hex[:12]
+        rewrites, appends = [], []
+        try:
+            for path, (df, kwargs) in self.writes.items():
+                if path in self.appends:
+                    # Rows appended after a rewrite go into it: the append offset would be the old file's size
+                    temp = _write_blob(self.staged_text(path).encode('utf-8'), path, transaction)
+                else:
+                    temp = _write_temp(df, path, transaction, kwargs)
+                rewrites.append((os.path.relpath(path, self.data_dir), os.path.relpath(temp, self.data_dir)))
+            for path, data in self.blobs.items():
+                temp = _write_blob(data, path, transaction)
+                rewrites.append((os.path.relpath(path, self.data_dir), os.path.relpath(temp, self.data_dir)))
+            for path, rows in self.appends.items():
+                if path in self.writes:
+                    continue
+                size = tracing.file_size(path)
+                text = "".join(df.to_csv(header=size == 0 and index == 0, **kwargs)
+                               for index, (df, kwargs) in enumerate(rows))
+                appends.append((os.path.relpath(path, self.data_dir), size, text))
+            record = {'transaction': transaction, 'rewrites': rewrites, 'appends': appends,
+                      'generation': _read_manifest(self.data_dir)['generation'] + 1}
+            _write_log(self.data_dir, record)
+        except Exception:
+            # Nothing was logged, so the data files are untouched
+            for _, temp in rewrites:
+                os.remove(os.path.join(self.data_dir, temp))
+            raise
+        try:
+            with tracing.span("apply write-ahead log", 'write'):
+                _apply(self.data_dir, record)
+        except OSError:
+            # Logged means committed: the next batch or the next start applies it
+            return
+        _clear_log(self.data_dir)
+        _collect_garbage(self.data_dir)
+
+class Command:
+    """A queued mutation and, once it ran, its result or exception"""
+    __slots__ = ('func', 'data_dir', 'submitted', 'done', 'result', 'error')
+
+    def __init__(self, func, data_dir):
+        self.func = func
+        self.data_dir = data_dir
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _DirectoryLock:
+    """Exclusive lock file shared by the writers of every process using ``data_dir``"""
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, LOCK_NAME)
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, 'a')
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+def _run_batch(data_dir, commands):
+    """Apply a batch of commands for one data directory and commit it"""
+    with _DirectoryLock(data_dir):
+        locked = time.perf_counter()
+        # Finish a batch another process logged before it died
+        if tracing.file_size(os.path.join(data_dir, WAL_NAME)):
+            _recover_locked(data_dir)
+        batch = Batch(data_dir)
+        _local.batch = batch
+        committed = []
+        try:
+            for command in commands:
+                checkpoint = batch.checkpoint()
+                batch.touched = set()
+                try:
+                    command.result = command.func()
+                    committed.append((command, batch.touched))
+                except Exception as e:
+                    batch.rollback(checkpoint)
+                    command.error = e
+            batch.commit()
+        except Exception as e:
+            # Nothing of this batch is known to be durable
+            for command, _ in committed:
+                command.error = e
+        finally:
+            _local.batch = None
+
+    metrics.WRITE_BATCH_COMMANDS.observe(len(commands))
+    for command, touched in committed:
+        for path in touched:
+            metrics.WRITE_LOCK_WAIT.observe(locked - command.submitted, file=os.path.basename(path))
+
+def _writer():
+    """Writer thread: take queued commands in batches, forever"""
+    pending = _state['queue']
+    while True:
+        commands = [pending.get()]
+        deadline = time.perf_counter() + GROUP_COMMIT_SECONDS
+        while len(commands) < MAX_BATCH:
+            try:
+                commands.append(pending.get(timeout=max(deadline - time.perf_counter(), 0)))
+            except queue.Empty:
+                break
+
+        for data_dir in dict.fromkeys(command.data_dir for command in commands):
+            group = [command for command in commands if command.data_dir == data_dir]
+            try:
+                _run_batch(data_dir, group)
+            except Exception as e:
+                # The lock could not be taken; fail the group and keep serving
+                for command in group:
+                    command.error = command.error or e
+            for command in group:
+                command.done.set()
+
+def _ensure_writer():
+    """Start the writer thread if this process has none yet"""
+    thread = _state['thread']
+    if thread is not None and thread.is_alive():
+        return
+    with _lock:
+        thread = _state['thread']
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_writer, name="theta-writer", daemon=True)
+            _state['thread'] = thread
+            thread.start()
+
+def _after_fork():
+    """A forked child starts with an empty queue and no writer thread"""
+    _state['queue'] = queue.Queue()
+    _state['thread'] = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def current_batch():
+    """The batch being applied, when called from inside a command"""
+    return getattr(_local, 'batch', None)
+
+def submit(func, data_dir="data"):
+    """Run ``func()`` on the writer thread as part of the next group commit
+
+    ``func`` does its I/O through read_csv / to_csv / append_csv (read_bytes /
+    write_bytes for binary files) in this module.
+    Called from inside a command, ``func`` runs directly in that command.
+
+    Returns:
+        What ``func`` returned, once its batch is on disk
+
+    Raises:
+        Whatever ``func`` raised (nothing it staged is written), or the error
+        that stopped its batch from being committed
+    """
+    if current_batch() is not None:
+        return func()
+
+    command = Command(func, data_dir)
+    with tracing.span(f"commit {getattr(func, '__name__', 'command')}", 'write'):
+        _ensure_writer()
+        _state['queue'].put(command)
+        command.done.wait()
+    if command.error is not None:
+        raise command.error
+    # Let the rest of a pinned rerun read its own writes
+    pins = _readers.get(threading.get_ident())
+    if pins is not None:
+        pins.pop(os.path.abspath(data_dir), None)
+    return command.result
+
+def read_csv(path, **kwargs):
+    """pd.read_csv of the generation this thread reads at
+
+    Inside a command it sees the changes the batch staged so far.
+    """
+    batch = current_batch()
+    if batch is not None:
+        return batch.read_csv(path, **kwargs)
+    entry = _entry(path)
+    if entry is None:
+        return tracing.read_csv(path, **kwargs)
+    return _read_version(path, entry, kwargs)
+
+def read_appended(path, since, **kwargs):
+    """pd.read_csv of the rows appended to a data file after version ``since``
+
+    ``since`` is a key returned by version(). Only the bytes past it are read,
+    up to the version this thread reads at.
+
+    Returns:
+        The appended rows (empty if there are none), or None when the file was
+        rewritten since, or is not published, and has to be read whole
+    """
+    entry = _entry(path)
+    if current_batch() is not None or entry is None or since is None \
+            or since[0] != entry['generation'] or since[1] > entry['size']:
+        return None
+    data_dir, name = os.path.split(path)
+    link = _generation_path(data_dir or ".", name, entry['generation'])
+    with tracing.span(f"read {name} appended", 'load') as current:
+        try:
+            with open(link, 'rb') as file:
+                header = file.readline()
+                if since[1] < len(header):
+                    return None
+                file.seek(since[1])
+                tail = file.read(entry['size'] - since[1])
+        except FileNotFoundError:
+            return None
+        df = pd.read_csv(io.BytesIO(header + tail), **kwargs)
+        current.record(rows=len(df), bytes_read=len(tail))
+    metrics.BYTES_READ.inc(current.bytes_read, file=name)
+    return df
+
+def to_csv(df, path, **kwargs):
+    """DataFrame.to_csv, staged for the group commit when called from a command
+
+    Outside a command the write is submitted as a command of its own.
+    """
+    batch = current_batch()
+    if batch is None:
+        submit(lambda: to_csv(df, path, **kwargs), os.path.dirname(path) or ".")
+    else:
+        batch.to_csv(df, path, **kwargs)
+
+def append_csv(df, path, **kwargs):
+    """Append rows to a CSV file, writing the header if the file is new or empty"""
+    batch = current_batch()
+    if batch is None:
+        submit(lambda: append_csv(df, path, **kwargs), os.path.dirname(path) or ".")
+    else:
+        batch.append_csv(df, path, **kwargs)
+
+def read_bytes(path):
+    """Content of a binary data file in the generation this thread reads at"""
+    batch = current_batch()
+    if batch is not None:
+        return batch.read_bytes(path)
+    entry = _entry(path)
+    source = path
+    if entry is not None:
+        link = _generation_path(os.path.dirname(path) or ".", os.path.basename(path), entry['generation'])
+        if os.path.exists(link):
+            source = link
+    with tracing.span(f"read {os.path.basename(path)}", 'load') as current:
+        with open(source, 'rb') as file:
+            data = file.read()
+        current.record(bytes_read=len(data))
+    metrics.BYTES_READ.inc(current.bytes_read, file=os.path.basename(path))
+    return data
+
+def version_path(path):
+    """File holding the version of ``path`` this thread reads, for readers outside
+    this module such as DuckDB
+
+    Rows appended to the file since the pin may be included.
+    """
+    entry = _entry(path)
+    if entry is None:
+        return path
+    link = _generation_path(os.path.dirname(path) or ".", os.path.basename(path), entry['generation'])
+    return link if os.path.exists(link) else path
+
+def write_bytes(data, path):
+    """Rewrite a binary data file, staged for the group commit when called from a command"""
+    batch = current_batch()
+    if batch is None:
+        submit(lambda: write_bytes(data, path), os.path.dirname(path) or ".")
+    else:
+        batch.write_bytes(data, path)
+
+def list_files(data_dir, pattern):
+    """Names of the files matching ``pattern`` in the generation this thread reads at
+
+    Files published after the pinned generation are left out, so a rerun never
+    sees a file that a later commit created from rows it still reads elsewhere.
+    Files the writer never published are listed as they are on disk.
+    """
+    batch = current_batch()
+    names = {os.path.basename(path) for path in glob.glob(os.path.join(glob.escape(data_dir), pattern))}
+    if batch is not None:
+        names |= {os.path.basename(path) for path in batch.blobs if fnmatch.fnmatch(os.path.basename(path), pattern)}
+        return sorted(names)
+    snapshot = _snapshot(data_dir)
+    published = _read_manifest(data_dir)['files']
+    names = {name for name in names
+             if name in snapshot['files'] or published.get(name, {}).get('generation', 0) <= snapshot['generation']}
+    names |= {name for name in snapshot['files'] if fnmatch.fnmatch(name, pattern)}
+    return sorted(names)
+
+def adopt(data_dir, patterns):
+    """Publish the data files matching ``patterns`` that were written outside the writer
+
+    Run at startup after files were created or restored, so that pinned reruns
+    have an immutable version of every data file a later commit may replace.
+
+    Returns:
+        Names of the files published
+    """
+    if not os.path.isdir(data_dir):
+        return []
+    with _DirectoryLock(data_dir):
+        published = _read_manifest(data_dir)['files']
+        names = sorted({os.path.basename(path) for pattern in patterns
+                        for path in glob.glob(os.path.join(glob.escape(data_dir), pattern))})
+        stale = []
+        for name in names:
+            entry = published.get(name)
+            if entry is None or _identity(os.path.join(data_dir, name)) != (entry['inode'], entry['size'],
+                                                                               entry['mtime_ns']):
+                stale.append(name)
+        if stale:
+            _publish(data_dir, {'rewrites': [(name, None) for name in stale], 'appends': []})
+    return stale
+
+def recover(data_dir="data"):
+    """Finish or drop a batch interrupted by a crash (run at startup)
+
+    A batch whose log record is complete is applied again, which is harmless if
+    it had already been applied; temp files of a batch that was never logged
+    are removed, leaving the data files as they were before it.
+
+    Returns:
+        Dict with 'replayed_files' and 'removed_temp_files'
+    """
+    if not os.path.isdir(data_dir):
+        return {'replayed_files': 0, 'removed_temp_files': 0}
+    with _DirectoryLock(data_dir):
+        return _recover_locked(data_dir)
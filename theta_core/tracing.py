@@ -0,0 +1,205 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from theta_core import metrics
+
+# Lightweight per-rerun tracing. A page calls begin_rerun() at the top, work is
+# wrapped in span() / @traced, and finished reruns are kept in a ring buffer
+# that the Settings page summarises. Spans outside a rerun (CLI, benchmarks)
+# cost a couple of clock reads and are not kept.
+MAX_RERUNS = 200
+MAX_SPANS_PER_RERUN = 500
+
+SPAN_KINDS = ('load', 'compute', 'render', 'write')
+
+_reruns = deque(maxlen=MAX_RERUNS)
+_lock = threading.Lock()
+_local = threading.local()
+
+class Span:
+    """One timed piece of work inside a rerun"""
+    __slots__ = ('name', 'kind', 'depth', 'start', 'duration', 'rows', 'bytes_read', 'bytes_written')
+
+    def __init__(self, name, kind, depth):
+        self.name = name
+        self.kind = kind
+        self.depth = depth
+        self.start = time.perf_counter()
+        self.duration = None
+        self.rows = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record(self, rows=None, bytes_read=0, bytes_written=0):
+        """Attach row and byte counts to the span"""
+        if rows is not None:
+            self.rows = rows
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+
+class Rerun:
+    """Spans recorded during one run of a page script"""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.end = None
+        self.finished = False
+        self.spans = []
+        self.dropped = 0
+        self.depth = 0
+
+    @property
+    def duration(self):
+        """Seconds from the start to the end of the rerun (or its latest span so far)"""
+        return (self.end or self.start) - self.start
+
+def begin_rerun(page):
+    """Start recording a rerun of ``page`` in the current thread"""
+    end_rerun()
+    rerun = Rerun(page)
+    _local.rerun = rerun
+    with _lock:
+        _reruns.append(rerun)
+    return rerun
+
+def end_rerun():
+    """Finish the rerun recorded in the current thread, if any"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun.end = time.perf_counter()
+        rerun.finished = True
+        _local.rerun = None
+        metrics.RERUN_SECONDS.observe(rerun.duration, page=rerun.page)
+
+def discard_rerun():
+    """Drop the rerun recorded in the current thread, if any, without keeping it"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        _local.rerun = None
+        with _lock:
+            try:
+                _reruns.remove(rerun)
+            except ValueError:
+                pass
+
+def current_rerun():
+    """The rerun being recorded in this thread, or None"""
+    return getattr(_local, 'rerun', None)
+
+@contextmanager
+def span(name, kind='compute'):
+    """Time a block of work, e.g. ``with tracing.span("merge cogs") as s: ...``"""
+    rerun = current_rerun()
+    current = Span(name, kind, rerun.depth if rerun else 0)
+    if rerun is not None:
+        rerun.depth += 1
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        metrics.SPAN_SECONDS.observe(current.duration, kind=kind)
+        if rerun is not None:
+            rerun.depth -= 1
+            rerun.end = time.perf_counter()
+            if len(rerun.spans) < MAX_SPANS_PER_RERUN:
+                rerun.spans.append(current)
+            else:
+                rerun.dropped += 1
+
+def traced(name=None, kind='compute'):
+    """Decorator recording every call of a function as a span"""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label, kind) as current:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    current.record(rows=len(result))
+                return result
+        return wrapper
+    return decorate
+
+def file_size(path):
+    """Size of a file in bytes, 0 if it does not exist"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def read_csv(path, **kwargs):
+    """pd.read_csv recorded as a load span with rows and bytes read"""
+    with span(f"read {os.path.basename(path)}", 'load') as current:
+        df = pd.read_csv(path, **kwargs)
+        current.record(rows=len(df), bytes_read=file_size(path))
+    metrics.BYTES_READ.inc(current.bytes_read, file=os.path.basename(path))
+    return df
+
+def to_csv(df, path, **kwargs):
+    """DataFrame.to_csv recorded as a write span with rows and bytes written"""
+    with span(f"write {os.path.basename(path)}", 'write') as current:
+        df.to_csv(path, **kwargs)
+        current.record(rows=len(df), bytes_written=file_size(path))
+    metrics.BYTES_WRITTEN.inc(current.bytes_written, file=os.path.basename(path))
+
+def clear():
+    """Forget every recorded rerun"""
+    with _lock:
+        _reruns.clear()
+
+def snapshot():
+    """Copy of the recorded reruns, oldest first"""
+    with _lock:
+        return list(_reruns)
+
+def recent_reruns(limit=20):
+    """Latest reruns with their duration and totals, newest first"""
+    rows = []
+    for rerun in reversed(snapshot()[-limit:]):
+        spans = list(rerun.spans)
+        rows.append({
+            'Started': rerun.started.strftime('%H:%M:%S'),
+            'Page': rerun.page,
+            'Duration_ms': rerun.duration * 1000,
+            'Finished': rerun.finished,
+            'Spans': len(spans) + rerun.dropped,
+            'Rows_Read': sum(s.rows or 0 for s in spans if s.kind == 'load'),
+            'Bytes_Read': sum(s.bytes_read for s in spans),
+            'Bytes_Written': sum(s.bytes_written for s in spans)
+        })
+    return pd.DataFrame(rows, columns=['Started', 'Page', 'Duration_ms', 'Finished', 'Spans',
+                                       'Rows_Read', 'Bytes_Read', 'Bytes_Written'])
+
+def slowest_spans(limit=20):
+    """Slowest individual spans across the recorded reruns"""
+    rows = [
+        {'Page': rerun.page, 'Started': rerun.started.strftime('%H:%M:%S'), 'Span': s.name,
+         'Kind': s.kind, 'Duration_ms': s.duration * 1000, 'Rows': s.rows,
+         'Bytes': s.bytes_read + s.bytes_written}
+        for rerun in snapshot() for s in list(rerun.spans)
+    ]
+    spans = pd.DataFrame(rows, columns=['Page', 'Started', 'Span', 'Kind', 'Duration_ms', 'Rows', 'Bytes'])
+    return spans.sort_values('Duration_ms', ascending=False).head(limit).reset_index(drop=True)
+
+def page_percentiles():
+    """Rerun count and p50 / p95 / max duration per page"""
+    durations = pd.DataFrame(
+        [{'Page': rerun.page, 'Duration_ms': rerun.duration * 1000} for rerun in snapshot()],
+        columns=['Page', 'Duration_ms']
+    )
+    grouped = durations.groupby('Page')['Duration_ms']
+    summary = pd.DataFrame({
+        'Reruns': grouped.size(),
+        'p50_ms': grouped.quantile(0.5),
+        'p95_ms': grouped.quantile(0.95),
+        'Max_ms': grouped.max()
+    })
+    return summary.sort_values('p95_ms', ascending=False).reset_index()
@@ -1,8 +1,17 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-from datetime import datetime, timedelta
 import os
+import threading
+from contextlib import contextmanager
+import theta_core
+from theta_core import tracing, metrics, storage, notify
+import profiling
+import memory_monitor
+
+# Whether a refreshed() call in this thread's fragment run recomputed anything,
+# and the data files those calls read
+_refresh = threading.local()
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -96,32 +105,170 @@ def format_currency(value, include_currency=True):
 
 def get_date_range(time_filter):
     """Get start and end dates based on time filter"""
-    end_date = datetime.now().date()
-    
-    if time_filter == "Today":
-        start_date = end_date
-    elif time_filter == "Last 7 Days":
-        start_date = end_date - timedelta(days=6)
-    elif time_filter == "Last 30 Days":
-        start_date = end_date - timedelta(days=29)
-    elif time_filter == "Last 90 Days":
-        start_date = end_date - timedelta(days=89)
-    elif time_filter == "Last 6 Months":
-        start_date = end_date - timedelta(days=180)
-    elif time_filter == "Last Year":
-        start_date = end_date - timedelta(days=365)
-    elif time_filter == "All Time":
-        start_date = datetime(2020, 1, 1).date()
-    else:  # Custom - handled separately in the app
-        start_date = end_date - timedelta(days=7)  # Default fallback
-    
-    return start_date, end_date
+    return theta_core.date_range(time_filter)
+
+def begin_page(page):
+    """Keep memory within budget, pin the current data generation, then trace this rerun of ``page``
+    and profile it if requested
+
+    The first rerun in a process also starts the cache warm-up and, when
+    THETA_METRICS_PORT is set, the metrics endpoint.
+    """
+    # Imported here because warmup pulls in modules that import utils
+    import warmup
+    warmup.start()
+    metrics.start_from_env()
+    memory_monitor.enforce_budget()
+    storage.pin()
+    tracing.begin_rerun(page)
+    profiling.start(page)
+
+def end_page():
+    """Finish the rerun started by begin_page; the pin is released even if saving the profile fails"""
+    try:
+        profiling.stop()
+    finally:
+        try:
+            tracing.end_rerun()
+        finally:
+            storage.unpin()
+
+@contextmanager
+def page_run(page):
+    """Run a page script between begin_page and end_page
+
+    st.rerun() and st.stop() leave the script by raising, as does any error
+    that escapes it; the pin, trace and profile are released before the
+    exception reaches Streamlit.
+    """
+    try:
+        begin_page(page)
+        yield
+    finally:
+        end_page()
+
+@contextmanager
+def fragment_run(page):
+    """Pin and trace a fragment rerunning on its own like begin_page/end_page;
+    inside a full rerun of the page, the page's pin and trace are kept
+
+    Afterwards the fragment is subscribed to the files its refreshed() calls
+    read, so the next commit to one of them reruns it in this session. A
+    rerun that found nothing changed (no refreshed() recomputed) is not kept
+    in the trace.
+    """
+    _refresh.files = set()
+    if storage.pinned():
+        try:
+            yield
+        finally:
+            _subscribe(page, _refresh.files)
+        return
+    storage.pin()
+    tracing.begin_rerun(page)
+    _refresh.changed = False
+    try:
+        yield
+    finally:
+        try:
+            if _refresh.changed:
+                tracing.end_rerun()
+            else:
+                tracing.discard_rerun()
+            _subscribe(page, _refresh.files)
+        finally:
+            storage.unpin()
+
+def _subscribe(page, files):
+    """Have commits to ``files`` rerun the fragment running now, in this session only"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    _refresh.files = None
+    context = get_script_run_ctx()
+    fragment_id = _fragment_id(context)
+    if context is None or not fragment_id or not files:
+        return
+    notify.subscribe((context.session_id, page), "data", files,
+                     lambda: _wake(context.session_id, fragment_id))
+
+def _fragment_id(context):
+    """ID of the st.fragment running in this script thread, if any"""
+    try:
+        from streamlit.runtime.scriptrunner_utils.script_run_context import ThreadState
+    except ImportError:
+        # Streamlit before the per-thread fragment state
+        return getattr(context, 'current_fragment_id', None)
+    try:
+        return ThreadState.get().fragment_id
+    except RuntimeError:
+        return None
+
+def _wake(session_id, fragment_id):
+    """Queue a rerun of one fragment in one browser session, as the fragment's own
+    auto-rerun would; False once the session or the fragment is gone
+
+    Runs on the storage writer thread, so the rerun is handed to the session's
+    event loop rather than started here.
+    """
+    from streamlit import runtime
+    from streamlit.proto.ClientState_pb2 import ClientState
+    if not runtime.exists():
+        return False
+    info = runtime.get_instance()._session_mgr.get_active_session_info(session_id)
+    if info is None:
+        return False
+    session = info.session
+    if not session._fragment_storage.contains(fragment_id):
+        # A full rerun drew another page
+        return False
+    client_state = ClientState()
+    client_state.CopyFrom(session._client_state)
+    client_state.fragment_id = fragment_id
+    client_state.is_auto_rerun = True
+    session._event_loop.call_soon_threadsafe(session.request_rerun, client_state)
+    return True
+
+def refreshed(name, files, compute, *args):
+    """compute(*args), held in the session until one of the data ``files`` changes
+
+    Inside fragment_run the fragment is subscribed to ``files``: it is rerun
+    after a commit to one of them and otherwise left alone. A rerun for
+    another file's commit costs a few stats here and redraws what it
+    computed last.
+    """
+    metrics.cache_request("refresh")
+    if getattr(_refresh, 'files', None) is not None:
+        _refresh.files.update(files)
+    key = (notify.stamp("data", files), args)
+    held = st.session_state.get(f"refreshed_{name}")
+    if held is None or held[0] != key:
+        metrics.cache_miss("refresh")
+        _refresh.changed = True
+        held = (key, compute(*args))
+        st.session_state[f"refreshed_{name}"] = held
+    return held[1]
+
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart recorded as a render span"""
+    with tracing.span(f"chart {fig.layout.title.text or 'untitled'}", 'render'):
+        st.plotly_chart(fig, **kwargs)
 
 def ensure_data_dir():
     """Ensure data directory exists"""
     if not os.path.exists("data"):
         os.makedirs("data")
 
+def file_version(path):
+    """Cheap version key for a data file: its storage generation and size, or for a
+    file the storage layer has not published, its modification time and size"""
+    version = storage.version(path)
+    if version is not None:
+        return version
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
 def calculate_product_cogs(product_name, recipe_df, inventory_df):
     """Calculate COGS for a product based on recipe and inventory costs"""
     if recipe_df.empty or inventory_df.empty:
@@ -184,3 +331,136 @@ def update_inventory_from_sale(product, quantity, recipe_df, inventory_df):
             updated_inventory.loc[idx[0], 'Quantity'] = new_qty
     
     return updated_inventory
+
+# Units that can be converted to a common base unit
+UNIT_CONVERSIONS = {
+    'g': ('g', 1.0),
+    'kg': ('g', 1000.0),
+    'ml': ('ml', 1.0),
+    'l': ('ml', 1000.0),
+    'pcs': ('pcs', 1.0)
+}
+
+def apply_purchases(inventory_df, purchases_df, purchase_date):
+    """Apply a batch of purchase lines to inventory using weighted-average costing
+    
+    Args:
+        inventory_df: Current inventory dataframe
+        purchases_df: Invoice lines with Material, Quantity, Unit and Total_Cost columns
+        purchase_date: Date of the invoice
+    
+    Returns:
+        Tuple of (updated inventory dataframe, transactions dataframe, affected material names)
+    
+    Raises:
+        storage.Rejected: if a line lacks a unit, a positive quantity or a total cost, or its
+            unit cannot be converted to the unit the material is counted in
+    """
+    date_str = purchase_date.strftime('%Y-%m-%d')
+    lines = purchases_df[['Material', 'Quantity', 'Unit', 'Total_Cost']].copy()
+    lines['Material'] = lines['Material'].astype(str).str.strip()
+    lines['Unit'] = lines['Unit'].where(lines['Unit'].notna(), '').astype(str).str.strip().str.lower()
+    lines['Quantity'] = pd.to_numeric(lines['Quantity'], errors='coerce')
+    lines['Total_Cost'] = pd.to_numeric(lines['Total_Cost'], errors='coerce')
+    
+    missing = lines[(lines['Unit'] == '') | ~(lines['Quantity'] > 0) | lines['Total_Cost'].isna()]
+    if not missing.empty:
+        raise storage.Rejected("Every invoice line needs a unit, a quantity greater than zero and a total cost "
+                               f"(check {', '.join(missing['Material'].unique())})")
+    
+    # Convert each line to the unit already used in inventory (e.g. kg -> g); a new
+    # material is counted in the unit of its first invoice line
+    current_units = (inventory_df.drop_duplicates('Name').set_index('Name')['Unit']
+                     .astype(str).str.strip().str.lower())
+    first_units = lines.drop_duplicates('Material').set_index('Material')['Unit']
+    target_unit = lines['Material'].map(current_units).fillna(lines['Material'].map(first_units))
+    base_units = {unit: base for unit, (base, _) in UNIT_CONVERSIONS.items()}
+    base_factors = {unit: factor for unit, (_, factor) in UNIT_CONVERSIONS.items()}
+    same_base = (lines['Unit'].map(base_units).fillna(lines['Unit']) ==
+                 target_unit.map(base_units).fillna(target_unit))
+    if not same_base.all():
+        raise storage.Rejected("; ".join(f"{material} is counted in {target}, not {unit}" for material, unit, target
+                                         in zip(lines['Material'][~same_base], lines['Unit'][~same_base],
+                                                target_unit[~same_base])))
+    factor = lines['Unit'].map(base_factors).fillna(1.0) / target_unit.map(base_factors).fillna(1.0)
+    lines['Quantity'] = lines['Quantity'] * factor
+    lines['Unit'] = target_unit
+    
+    # One transaction row per invoice line
+    transactions = pd.DataFrame({
+        'Date': date_str,
+        'Material': lines['Material'],
+        'Quantity': lines['Quantity'],
+        'Unit': lines['Unit'],
+        'Unit_Cost': lines['Total_Cost'] / lines['Quantity'],
+        'Total_Cost': lines['Total_Cost'],
+        'Type': 'Addition'
+    })
+    
+    # Group lines by material so each item is blended once
+    grouped = lines.groupby('Material', sort=False).agg(
+        Add_Quantity=('Quantity', 'sum'),
+        Add_Cost=('Total_Cost', 'sum'),
+        Unit=('Unit', 'first')
+    )
+    
+    updated = inventory_df.copy()
+    existing = updated['Name'].isin(grouped.index)
+    if existing.any():
+        add = grouped.reindex(updated.loc[existing, 'Name'])
+        current_qty = updated.loc[existing, 'Quantity'].to_numpy(dtype=float)
+        current_cost = updated.loc[existing, 'Avg_Cost'].fillna(0).to_numpy(dtype=float)
+        add_qty = add['Add_Quantity'].to_numpy(dtype=float)
+        add_cost = add['Add_Cost'].to_numpy(dtype=float)
+        
+        # Weighted average cost = (old value + purchase value) / new quantity
+        new_qty = current_qty + add_qty
+        new_value = current_qty * current_cost + add_cost
+        purchase_cost = np.divide(add_cost, add_qty, out=np.zeros_like(add_cost), where=add_qty > 0)
+        new_avg = np.divide(new_value, new_qty, out=purchase_cost, where=new_qty > 0)
+        
+        updated.loc[existing, 'Quantity'] = new_qty
+        updated.loc[existing, 'Avg_Cost'] = new_avg
+        updated.loc[existing, 'Date'] = date_str
+    
+    # Add materials that are not in inventory yet
+    new_items = grouped[~grouped.index.isin(updated['Name'])]
+    if not new_items.empty:
+        start_id = int(updated['ID'].max()) + 1 if not updated.empty else 1
+        new_rows = pd.DataFrame({
+            'ID': range(start_id, start_id + len(new_items)),
+            'Name': new_items.index,
+            'Quantity': new_items['Add_Quantity'].to_numpy(),
+            'Unit': new_items['Unit'].to_numpy(),
+            'Avg_Cost': (new_items['Add_Cost'] / new_items['Add_Quantity']).to_numpy(),
+            'Date': date_str
+        })
+        updated = pd.concat([updated, new_rows], ignore_index=True)
+    
+    return updated, transactions, grouped.index.tolist()
+
+def refresh_product_cogs(products_df, recipe_df, inventory_df, materials):
+    """Recalculate COGS and Profit only for products that use the given materials
+    
+    Returns:
+        Tuple of (updated products dataframe, list of refreshed product names)
+    """
+    if products_df.empty or recipe_df.empty:
+        return products_df, []
+    
+    affected = recipe_df.loc[recipe_df['Ingredient'].isin(materials), 'Product'].unique()
+    if len(affected) == 0:
+        return products_df, []
+    
+    # Recipe cost = sum(recipe quantity * average cost) over all ingredients of each affected product
+    recipe = recipe_df[recipe_df['Product'].isin(affected)]
+    costs = inventory_df.drop_duplicates('Name').set_index('Name')['Avg_Cost']
+    line_cost = pd.to_numeric(recipe['Quantity'], errors='coerce') * recipe['Ingredient'].map(costs)
+    cogs = line_cost.clip(lower=0).fillna(0).groupby(recipe['Product']).sum()
+    
+    updated = products_df.copy()
+    mask = updated['Name'].isin(cogs.index)
+    updated.loc[mask, 'COGS'] = updated.loc[mask, 'Name'].map(cogs)
+    updated.loc[mask, 'Profit'] = updated.loc[mask, 'Price'] - updated.loc[mask, 'COGS']
+    
+    return updated, updated.loc[mask, 'Name'].tolist()
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+import theta_core
+import datasets
+import forecast
+import geocoding
+
+# Cache warm-up after a deploy or restart. The first page rerun in a process
+# starts a background thread that parses the data files, builds the dashboard
+# rollups for the preset periods and compiles the BOM matrix, so the first
+# visitor finds the shared caches already filled. THETA_WARMUP=0 turns it off
+# (the render benchmark wants cold caches). Geocoding every order location goes
+# to the public geocoder, so that step only runs with THETA_WARMUP_GEOCODE=1.
+ROLLUP_PERIODS = ("Today", "Last 7 Days", "Last 30 Days")
+
+_lock = threading.Lock()
+_state = {'thread': None, 'started': None, 'finished': None, 'steps': []}
+
+def enabled():
+    """False when THETA_WARMUP=0"""
+    return os.environ.get("THETA_WARMUP", "1") != "0"
+
+def geocode_enabled():
+    """True when THETA_WARMUP_GEOCODE=1"""
+    return os.environ.get("THETA_WARMUP_GEOCODE", "0") == "1"
+
+def load_datasets(data_dir):
+    """Parse every data file into the shared dataset cache"""
+    rows = sum(len(datasets.load(name, data_dir)) for name in datasets.LOADERS)
+    return f"{len(datasets.LOADERS)} files, {rows:,} rows"
+
+def build_rollups(data_dir):
+    """Sales, KPIs and ingredient usage for the dashboard's preset periods"""
+    for period in ROLLUP_PERIODS:
+        start_date, end_date = theta_core.date_range(period)
+        datasets.sales_rollup(start_date, end_date, data_dir)
+    return ", ".join(ROLLUP_PERIODS)
+
+def compile_bom(data_dir):
+    """Product x ingredient matrix used by the usage rollup and forecast"""
+    bom = forecast.get_bom_matrix(data_dir)
+    return f"{bom.shape[0]} products x {bom.shape[1]} ingredients"
+
+def preload_geocodes(data_dir):
+    """Geocode every distinct order location, as the map page's All Time view does"""
+    orders = theta_core.order_locations(datasets.sales(*theta_core.date_range("All Time"), data_dir))
+    located = theta_core.locate_orders(orders, geocoding.geocode_address)
+    return f"{orders['Location'].nunique()} locations, {located['Location'].nunique()} resolved"
+
+STEPS = [
+    ("Load datasets", load_datasets),
+    ("Sales rollups", build_rollups),
+    ("BOM matrix", compile_bom),
+    ("Geocode cache", preload_geocodes)
+]
+
+def steps():
+    """STEPS this warm-up runs (the geocode step only with THETA_WARMUP_GEOCODE=1)"""
+    return [(name, step) for name, step in STEPS if step is not preload_geocodes or geocode_enabled()]
+
+def _run(data_dir):
+    """Run every step in order; a failing step is recorded and the rest still run"""
+    for step in _state['steps']:
+        step['Status'] = "Running"
+        start = time.perf_counter()
+        try:
+            step['Detail'] = dict(STEPS)[step['Step']](data_dir)
+            step['Status'] = "Done"
+        except Exception as e:
+            step['Detail'] = str(e)
+            step['Status'] = "Failed"
+        step['Duration_ms'] = (time.perf_counter() - start) * 1000
+    _state['finished'] = datetime.now()
+
+def start(data_dir="data", force=False):
+    """Start the warm-up thread once per process (again with ``force`` once it has finished)
+
+    Returns:
+        True if a warm-up started
+    """
+    if not enabled() or (_state['thread'] is not None and not force):
+        return False
+    with _lock:
+        thread = _state['thread']
+        if thread is not None and (thread.is_alive() or not force):
+            return False
+        _state['steps'] = [{'Step': name, 'Status': "Waiting", 'Duration_ms': None, 'Detail': ""}
+                           for name, _ in steps()]
+        _state['started'], _state['finished'] = datetime.now(), None
+        thread = threading.Thread(target=_run, args=(data_dir,), name="theta-warmup", daemon=True)
+        _state['thread'] = thread
+        thread.start()
+    return True
+
+def running():
+    """True while the warm-up thread is working"""
+    thread = _state['thread']
+    return thread is not None and thread.is_alive()
+
+def progress():
+    """Fraction of warm-up steps finished (0 before it started)"""
+    steps = list(_state['steps'])
+    if not steps:
+        return 0.0
+    return sum(step['Status'] in ("Done", "Failed") for step in steps) / len(steps)
+
+def status():
+    """Warm-up steps with their status, duration and result"""
+    return pd.DataFrame([dict(step) for step in _state['steps']],
+                        columns=['Step', 'Status', 'Duration_ms', 'Detail'])
+
+def started():
+    """When the latest warm-up started, or None"""
+    return _state['started']
+
+def finished():
+    """When the latest warm-up finished, or None while it is running"""
+    return _state['finished']